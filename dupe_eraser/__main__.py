@@ -1,9 +1,30 @@
 import os
+import sys
+import cProfile
+import json
+import shutil
+import subprocess
 import logging
 import argparse
+import platform
+import tempfile
+import time
 import humanize
+from core.checkpoint import Checkpoint
 from core.comparison_method import ComparisonMethod
+from core.duplicate_action import DuplicateAction
 from core.duplicate_remover import DuplicateRemover
+from core.duplicate_report import DuplicateReport
+from core.hash_cache import HashCache
+from core.metrics import Metrics
+from core.plan_applier import PlanApplier
+from core.process_priority import ProcessPriority
+from core.io_backend_kind import IOBackendKind
+from core.keeper_policy import KeeperPolicy
+from core.pool_kind import PoolKind
+from core.scan_filter import ScanFilter
+from core.shard_index import ShardIndex
+from core.synthetic_tree import SyntheticTree
 
 
 def setup_logging(quiet_mode: bool):
@@ -16,10 +37,62 @@ def setup_logging(quiet_mode: bool):
     )
 
 
+def add_throttling_arguments(parser):
+    """Add the options bounding the load a run puts on the storage."""
+    parser.add_argument(
+        "--max-read-mbps",
+        type=float,
+        default=None,
+        help="Maximum read throughput of hashing and comparison in MB/s, "
+        "shared by all workers.",
+    )
+    parser.add_argument(
+        "--max-iops",
+        type=float,
+        default=None,
+        help="Maximum number of open, read, stat and removal requests per "
+        "second, shared by all stages and workers.",
+    )
+    parser.add_argument(
+        "--target-latency-ms",
+        type=float,
+        default=None,
+        help="Lower the number of concurrent reads while reads take longer "
+        "than this, and raise it back up to --queue-depth (async) or "
+        "--workers once they are faster.",
+    )
+    parser.add_argument(
+        "--nice",
+        type=int,
+        default=0,
+        help="Increment added to the CPU niceness of the process.",
+    )
+    parser.add_argument(
+        "--ionice",
+        choices=ProcessPriority.IO_CLASSES,
+        default=None,
+        help="I/O scheduling class of the process: 'idle' only reads when no "
+        "other process does, 'best-effort' uses --ionice-level. Needs ionice(1) "
+        "and an I/O scheduler honouring priorities.",
+    )
+    parser.add_argument(
+        "--ionice-level",
+        type=int,
+        default=7,
+        help="Priority within the best-effort class, from 0 (highest) to 7 "
+        "(lowest, the default).",
+    )
+
+
 def parse_arguments():
     """Parse command-line arguments."""
     parser = argparse.ArgumentParser(
-        description="Recursively find and optionally remove duplicate files in a directory."
+        description="Recursively find and optionally remove duplicate files in a directory.",
+        epilog="Run 'dupe_eraser apply PLAN' to apply a plan written with --report, "
+        "'dupe_eraser shard' and 'dupe_eraser merge' to match duplicates across "
+        "separately scanned trees or hosts, 'dupe_eraser analyze' to estimate "
+        "block-level savings, or 'dupe_eraser benchmark' to measure the "
+        "pipeline.",
     )
 
     parser.add_argument(
@@ -39,6 +112,13 @@ def parse_arguments():
         default="xxh3_128",
         help="Hash algorithm to use (only applicable if method is 'hash'). Default is 'xxh3_128'.",
     )
+    parser.add_argument(
+        "--perceptual-threshold",
+        type=int,
+        default=5,
+        help="Maximum Hamming distance between the perceptual hashes of two images "
+        "considered near-duplicates (phash, dhash, whash, colorhash). Default is 5.",
+    )
     parser.add_argument(
         "--quiet",
         action="store_true",
@@ -54,11 +134,1092 @@ def parse_arguments():
         action="store_true",
         help="Only print duplicate files without removing them.",
     )
+    parser.add_argument(
+        "--action",
+        choices=[
+            DuplicateAction.DELETE,
+            DuplicateAction.HARDLINK,
+            DuplicateAction.REFLINK,
+            DuplicateAction.SYMLINK,
+        ],
+        default=DuplicateAction.DELETE,
+        help="What to do with duplicates: 'delete' (default), or replace them "
+        "atomically with a 'hardlink', a copy-on-write 'reflink' clone or a "
+        "'symlink' to the kept original.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        default=None,
+        metavar="PLAN",
+        help="Write the duplicate groups to a JSON Lines plan instead of acting on "
+        "them. The plan is applied later with 'dupe_eraser apply PLAN'.",
+    )
+    parser.add_argument(
+        "--cross-tree",
+        action="store_true",
+        help="Match duplicates across the whole tree instead of within each directory.",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Match duplicates across the whole tree while it is being scanned, "
+        "removing them as soon as they are confirmed.",
+    )
+    parser.add_argument(
+        "--prefilter-kb",
+        type=int,
+        default=16,
+        help="Size in KiB of the head/tail/interior samples compared before a full "
+        "read. Use 0 to disable the prefilter. Default is 16.",
+    )
+    parser.add_argument(
+        "--prefilter-samples",
+        type=int,
+        default=3,
+        help="Number of interior samples taken besides the head and tail. Default is 3.",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=HashCache.DEFAULT_PATH,
+        default=None,
+        metavar="PATH",
+        help="Reuse digests across runs from a persistent hash cache, stored at "
+        f"PATH (default: {HashCache.DEFAULT_PATH}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of workers hashing files concurrently. Default is 1.",
+    )
+    parser.add_argument(
+        "--pool",
+        choices=[PoolKind.THREAD, PoolKind.PROCESS],
+        default=PoolKind.THREAD,
+        help="Worker pool backend: 'thread' (default) for I/O-bound hashing or "
+        "'process' for CPU-bound perceptual hashing.",
+    )
+    parser.add_argument(
+        "--block-size-kb",
+        type=int,
+        default=None,
+        help="Read block size in KiB for hashing and comparison. By default it is "
+        "picked per file size and large files are memory-mapped.",
+    )
+    parser.add_argument(
+        "--max-open-files",
+        type=int,
+        default=256,
+        help="Maximum number of files kept open at once when comparing a size "
+        "group byte by byte. Default is 256.",
+    )
+    parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=1,
+        help="Number of threads listing directories concurrently, useful on "
+        "network filesystems. Default is 1.",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only consider files matching GLOB. Patterns without a '/' match "
+        "file names, others full paths. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Never consider files matching GLOB. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip directories matching GLOB and everything below them, "
+        "without listing or stat'ing them. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exclude-common-dirs",
+        action="store_true",
+        help="Skip version control and build cache directories: "
+        f"{', '.join(ScanFilter.DEFAULT_EXCLUDED_DIRS)}.",
+    )
+    parser.add_argument(
+        "--min-size-kb",
+        type=int,
+        default=0,
+        help="Ignore files smaller than this size in KiB.",
+    )
+    parser.add_argument(
+        "--max-size-kb",
+        type=int,
+        default=None,
+        help="Ignore files larger than this size in KiB.",
+    )
+    parser.add_argument(
+        "--largest-first",
+        action="store_true",
+        help="Process the size groups holding the most reclaimable space first, "
+        "so a time-boxed run finds the biggest savings early. Has no effect "
+        "with --streaming.",
+    )
+    parser.add_argument(
+        "--keep",
+        type=lambda value: value.split(","),
+        default=[KeeperPolicy.FIRST],
+        metavar="POLICY[,POLICY...]",
+        help="Rules choosing the file kept in each duplicate group, later rules "
+        f"breaking ties: {', '.join(KeeperPolicy.POLICIES)}, "
+        f"'{KeeperPolicy.FIRST}' only as the last rule. Default is "
+        f"'{KeeperPolicy.FIRST}', the first file found.",
+    )
+    parser.add_argument(
+        "--prefer-dir",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="Keep files under DIR over copies elsewhere. Can be repeated, "
+        "earlier directories being preferred.",
+    )
+    parser.add_argument(
+        "--removal-batch",
+        type=int,
+        default=1024,
+        help="Number of removals queued and then issued directory by "
+        "directory, limiting metadata contention on network filers. "
+        "Default is 1024.",
+    )
+    parser.add_argument(
+        "--io-backend",
+        choices=[IOBackendKind.SYNC, IOBackendKind.ASYNC],
+        default=IOBackendKind.SYNC,
+        help="How files are read for hashing and comparison: 'sync' (default) "
+        "issues one read at a time, 'async' keeps many reads outstanding across "
+        "files, which hides latency on network filesystems. Worker processes "
+        "of --pool process always read directly.",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=32,
+        help="Maximum number of outstanding reads of the async I/O backend. "
+        "Default is 32.",
+    )
+    parser.add_argument(
+        "--inject-latency-ms",
+        type=float,
+        default=0.0,
+        help="Add this delay to every open and read, to try the I/O backends "
+        "locally as if on a network filesystem.",
+    )
+    add_throttling_arguments(parser)
+    parser.add_argument(
+        "--checkpoint",
+        nargs="?",
+        const=Checkpoint.DEFAULT_PATH,
+        default=None,
+        metavar="PATH",
+        help="Periodically record the progress of the run to a state file at "
+        f"PATH (default: {Checkpoint.DEFAULT_PATH}).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the interrupted run recorded by --checkpoint, skipping the "
+        "directories and digests already processed.",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Write counters, byte totals and latency histograms of every "
+        "operation (stat, open, read, hash, compare, unlink) to PATH during "
+        "the run and when it ends.",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=[Metrics.JSON, Metrics.PROMETHEUS],
+        default=Metrics.JSON,
+        help="Format of the metrics file: 'json' (default) or 'prometheus' text "
+        "format, e.g. for the node exporter textfile collector.",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between two metrics snapshots. Default is 10.",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Profile the run with cProfile and save the stats to PATH, to be "
+        "read with pstats or snakeviz.",
+    )
 
     return parser.parse_args()
 
 
+def parse_apply_arguments(argv):
+    """Parse command-line arguments of the apply subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="dupe_eraser apply",
+        description="Apply a duplicate plan written by a previous scan with "
+        "--report. Files whose size or modification time changed since the "
+        "scan are skipped.",
+    )
+
+    parser.add_argument(
+        "plan",
+        type=str,
+        help="Path to the JSON Lines plan.",
+    )
+    parser.add_argument(
+        "--action",
+        choices=[
+            DuplicateAction.DELETE,
+            DuplicateAction.HARDLINK,
+            DuplicateAction.REFLINK,
+            DuplicateAction.SYMLINK,
+        ],
+        default=None,
+        help="Override the action recorded in the plan.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress all output except critical errors.",
+    )
+    parser.add_argument(
+        "--print-only",
+        action="store_true",
+        help="Only print what would be done without touching any file.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="NAME",
+        help="Only apply the duplicates of shard NAME of a plan written by "
+        "'dupe_eraser merge', e.g. on the host holding that shard. Keepers "
+        "on other shards only support 'delete', and only once confirmed with "
+        "--confirmed.",
+    )
+    parser.add_argument(
+        "--confirm-keepers",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="With --shard, rehash the keepers of shard NAME that other shards "
+        "delete against and write those still unchanged to PATH, instead of "
+        "applying the plan. Run it on every shard before applying.",
+    )
+    parser.add_argument(
+        "--confirmed",
+        action="append",
+        default=[],
+        metavar="PATH",
+        help="Keepers confirmed by another shard with --confirm-keepers. "
+        "Duplicates whose keeper on another shard is not confirmed are "
+        "skipped. Can be repeated.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def apply_plan(argv):
+    """Apply a duplicate plan written with --report."""
+    args = parse_apply_arguments(argv)
+    setup_logging(args.quiet)
+
+    try:
+        applier = PlanApplier(
+            action=args.action,
+            print_only=args.print_only,
+            shard=args.shard,
+            confirmation_paths=args.confirmed,
+        )
+        if args.confirm_keepers:
+            confirmed = applier.confirm_keepers(args.plan, args.confirm_keepers)
+            logging.info(
+                f"Keepers of shard '{args.shard}' confirmed to "
+                f"{args.confirm_keepers}: {confirmed}"
+            )
+            return
+        applier.apply(args.plan)
+    except (OSError, ValueError) as e:
+        logging.error(f"Cannot apply plan {args.plan}: {e}")
+        return
+
+    logging.info("\nOperation completed!")
+    logging.info(f"Total duplicate files removed: {applier.files_replaced}")
+    logging.info(f"Files skipped as changed since the scan: {applier.files_skipped}")
+    logging.info(f"Total space saved: {humanize.naturalsize(applier.space_saved)}")
+
+
+def parse_shard_arguments(argv):
+    """Parse command-line arguments of the shard subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="dupe_eraser shard",
+        description="Scan a shard of the data, such as the mount points of one "
+        "host, into a partial index of stat records, or answer the requests of "
+        "'dupe_eraser merge' by fingerprinting or hashing the files it asks "
+        "about. Run 'merge' on all the indexes and 'shard --answer' on each "
+        "shard it writes requests for, until 'merge' writes the plan.",
+    )
+
+    parser.add_argument(
+        "roots",
+        type=str,
+        nargs="*",
+        help="Directories the shard is made of. Not used with --answer.",
+    )
+    parser.add_argument(
+        "--index",
+        type=str,
+        required=True,
+        help="Path to the partial index of the shard, written by a scan and "
+        "appended to by --answer.",
+    )
+    parser.add_argument(
+        "--name",
+        type=str,
+        default=None,
+        help="Name of the shard, unique among the shards merged together. "
+        "Default is the index file name without extension.",
+    )
+    parser.add_argument(
+        "--answer",
+        type=str,
+        default=None,
+        metavar="REQUESTS",
+        help="Digest the files listed in a requests file written by 'merge' "
+        "instead of scanning. The hash settings recorded in the index are used.",
+    )
+    parser.add_argument(
+        "--hash-algorithm",
+        type=str,
+        default="xxh3_128",
+        help="Hash algorithm, shared by all shards. Default is 'xxh3_128'.",
+    )
+    parser.add_argument(
+        "--prefilter-kb",
+        type=int,
+        default=16,
+        help="Size in KiB of the samples fingerprinted before a full read, "
+        "shared by all shards. Use 0 to disable the prefilter. Default is 16.",
+    )
+    parser.add_argument(
+        "--prefilter-samples",
+        type=int,
+        default=3,
+        help="Number of interior samples taken besides the head and tail. "
+        "Default is 3.",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=HashCache.DEFAULT_PATH,
+        default=None,
+        metavar="PATH",
+        help="Reuse digests across runs from a persistent hash cache, stored at "
+        f"PATH (default: {HashCache.DEFAULT_PATH}).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of workers hashing files concurrently. Default is 1.",
+    )
+    parser.add_argument(
+        "--io-backend",
+        choices=[IOBackendKind.SYNC, IOBackendKind.ASYNC],
+        default=IOBackendKind.SYNC,
+        help="How files are read: 'sync' (default) or 'async'.",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=32,
+        help="Maximum number of outstanding reads of the async I/O backend. "
+        "Default is 32.",
+    )
+    parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=1,
+        help="Number of threads listing directories concurrently. Default is 1.",
+    )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip directories matching GLOB. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exclude-common-dirs",
+        action="store_true",
+        help="Skip version control and build cache directories.",
+    )
+    parser.add_argument(
+        "--min-size-kb",
+        type=int,
+        default=0,
+        help="Ignore files smaller than this size in KiB.",
+    )
+    add_throttling_arguments(parser)
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress all output except critical errors.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def run_shard(argv):
+    """Scan a shard into a partial index, or answer the requests of a merge."""
+    args = parse_shard_arguments(argv)
+    setup_logging(args.quiet)
+
+    remover = None
+    try:
+        ProcessPriority.lower(args.nice, args.ionice, args.ionice_level)
+        if args.answer:
+            # Digest with the settings the shard was scanned with
+            header, _ = ShardIndex.load(args.index)
+            settings = header["settings"]
+            hash_algorithm = settings["algorithm"]
+            prefilter_kb = settings["prefilter_kb"]
+            prefilter_samples = settings["prefilter_samples"]
+        else:
+            if not args.roots:
+                logging.error("No directory to scan")
+                return
+            hash_algorithm = args.hash_algorithm
+            prefilter_kb = args.prefilter_kb
+            prefilter_samples = args.prefilter_samples
+
+        remover = DuplicateRemover(
+            hash_algorithm=hash_algorithm,
+            show_progress=False,
+            prefilter_kb=prefilter_kb,
+            prefilter_samples=prefilter_samples,
+            cache_path=args.cache,
+            workers=args.workers,
+            scan_workers=args.scan_workers,
+            io_backend=args.io_backend,
+            queue_depth=args.queue_depth,
+            scan_filter=ScanFilter(
+                exclude_dirs=args.exclude_dir
+                + (
+                    list(ScanFilter.DEFAULT_EXCLUDED_DIRS)
+                    if args.exclude_common_dirs
+                    else []
+                ),
+                min_size=args.min_size_kb * 1024,
+            ),
+            max_read_rate=(
+                args.max_read_mbps * 1e6 if args.max_read_mbps is not None else None
+            ),
+            max_iops=args.max_iops,
+            target_latency=(
+                args.target_latency_ms / 1000
+                if args.target_latency_ms is not None
+                else None
+            ),
+        )
+
+        if args.answer:
+            answered, dropped = remover.answer_shard_requests(args.answer, args.index)
+            logging.info(
+                f"Answered {answered} requests of {args.answer} into {args.index}"
+            )
+            if dropped:
+                logging.info(f"Files dropped as changed since the scan: {dropped}")
+            logging.info(
+                f"Total data processed: "
+                f"{humanize.naturalsize(remover.total_bytes_processed)}"
+            )
+            return
+
+        roots = [os.path.abspath(root) for root in args.roots]
+        for root_dir in roots:
+            if not os.path.isdir(root_dir):
+                logging.error(f"Invalid directory path: {root_dir}")
+                return
+        name = args.name or os.path.splitext(os.path.basename(args.index))[0]
+        index = remover.write_shard_index(roots, args.index, name)
+        logging.info(f"Indexed {index.files} files of shard '{name}' to {args.index}")
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"Shard error: {e}")
+    finally:
+        if remover is not None:
+            remover.close()
+
+
+def parse_merge_arguments(argv):
+    """Parse command-line arguments of the merge subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="dupe_eraser merge",
+        description="Combine the partial indexes of several shards and match "
+        "duplicates across them. Files still needing a fingerprint or digest "
+        "are written to one requests file per shard, to be answered with "
+        "'dupe_eraser shard --answer'; once none is left, the duplicate groups "
+        "are written to a plan applied with 'dupe_eraser apply'.",
+    )
+
+    parser.add_argument(
+        "indexes",
+        type=str,
+        nargs="+",
+        help="Partial indexes of the shards, earlier shards being preferred "
+        "for keepers by default.",
+    )
+    parser.add_argument(
+        "--requests-dir",
+        type=str,
+        default=".",
+        help="Directory the requests files are written to. Default is the "
+        "current directory.",
+    )
+    parser.add_argument(
+        "--report",
+        type=str,
+        required=True,
+        metavar="PLAN",
+        help="Path to the JSON Lines plan written once all requests are answered.",
+    )
+    parser.add_argument(
+        "--action",
+        choices=[
+            DuplicateAction.DELETE,
+            DuplicateAction.HARDLINK,
+            DuplicateAction.REFLINK,
+            DuplicateAction.SYMLINK,
+        ],
+        default=DuplicateAction.DELETE,
+        help="Action recorded in the plan. Default is 'delete'.",
+    )
+    parser.add_argument(
+        "--keep",
+        type=lambda value: value.split(","),
+        default=[KeeperPolicy.FIRST],
+        metavar="POLICY[,POLICY...]",
+        help="Rules choosing the file kept in each duplicate group, later rules "
+        f"breaking ties: {', '.join(KeeperPolicy.POLICIES)}, "
+        f"'{KeeperPolicy.FIRST}' only as the last rule. Default is "
+        f"'{KeeperPolicy.FIRST}'.",
+    )
+    parser.add_argument(
+        "--prefer-dir",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="Keep files under DIR over copies elsewhere. Can be repeated.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress all output except critical errors.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def run_merge(argv):
+    """Merge the partial indexes of several shards."""
+    from core.shard_merger import ShardMerger
+
+    args = parse_merge_arguments(argv)
+    setup_logging(args.quiet)
+
+    try:
+        merger = ShardMerger(args.indexes, KeeperPolicy(args.keep, args.prefer_dir))
+        requests, groups = merger.merge()
+        logging.info(
+            f"Merged {merger.total_files} files "
+            f"({humanize.naturalsize(merger.total_size)}) of "
+            f"{len(merger.shards)} shards"
+        )
+        if merger.hard_links_skipped:
+            logging.info(
+                f"Files skipped as existing hard links: {merger.hard_links_skipped}"
+            )
+
+        if requests:
+            merger.write_requests(requests, args.requests_dir)
+            logging.info(
+                "Answer the requests with 'dupe_eraser shard --answer REQUESTS "
+                "--index INDEX' on each shard, then merge again"
+            )
+            return
+
+        report = DuplicateReport(
+            args.report,
+            ", ".join(merger.roots),
+            ComparisonMethod.HASH,
+            merger.settings["algorithm"] if merger.settings else None,
+            args.action,
+        )
+        try:
+            for group in groups:
+                report.write(group, [merger.shard_of(entry) for entry in group.files])
+        finally:
+            report.close()
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"Merge error: {e}")
+        return
+
+    planned = sum(len(group.duplicates) for group in groups)
+    space = sum(group.keeper.size * len(group.duplicates) for group in groups)
+    logging.info(f"Duplicate groups written to {args.report}: {len(groups)}")
+    logging.info(f"Total duplicate files planned: {planned}")
+    logging.info(f"Total space to save: {humanize.naturalsize(space)}")
+
+
+def parse_analyze_arguments(argv):
+    """Parse command-line arguments of the analyze subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="dupe_eraser analyze",
+        description="Estimate how much space block-level dedup would reclaim: "
+        "split large files into content-defined chunks, index the chunk "
+        "digests across the tree and report the bytes shared, in total and "
+        "per file pair. Files that are only partly identical, such as VM "
+        "images or log archives, are counted too. Nothing is modified.",
+    )
+
+    parser.add_argument(
+        "root_dir",
+        type=str,
+        help="Root directory to analyze.",
+    )
+    parser.add_argument(
+        "--min-file-mb",
+        type=float,
+        default=1.0,
+        help="Only analyze files of at least this size in MB. Default is 1.",
+    )
+    parser.add_argument(
+        "--chunk-kb",
+        type=int,
+        default=8,
+        help="Average chunk size in KiB, a power of two. Chunks are between a "
+        "quarter and eight times this size. Default is 8.",
+    )
+    parser.add_argument(
+        "--hash-algorithm",
+        type=str,
+        default="xxh3_128",
+        help="Hash algorithm digesting each chunk, e.g. 'xxh3_128' (default) "
+        "or 'blake3'.",
+    )
+    parser.add_argument(
+        "--memory-mb",
+        type=int,
+        default=64,
+        help="Memory used by the chunk index before it spills sorted runs to "
+        "disk. Default is 64.",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        type=str,
+        default=None,
+        help="Directory of the spilled chunk index runs. Default is the "
+        "system temporary directory.",
+    )
+    parser.add_argument(
+        "--top-pairs",
+        type=int,
+        default=20,
+        help="Number of file pairs sharing the most bytes to report. "
+        "Default is 20.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Save the results as JSON to this file.",
+    )
+    parser.add_argument(
+        "--exclude-dir",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Skip directories matching GLOB. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exclude-common-dirs",
+        action="store_true",
+        help="Skip version control and build cache directories.",
+    )
+    parser.add_argument(
+        "--io-backend",
+        choices=[IOBackendKind.SYNC, IOBackendKind.ASYNC],
+        default=IOBackendKind.SYNC,
+        help="How files are read: 'sync' (default) or 'async'.",
+    )
+    parser.add_argument(
+        "--queue-depth",
+        type=int,
+        default=32,
+        help="Maximum number of outstanding reads of the async I/O backend. "
+        "Default is 32.",
+    )
+    add_throttling_arguments(parser)
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Suppress all output except critical errors.",
+    )
+    parser.add_argument(
+        "--disable-progress-bar",
+        action="store_true",
+        help="Disable the progress bar.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def run_analyze(argv):
+    """Estimate the space block-level dedup would reclaim under a tree."""
+    from core.chunk_analyzer import ChunkAnalyzer
+    from core.content_chunker import ContentChunker
+
+    args = parse_analyze_arguments(argv)
+    setup_logging(args.quiet)
+
+    root_dir = os.path.abspath(args.root_dir)
+    if not os.path.isdir(root_dir):
+        logging.error(f"Invalid directory path: {root_dir}")
+        return
+
+    remover = None
+    progress_bar = None
+    try:
+        ProcessPriority.lower(args.nice, args.ionice, args.ionice_level)
+        remover = DuplicateRemover(
+            hash_algorithm=args.hash_algorithm,
+            show_progress=False,
+            prefilter_kb=0,
+            io_backend=args.io_backend,
+            queue_depth=args.queue_depth,
+            scan_filter=ScanFilter(
+                exclude_dirs=args.exclude_dir
+                + (
+                    list(ScanFilter.DEFAULT_EXCLUDED_DIRS)
+                    if args.exclude_common_dirs
+                    else []
+                ),
+                min_size=int(args.min_file_mb * 1e6),
+            ),
+            max_read_rate=(
+                args.max_read_mbps * 1e6 if args.max_read_mbps is not None else None
+            ),
+            max_iops=args.max_iops,
+            target_latency=(
+                args.target_latency_ms / 1000
+                if args.target_latency_ms is not None
+                else None
+            ),
+        )
+        analyzer = ChunkAnalyzer(
+            remover.reader,
+            ContentChunker(args.chunk_kb * 1024),
+            hash_algorithm=args.hash_algorithm,
+            memory_limit=args.memory_mb * 1024 * 1024,
+            spill_dir=args.spill_dir,
+            top_pairs=args.top_pairs,
+        )
+
+        logging.info(f"Analyzing chunks of the files under {root_dir}")
+        if not args.disable_progress_bar:
+            from tqdm import tqdm
+
+            progress_bar = tqdm(
+                desc="Chunking", unit="B", unit_scale=True, colour="green"
+            )
+        results = analyzer.analyze(
+            remover.scanner.scan(root_dir),
+            progress_bar.update if progress_bar is not None else None,
+        )
+    except (OSError, ValueError) as e:
+        logging.error(f"Analysis failed: {e}")
+        return
+    finally:
+        if progress_bar is not None:
+            progress_bar.close()
+        if remover is not None:
+            remover.close()
+
+    logging.info("\nChunk Analysis Results:")
+    logging.info(ChunkAnalyzer.format_results(results))
+    if results["spilled_runs"]:
+        logging.info(f"Chunk index spilled to disk in {results['spilled_runs']} runs")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "root": root_dir,
+                    "chunk_size": args.chunk_kb * 1024,
+                    "algorithm": args.hash_algorithm,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        logging.info(f"Results saved to {args.output}")
+
+
+def parse_benchmark_arguments(argv):
+    """Parse command-line arguments of the benchmark subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="dupe_eraser benchmark",
+        description="Measure the throughput of every pipeline stage (scan, size "
+        "grouping, prefilter, hash, compare, delete) on a synthetic tree.",
+    )
+
+    parser.add_argument(
+        "--tree",
+        type=str,
+        default=None,
+        help="Directory of the synthetic tree. An existing non-empty directory is "
+        "benchmarked as is; by default a temporary tree is generated and removed.",
+    )
+    parser.add_argument(
+        "--files",
+        type=int,
+        default=2000,
+        help="Number of files of the synthetic tree. Default is 2000.",
+    )
+    parser.add_argument(
+        "--min-size-kb",
+        type=int,
+        default=1,
+        help="Minimum file size in KiB. Default is 1.",
+    )
+    parser.add_argument(
+        "--max-size-kb",
+        type=int,
+        default=4096,
+        help="Maximum file size in KiB. Default is 4096.",
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=SyntheticTree.DISTRIBUTIONS,
+        default="log",
+        help="File size distribution: 'log' (default) for log-uniform sizes or "
+        "'uniform'.",
+    )
+    parser.add_argument(
+        "--duplicate-ratio",
+        type=float,
+        default=0.3,
+        help="Share of files that are copies of another file. Default is 0.3.",
+    )
+    parser.add_argument(
+        "--near-ratio",
+        type=float,
+        default=0.1,
+        help="Share of files with the size of another file but one byte "
+        "different. Default is 0.1.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="Seed of the synthetic tree layout. Default is 0.",
+    )
+    parser.add_argument(
+        "--algorithms",
+        type=str,
+        default="xxh3_128,blake3,sha256",
+        help="Comma-separated hash algorithms to measure. Default is "
+        "'xxh3_128,blake3,sha256'.",
+    )
+    parser.add_argument(
+        "--block-sizes-kb",
+        type=str,
+        default="auto",
+        help="Comma-separated read block sizes in KiB, 'auto' for the automatic "
+        "choice. Default is 'auto'.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=str,
+        default="1",
+        help="Comma-separated worker counts. Default is '1'.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=3,
+        help="Number of runs of each measurement, the best being kept. Default is 3.",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Save the results as JSON to this file.",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        metavar="BASELINE",
+        help="JSON results of an earlier run to compare against.",
+    )
+    parser.add_argument(
+        "--sample-file",
+        type=str,
+        default=None,
+        help="Also benchmark raw hashing speed and read block sizes on this file.",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="Instead of the pipeline, measure the wall-clock time of short "
+        "command line runs in fresh interpreters, startup and imports "
+        "included, on a tree of --files files (use e.g. --files 20).",
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=str,
+        default=None,
+        help="Comma-separated startup scenarios to run, of "
+        "'help,scan,cross_tree,perceptual'. All by default.",
+    )
+
+    return parser.parse_args(argv)
+
+
+def run_benchmark(argv):
+    """Benchmark the pipeline on a synthetic tree."""
+    from core.pipeline_benchmark import PipelineBenchmark
+
+    args = parse_benchmark_arguments(argv)
+    setup_logging(False)
+
+    try:
+        algorithms = [name for name in args.algorithms.split(",") if name]
+        block_sizes = [
+            None if size == "auto" else int(size) * 1024
+            for size in args.block_sizes_kb.split(",")
+        ]
+        workers = [int(count) for count in args.workers.split(",")]
+        tree = SyntheticTree(
+            file_count=args.files,
+            min_size=args.min_size_kb * 1024,
+            max_size=args.max_size_kb * 1024,
+            distribution=args.distribution,
+            duplicate_ratio=args.duplicate_ratio,
+            near_ratio=args.near_ratio,
+            seed=args.seed,
+        )
+    except ValueError as e:
+        logging.error(f"Configuration error: {e}")
+        return
+
+    root_dir = args.tree or tempfile.mkdtemp(prefix="dupe_eraser-benchmark-")
+    try:
+        if args.tree and os.path.isdir(root_dir) and os.listdir(root_dir):
+            logging.info(f"Benchmarking existing tree: {root_dir}")
+            tree_stats = None
+        else:
+            logging.info(f"Generating {args.files} files in {root_dir}")
+            tree_stats = tree.build(root_dir)
+            logging.info(
+                f"Generated {tree_stats['files']} files "
+                f"({humanize.naturalsize(tree_stats['bytes'])}), "
+                f"{tree_stats['duplicates']} duplicates, "
+                f"{tree_stats['near_copies']} near copies"
+            )
+
+        if args.startup:
+            from core.startup_benchmark import StartupBenchmark
+
+            benchmark = StartupBenchmark(root_dir, iterations=args.iterations)
+            results = benchmark.run(
+                args.scenarios.split(",") if args.scenarios else None
+            )
+        else:
+            benchmark = PipelineBenchmark(root_dir, iterations=args.iterations)
+            results = benchmark.run(algorithms, block_sizes, workers)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        logging.error(f"Benchmark failed: {e}")
+        return
+    finally:
+        if args.tree is None:
+            shutil.rmtree(root_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    if args.startup:
+        logging.info("\nStartup Benchmark Results:")
+        logging.info(StartupBenchmark.format_results(results))
+    else:
+        logging.info("\nPipeline Benchmark Results:")
+        logging.info(PipelineBenchmark.format_results(results, baseline))
+
+    if args.sample_file:
+        DuplicateRemover.print_benchmark_results(
+            DuplicateRemover.benchmark_hashes(args.sample_file, args.iterations)
+        )
+        DuplicateRemover.print_benchmark_results(
+            DuplicateRemover.benchmark_buffer_sizes(
+                args.sample_file, iterations=args.iterations
+            )
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "tree": {**vars(tree), "stats": tree_stats},
+                    "iterations": args.iterations,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        logging.info(f"Results saved to {args.output}")
+
+
 def main():
+    if sys.argv[1:2] == ["apply"]:
+        apply_plan(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["benchmark"]:
+        run_benchmark(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["shard"]:
+        run_shard(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["merge"]:
+        run_merge(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["analyze"]:
+        run_analyze(sys.argv[2:])
+        return
+
     args = parse_arguments()
 
     # Set up logging
@@ -72,18 +1233,87 @@ def main():
 
     logging.info(f"Scanning directory: {root_dir}")
 
+    remover = None
     try:
+        # Before any worker thread or process inherits the priorities
+        ProcessPriority.lower(args.nice, args.ionice, args.ionice_level)
         remover = DuplicateRemover(
             comparison_method=args.method,
             hash_algorithm=args.hash_algorithm,
+            perceptual_threshold=args.perceptual_threshold,
             show_progress=not args.disable_progress_bar,
             print_only=args.print_only,
+            cross_tree=args.cross_tree,
+            prefilter_kb=args.prefilter_kb,
+            prefilter_samples=args.prefilter_samples,
+            cache_path=args.cache,
+            workers=args.workers,
+            pool_kind=args.pool,
+            block_size=args.block_size_kb * 1024 if args.block_size_kb else None,
+            max_open_files=args.max_open_files,
+            scan_workers=args.scan_workers,
+            streaming=args.streaming,
+            scan_filter=ScanFilter(
+                include=args.include,
+                exclude=args.exclude,
+                exclude_dirs=args.exclude_dir
+                + (
+                    list(ScanFilter.DEFAULT_EXCLUDED_DIRS)
+                    if args.exclude_common_dirs
+                    else []
+                ),
+                min_size=args.min_size_kb * 1024,
+                max_size=(
+                    args.max_size_kb * 1024 if args.max_size_kb is not None else None
+                ),
+            ),
+            largest_first=args.largest_first,
+            keeper_policy=KeeperPolicy(args.keep, args.prefer_dir),
+            removal_batch=args.removal_batch,
+            action=args.action,
+            report_path=args.report,
+            checkpoint_path=(
+                args.checkpoint or Checkpoint.DEFAULT_PATH
+                if args.checkpoint or args.resume
+                else None
+            ),
+            resume=args.resume,
+            io_backend=args.io_backend,
+            queue_depth=args.queue_depth,
+            inject_latency=args.inject_latency_ms / 1000,
+            max_read_rate=(
+                args.max_read_mbps * 1e6 if args.max_read_mbps is not None else None
+            ),
+            max_iops=args.max_iops,
+            target_latency=(
+                args.target_latency_ms / 1000
+                if args.target_latency_ms is not None
+                else None
+            ),
         )
 
+        if args.metrics:
+            remover.metrics.start_export(
+                args.metrics, args.metrics_format, args.metrics_interval
+            )
+
         # Find and remove duplicates
-        deleted_files = remover.find_and_remove_duplicates(
-            root_dir,
-        )
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            deleted_files = remover.find_and_remove_duplicates(
+                root_dir, disable_progress=args.disable_progress_bar
+            )
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                logging.info(f"Profile saved to {args.profile}")
+
+        if args.metrics:
+            remover.metrics.stop_export()
+            remover.metrics.write(args.metrics, args.metrics_format)
 
         # Log summary
         logging.info("\nOperation completed!")
@@ -93,18 +1323,49 @@ def main():
         logging.info(
             f"Average processing speed: {remover.performance.avg_speed_mbps:.1f} MB/s"
         )
-        logging.info(f"Total duplicate files removed: {len(deleted_files)}")
+        if args.report:
+            logging.info(
+                f"Duplicate groups written to {args.report}: {remover.report.groups}"
+            )
+            logging.info(f"Total duplicate files planned: {len(deleted_files)}")
+        else:
+            logging.info(f"Total duplicate files removed: {len(deleted_files)}")
+        deleted_files.close()
+        if remover.hard_links_skipped:
+            logging.info(
+                f"Files skipped as existing hard links: {remover.hard_links_skipped}"
+            )
         logging.info(f"Total space saved: {humanize.naturalsize(remover.space_saved)}")
         logging.info(f"Total files processed: {remover.total_files_processed}")
         logging.info(
             f"Total data processed: "
             f"{humanize.naturalsize(remover.total_bytes_processed)}"
         )
+        if remover.hash_cache is not None:
+            logging.info(
+                f"Hash cache: {remover.hash_cache.hits} hits, "
+                f"{remover.hash_cache.misses} misses"
+            )
+        if remover.limiter is not None:
+            logging.info(
+                f"Time held back by I/O throttling: {remover.limiter.waited:.1f} s"
+            )
+        if remover.concurrency is not None:
+            logging.info(
+                f"Adaptive read concurrency: {remover.concurrency.limit} of "
+                f"{remover.concurrency.max_limit}, lowered "
+                f"{remover.concurrency.decreases} times"
+            )
+        remover.log_stage_stats()
+        remover.metrics.log_summary()
 
     except ValueError as e:
         logging.error(f"Configuration error: {e}")
     except Exception as e:
         logging.exception(f"An error occurred: {e}")
+    finally:
+        if remover is not None:
+            remover.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,70 @@
+import threading
+
+
+class AdaptiveConcurrency:
+    """Limit on concurrent requests adjusted to their observed latency.
+
+    The limit grows by about one request per round of requests completing
+    under the target latency, and is halved when a request takes longer.
+    Requests already in flight when the limit is halved cannot lower it
+    again, so one burst of slow requests only counts once. Dedup reads then
+    back off as soon as the storage slows down, whether from their own load
+    or from production traffic, and ramp up again once it recovers.
+    """
+
+    # Factor applied to the limit when requests are too slow
+    DECREASE = 0.5
+
+    def __init__(self, max_limit: int, target_latency: float, min_limit: int = 1):
+        """Initialize the limiter at its maximum.
+
+        Args:
+            max_limit: Maximum number of concurrent requests
+            target_latency: Request latency in seconds above which the limit
+                is lowered
+            min_limit: Minimum number of concurrent requests
+        """
+        if min_limit < 1 or max_limit < min_limit:
+            raise ValueError("Concurrency limits must satisfy 1 <= min <= max")
+        if target_latency <= 0:
+            raise ValueError("Target latency must be positive")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.target_latency = target_latency
+        self.decreases = 0
+        self._limit = float(max_limit)
+        self._in_flight = 0
+        # Requests issued under the previous limit, still to complete
+        self._cooldown = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent requests allowed."""
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        """Wait for a request slot."""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float) -> None:
+        """Free a request slot and adjust the limit.
+
+        Args:
+            latency: Seconds the request took
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if self._cooldown > 0:
+                self._cooldown -= 1
+            if latency > self.target_latency:
+                if self._cooldown == 0:
+                    self._limit = max(self.min_limit, self._limit * self.DECREASE)
+                    self._cooldown = self._in_flight
+                    self.decreases += 1
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
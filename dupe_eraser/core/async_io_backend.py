@@ -0,0 +1,171 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Union
+
+from core.io_backend import FeedJob, IOBackend
+
+
+class AsyncIOBackend(IOBackend):
+    """Backend keeping many read requests in flight across files.
+
+    Blocking requests of an underlying backend are run by asyncio on a
+    bounded thread pool, with at most queue_depth of them outstanding at
+    once. On network filesystems, where each request mostly waits on a round
+    trip, throughput then scales with the queue depth rather than being
+    capped at one block per round trip. Data is still handed over in order
+    for each file, on the calling thread. Every calling thread runs its own
+    event loop, so the backend can be shared by a pool of hashing threads.
+    """
+
+    # Blocks of one file read ahead of the one being consumed
+    READ_AHEAD = 4
+    native = False
+
+    def __init__(self, queue_depth: int = 32, base: Optional[IOBackend] = None):
+        """Initialize the backend.
+
+        Args:
+            queue_depth: Maximum number of outstanding read requests
+            base: Backend performing the actual requests, a plain IOBackend
+                by default
+        """
+        if queue_depth < 1:
+            raise ValueError("Queue depth must be at least 1")
+        self.queue_depth = queue_depth
+        self.base = base or IOBackend()
+        self._executor = ThreadPoolExecutor(
+            max_workers=queue_depth, thread_name_prefix="io"
+        )
+        self._local = threading.local()
+        self._loops = []
+        self._loops_lock = threading.Lock()
+
+    def open(self, filepath: str) -> int:
+        return self.base.open(filepath)
+
+    def close(self, fd: int) -> None:
+        self.base.close(fd)
+
+    def pread(self, fd: int, length: int, offset: int) -> bytes:
+        return self.base.pread(fd, length, offset)
+
+    def open_many(self, filepaths: List[str]) -> List[Union[int, OSError]]:
+        if len(filepaths) < 2:
+            return self.base.open_many(filepaths)
+        return self._run(self._open_many(filepaths))
+
+    def pread_many(
+        self, requests: List[Tuple[int, int, int]]
+    ) -> List[Union[bytes, OSError]]:
+        if len(requests) < 2:
+            return self.base.pread_many(requests)
+        return self._run(self._pread_many(requests))
+
+    def feed_many(self, jobs: List[FeedJob]) -> List[Optional[OSError]]:
+        if len(jobs) < 2 and not any(len(ranges) > 1 for _, ranges, _ in jobs):
+            return self.base.feed_many(jobs)
+        return self._run(self._feed_many(jobs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+        with self._loops_lock:
+            for loop in self._loops:
+                loop.close()
+            self._loops.clear()
+        self.base.shutdown()
+
+    def _run(self, coroutine):
+        """Run a coroutine to completion on the event loop of this thread."""
+        loop = getattr(self._local, "loop", None)
+        if loop is None:
+            loop = self._local.loop = asyncio.new_event_loop()
+            with self._loops_lock:
+                self._loops.append(loop)
+        return loop.run_until_complete(coroutine)
+
+    async def _open_many(self, filepaths: List[str]) -> List[Union[int, OSError]]:
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *(
+                loop.run_in_executor(self._executor, self.base.open, filepath)
+                for filepath in filepaths
+            ),
+            return_exceptions=True,
+        )
+
+    async def _pread_many(
+        self, requests: List[Tuple[int, int, int]]
+    ) -> List[Union[bytes, OSError]]:
+        slots = asyncio.Semaphore(self.queue_depth)
+        return await asyncio.gather(
+            *(self._pread(slots, *request) for request in requests),
+            return_exceptions=True,
+        )
+
+    async def _feed_many(self, jobs: List[FeedJob]) -> List[Optional[OSError]]:
+        slots = asyncio.Semaphore(self.queue_depth)
+        # Bound the open files as well: each one holds at least one request
+        files = asyncio.Semaphore(self.queue_depth)
+        results = await asyncio.gather(
+            *(self._feed(slots, files, *job) for job in jobs),
+            return_exceptions=True,
+        )
+        return [result if isinstance(result, OSError) else None for result in results]
+
+    async def _feed(
+        self,
+        slots: asyncio.Semaphore,
+        files: asyncio.Semaphore,
+        filepath: str,
+        ranges: List[Tuple[int, int]],
+        update: Callable[[bytes], object],
+    ) -> None:
+        async with files:
+            loop = asyncio.get_running_loop()
+            fd = await loop.run_in_executor(self._executor, self.base.open, filepath)
+            pending: deque = deque()
+            try:
+                for offset, length in ranges:
+                    pending.append(
+                        (length, asyncio.ensure_future(
+                            self._pread(slots, fd, length, offset)
+                        ))
+                    )
+                    if len(pending) < self.READ_AHEAD:
+                        continue
+                    if not self._consume(await self._next(pending), update):
+                        return
+                while pending:
+                    if not self._consume(await self._next(pending), update):
+                        return
+            finally:
+                for _, task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(
+                        *(task for _, task in pending), return_exceptions=True
+                    )
+                await loop.run_in_executor(self._executor, self.base.close, fd)
+
+    @staticmethod
+    async def _next(pending: deque) -> Tuple[int, bytes]:
+        length, task = pending.popleft()
+        return length, await task
+
+    @staticmethod
+    def _consume(block: Tuple[int, bytes], update: Callable[[bytes], object]) -> bool:
+        """Hand a block over, returning False once the end of file is reached."""
+        length, data = block
+        if data:
+            update(data)
+        return len(data) == length
+
+    async def _pread(
+        self, slots: asyncio.Semaphore, fd: int, length: int, offset: int
+    ) -> bytes:
+        async with slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.base.pread, fd, length, offset
+            )
@@ -0,0 +1,73 @@
+from typing import Any, List, Optional, Tuple
+
+
+class BKTree:
+    """Burkhard-Keller tree indexing integer hashes by Hamming distance.
+
+    Each node keeps its children keyed by their distance to it. Thanks to the
+    triangle inequality, a range query only descends into children whose key
+    lies within the searched radius of the query's distance to the node, so
+    small-radius lookups visit a small fraction of the tree.
+    """
+
+    def __init__(self):
+        """Initialize an empty tree."""
+        # A node is [hash value, item, {distance: child node}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def distance(a: int, b: int) -> int:
+        """Hamming distance between two integer hashes."""
+        return bin(a ^ b).count("1")
+
+    def add(self, value: int, item: Any) -> None:
+        """Insert a hash into the tree.
+
+        Args:
+            value: Integer hash value
+            item: Object returned by searches matching this hash
+        """
+        self._size += 1
+        if self._root is None:
+            self._root = [value, item, {}]
+            return
+
+        node = self._root
+        while True:
+            d = self.distance(value, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, item, {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """Find every hash within a Hamming distance of a value.
+
+        Args:
+            value: Integer hash value to search around
+            max_distance: Maximum Hamming distance, inclusive
+
+        Returns:
+            List of (distance, item) tuples sorted by distance
+        """
+        results = []
+        if self._root is None:
+            return results
+
+        stack = [self._root]
+        while stack:
+            node_value, item, children = stack.pop()
+            d = self.distance(value, node_value)
+            if d <= max_distance:
+                results.append((d, item))
+            for child_distance, child in children.items():
+                if d - max_distance <= child_distance <= d + max_distance:
+                    stack.append(child)
+
+        results.sort(key=lambda result: result[0])
+        return results
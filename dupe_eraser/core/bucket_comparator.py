@@ -0,0 +1,262 @@
+import logging
+import time
+import zlib
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from core.file_reader import FileReader
+
+
+class BucketComparator:
+    """N-way byte comparison of every file in a size bucket at once.
+
+    All files are read in lockstep, one block at a time. After each block the
+    candidate groups are split by block content and files left alone in their
+    group are dropped, so each file is read at most once and reading stops as
+    soon as a file is known to be unique. Blocks are matched to the groups
+    of a round by checksum, so a bucket of many differing files costs a
+    single comparison per file and block. Through an I/O backend other than
+    the plain one, the blocks of a round are requested for every remaining
+    file at once, which a concurrent backend overlaps.
+    """
+
+    def __init__(self, reader: FileReader, max_open_files: int = 256):
+        """Initialize the comparator.
+
+        Args:
+            reader: Read path providing block sizes and full reads
+            max_open_files: Maximum number of files kept open at once. Files
+                beyond the cap are reopened and seeked for every block.
+        """
+        if max_open_files < 1:
+            raise ValueError("Maximum number of open files must be at least 1")
+        self.reader = reader
+        self.max_open_files = max_open_files
+        self._io_time = 0.0
+
+    def group(
+        self,
+        files: List[str],
+        file_size: int,
+        progress: Optional[Callable[[int], object]] = None,
+    ) -> Tuple[List[List[str]], int]:
+        """Partition same-sized files into groups of byte-identical files.
+
+        Args:
+            files: Paths of files sharing the same size
+            file_size: Size of the files in bytes
+            progress: Optional callable receiving the number of bytes read
+
+        Returns:
+            Tuple of the groups holding at least two identical files, each in
+            the order the files were given, and the number of bytes read
+        """
+        start_time = time.perf_counter()
+        # Time spent opening and reading, told apart from comparing
+        self._io_time = 0.0
+        block_size = self.reader.block_size_for(file_size)
+        handles: Dict[str, BinaryIO] = {}
+        # Descriptors opened through a backend other than the plain one
+        fds: Dict[str, int] = {}
+        through_backend = not self.reader.backend.native
+        groups = [files] if len(files) > 1 else []
+        bytes_read = 0
+        offset = 0
+
+        try:
+            while groups and offset < file_size:
+                length = min(block_size, file_size - offset)
+                next_groups = []
+                blocks = (
+                    self._read_round(fds, groups, offset, length)
+                    if through_backend
+                    else None
+                )
+
+                for group in groups:
+                    # Each sub-group is represented by the block of its first
+                    # file, looked up by checksum so a round costs one
+                    # comparison per file however many sub-groups there are
+                    subgroups: Dict[int, List[Tuple[bytes, List[str]]]] = {}
+                    members_in_order: List[List[str]] = []
+                    buffer = bytearray(length)
+                    for filepath in group:
+                        if blocks is not None:
+                            block = blocks.get(filepath)
+                            if block is None:
+                                continue
+                        elif self._read_block(handles, filepath, offset, buffer):
+                            block = buffer
+                        else:
+                            continue
+                        bytes_read += length
+                        candidates = subgroups.setdefault(zlib.crc32(block), [])
+                        for reference, members in candidates:
+                            if reference == block:
+                                members.append(filepath)
+                                break
+                        else:
+                            members = [filepath]
+                            candidates.append((block, members))
+                            members_in_order.append(members)
+                            if block is buffer:
+                                buffer = bytearray(length)
+
+                    for members in members_in_order:
+                        if len(members) > 1:
+                            next_groups.append(members)
+                        else:
+                            self._close(handles, members[0])
+                            self._close_fd(fds, members[0])
+
+                if progress:
+                    progress(length * sum(len(group) for group in groups))
+                groups = next_groups
+                offset += length
+        finally:
+            for handle in handles.values():
+                handle.close()
+            for fd in fds.values():
+                self.reader.backend.close(fd)
+
+        if self.reader.metrics is not None:
+            self.reader.metrics.observe(
+                "compare", time.perf_counter() - start_time - self._io_time, bytes_read
+            )
+        return groups, bytes_read
+
+    def _read_block(
+        self,
+        handles: Dict[str, BinaryIO],
+        filepath: str,
+        offset: int,
+        buffer: bytearray,
+    ) -> bool:
+        """Read the block at offset of a file, keeping it open if under the cap."""
+        metrics = self.reader.metrics
+        try:
+            handle = handles.get(filepath)
+            if handle is None:
+                start_time = time.perf_counter()
+                handle = self.reader.open(filepath)
+                handle.seek(offset)
+                if metrics is not None:
+                    elapsed = time.perf_counter() - start_time
+                    self._io_time += elapsed
+                    metrics.observe("open", elapsed)
+                if len(handles) < self.max_open_files:
+                    handles[filepath] = handle
+                else:
+                    with handle:
+                        length = self._timed_read(handle, buffer)
+                    return self._check_length(filepath, length, len(buffer))
+
+            length = self._timed_read(handle, buffer)
+        except OSError as e:
+            logging.error(f"Error reading {filepath}: {e}")
+            self._close(handles, filepath)
+            return False
+
+        if not self._check_length(filepath, length, len(buffer)):
+            self._close(handles, filepath)
+            return False
+        return True
+
+    def _read_round(
+        self,
+        fds: Dict[str, int],
+        groups: List[List[str]],
+        offset: int,
+        length: int,
+    ) -> Dict[str, bytes]:
+        """Read the block at offset of every file through the backend.
+
+        Files still open from the previous round are read at once, then the
+        others in batches filling the descriptors left under the open file
+        cap, at least one file at a time. Files beyond the cap are closed as
+        soon as their block is read.
+
+        Returns:
+            Dictionary mapping the paths of the files read in full to their
+            block
+        """
+        backend = self.reader.backend
+        metrics = self.reader.metrics
+        files = [filepath for group in groups for filepath in group]
+        batch = [filepath for filepath in files if filepath in fds]
+        missing = [filepath for filepath in files if filepath not in fds]
+        opened = read = 0
+        open_time = read_time = 0.0
+
+        blocks = {}
+        while batch or missing:
+            start_time = time.perf_counter()
+            if not batch:
+                size = max(1, self.max_open_files - len(fds))
+                batch, missing = missing[:size], missing[size:]
+                for filepath, fd in zip(batch, backend.open_many(batch)):
+                    if isinstance(fd, OSError):
+                        logging.error(f"Error reading {filepath}: {fd}")
+                    else:
+                        fds[filepath] = fd
+                opened += len(batch)
+                batch = [filepath for filepath in batch if filepath in fds]
+            open_end = time.perf_counter()
+
+            results = backend.pread_many(
+                [(fds[filepath], length, offset) for filepath in batch]
+            )
+            read_end = time.perf_counter()
+            open_time += open_end - start_time
+            read_time += read_end - open_end
+            read += len(batch)
+
+            for filepath, data in zip(batch, results):
+                if isinstance(data, OSError):
+                    logging.error(f"Error reading {filepath}: {data}")
+                    self._close_fd(fds, filepath)
+                elif not self._check_length(filepath, len(data), length):
+                    self._close_fd(fds, filepath)
+                else:
+                    blocks[filepath] = data
+
+            # Keep the descriptors opened first, as the other handles do
+            for filepath in list(fds)[self.max_open_files :]:
+                self._close_fd(fds, filepath)
+            batch = []
+
+        self._io_time += open_time + read_time
+        if metrics is not None:
+            if opened:
+                metrics.observe("open", open_time, count=opened)
+            if read:
+                metrics.observe("read", read_time, length * len(blocks), count=read)
+        return blocks
+
+    def _close_fd(self, fds: Dict[str, int], filepath: str) -> None:
+        fd = fds.pop(filepath, None)
+        if fd is not None:
+            self.reader.backend.close(fd)
+
+    def _timed_read(self, handle: BinaryIO, buffer: bytearray) -> int:
+        metrics = self.reader.metrics
+        if metrics is None:
+            return self.reader.readinto_full(handle, memoryview(buffer))
+        start_time = time.perf_counter()
+        length = self.reader.readinto_full(handle, memoryview(buffer))
+        elapsed = time.perf_counter() - start_time
+        self._io_time += elapsed
+        metrics.observe("read", elapsed, length)
+        return length
+
+    @staticmethod
+    def _check_length(filepath: str, length: int, expected: int) -> bool:
+        if length != expected:
+            logging.warning(f"File changed size while comparing, skipping: {filepath}")
+            return False
+        return True
+
+    @staticmethod
+    def _close(handles: Dict[str, BinaryIO], filepath: str) -> None:
+        handle = handles.pop(filepath, None)
+        if handle is not None:
+            handle.close()
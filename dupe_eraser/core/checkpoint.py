@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+from core.file_entry import FileEntry
+
+
+class Checkpoint:
+    """Append-only state file letting an interrupted run resume.
+
+    The file is a JSON Lines log: a header describing the run, then one
+    record per completed digest, per directory listed or processed and per
+    size bucket processed, and a final record once the run completes.
+    Records are only ever appended through a buffered file flushed every few
+    seconds, so checkpointing never rewrites state on the hot path. A record
+    cut short by a crash is dropped when the log is read back.
+    """
+
+    DEFAULT_PATH = os.path.join(
+        os.path.expanduser("~"), ".cache", "dupe_eraser", "checkpoint.jsonl"
+    )
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        root_dir: str,
+        settings: dict,
+        resume: bool = False,
+        flush_interval: float = 5.0,
+    ):
+        """Open the state file, loading it when resuming.
+
+        A previous state is only resumed if it was written for the same
+        root directory and settings and the run it records did not finish;
+        otherwise a new state is started.
+
+        Args:
+            path: Path to the state file
+            root_dir: Root directory of the run
+            settings: Settings that must match for a state to be resumed
+            resume: Whether to pick up a previous state
+            flush_interval: Seconds between two flushes to disk
+        """
+        self.path = path
+        self.root_dir = root_dir
+        self.flush_interval = flush_interval
+        self.resumed = False
+        self.finished = False
+        # (device, inode, algorithm) -> (size, mtime_ns, digest)
+        self._digests: Dict[Tuple[int, int, str], Tuple[int, int, str]] = {}
+        # Listed or processed directories -> their subdirectories
+        self._dirs: Dict[str, List[str]] = {}
+        self._buckets: Set[int] = set()
+
+        header = {
+            "type": "header",
+            "version": self.VERSION,
+            "root": root_dir,
+            "settings": settings,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._last_flush = time.monotonic()
+        if resume and os.path.exists(path):
+            valid_length = self._load(header)
+            if self.resumed:
+                self._file = open(path, "r+b")
+                # Drop a record cut short by the interruption
+                self._file.truncate(valid_length)
+                self._file.seek(valid_length)
+                logging.info(
+                    f"Resuming from {path}: {len(self._dirs)} directories, "
+                    f"{len(self._buckets)} size groups and {len(self._digests)} "
+                    f"digests already done"
+                )
+            else:
+                logging.warning(
+                    f"No unfinished run with these settings in {path}, starting over"
+                )
+        if not self.resumed:
+            self._digests.clear()
+            self._dirs.clear()
+            self._buckets.clear()
+            self._file = open(path, "wb")
+            self._append(header)
+            self._file.flush()
+
+    def get(self, entry: FileEntry, algorithm: str) -> Optional[str]:
+        """Look up a digest completed before the interruption.
+
+        Args:
+            entry: Current stat record of the file
+            algorithm: Name of the hash algorithm
+
+        Returns:
+            The digest, or None if missing or the file changed since
+        """
+        record = self._digests.get((entry.device, entry.inode, algorithm))
+        if record is None or record[:2] != (entry.size, entry.mtime_ns):
+            return None
+        return record[2]
+
+    def put(self, entry: FileEntry, algorithm: str, digest: str) -> None:
+        """Record a completed digest.
+
+        Args:
+            entry: Stat record the digest was computed for
+            algorithm: Name of the hash algorithm
+            digest: Digest of the file
+        """
+        self._append(
+            {
+                "type": "digest",
+                "device": entry.device,
+                "inode": entry.inode,
+                "algorithm": algorithm,
+                "size": entry.size,
+                "mtime_ns": entry.mtime_ns,
+                "digest": digest,
+            }
+        )
+
+    def pending_dirs(self) -> List[str]:
+        """Directories still to be scanned, the root if nothing was recorded."""
+        if not self._dirs:
+            return [self.root_dir]
+        return [
+            subdir
+            for subdirs in self._dirs.values()
+            for subdir in subdirs
+            if subdir not in self._dirs
+        ]
+
+    def record_dir(
+        self,
+        dirpath: str,
+        subdirs: List[str],
+        entries: Optional[List[FileEntry]] = None,
+    ) -> None:
+        """Record that a directory was listed, or processed.
+
+        Args:
+            dirpath: Path to the directory
+            subdirs: Its subdirectories, still to be scanned on resume
+            entries: Its files, when the run needs them again on resume
+        """
+        record = {"type": "dir", "path": dirpath, "subdirs": subdirs}
+        if entries is not None:
+            record["files"] = [list(entry) for entry in entries]
+        self._dirs[dirpath] = subdirs
+        self._append(record)
+
+    def listed_dirs(self) -> Iterator[Tuple[str, List[FileEntry]]]:
+        """Read back the files of the directories recorded with their files.
+
+        Records are streamed from the state file rather than kept in memory.
+
+        Returns:
+            Iterator of (directory path, FileEntry records) tuples
+        """
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            for record in self._records(f):
+                if record["type"] == "dir" and "files" in record:
+                    yield record["path"], [
+                        FileEntry(*fields) for fields in record["files"]
+                    ]
+
+    def is_bucket_done(self, size: int) -> bool:
+        """Whether the size bucket was processed before the interruption."""
+        return size in self._buckets
+
+    def record_bucket(self, size: int) -> None:
+        """Record that a size bucket was processed."""
+        self._buckets.add(size)
+        self._append({"type": "bucket", "size": size})
+
+    def finish(self) -> None:
+        """Mark the run as complete, so it is not resumed, and close the file."""
+        self._append({"type": "finished"})
+        self.finished = True
+        self.close()
+
+    def close(self) -> None:
+        """Flush and close the state file."""
+        if not self._file.closed:
+            self._file.close()
+
+    def _append(self, record: dict) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def _load(self, header: dict) -> int:
+        """Load a previous state, returning the length of its valid part."""
+        with open(self.path, "rb") as f:
+            records = self._records(f)
+            first = next(records, None)
+            if first != header:
+                return 0
+            valid_length = f.tell()
+            for record in records:
+                kind = record["type"]
+                if kind == "digest":
+                    key = (record["device"], record["inode"], record["algorithm"])
+                    self._digests[key] = (
+                        record["size"],
+                        record["mtime_ns"],
+                        record["digest"],
+                    )
+                elif kind == "dir":
+                    self._dirs[record["path"]] = record["subdirs"]
+                elif kind == "bucket":
+                    self._buckets.add(record["size"])
+                elif kind == "finished":
+                    return 0
+                valid_length = f.tell()
+        self.resumed = True
+        return valid_length
+
+    @staticmethod
+    def _records(f: BinaryIO) -> Iterator[dict]:
+        """Decode records, stopping at a truncated or corrupt one."""
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                return
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return
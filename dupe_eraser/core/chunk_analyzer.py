@@ -0,0 +1,229 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import humanize
+from tabulate import tabulate
+
+from core.chunk_index import ChunkIndex
+from core.content_chunker import ContentChunker
+from core.file_entry import FileEntry
+from core.file_reader import FileReader
+from core.hash_backend import HashBackend
+from core.hash_registry import HashRegistry
+
+
+class ChunkAnalyzer:
+    """Estimate the space block-level dedup would reclaim across files.
+
+    Every file is split into content-defined chunks, each digested with a
+    regular content hash and recorded in a spillable chunk index. Reading
+    the index back by digest, the first occurrence of a chunk is the copy
+    kept, and every later occurrence is reclaimable. Its bytes are credited
+    to the pair formed by the file holding the kept copy and the file
+    repeating it, or to the file itself for a chunk repeated within one
+    file. Nothing is modified.
+    """
+
+    # Bytes of a file buffered before looking for chunk boundaries
+    WINDOW = 1024 * 1024
+    # Bytes of each digest kept in the chunk index
+    DIGEST_SIZE = 16
+
+    def __init__(
+        self,
+        reader: FileReader,
+        chunker: ContentChunker,
+        hash_algorithm: str = "xxh3_128",
+        memory_limit: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+        top_pairs: int = 20,
+    ):
+        """Initialize the analyzer.
+
+        Args:
+            reader: Reader streaming the content of files
+            chunker: Chunker finding the chunk boundaries
+            hash_algorithm: Name of a crypto or fast hash of the HashRegistry
+                digesting each chunk
+            memory_limit: Bytes of chunk records held in memory before they
+                are spilled to disk
+            spill_dir: Directory of the spilled chunk records, the system
+                temporary directory by default
+            top_pairs: Number of file pairs sharing the most bytes reported
+        """
+        if HashRegistry.kind(hash_algorithm) == HashRegistry.PERCEPTUAL:
+            raise ValueError("Chunks can only be digested with a content hash")
+        self.reader = reader
+        self.chunker = chunker
+        self.hash_algorithm = hash_algorithm
+        self.hash_func = HashRegistry.factory(hash_algorithm)
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.top_pairs = top_pairs
+
+    def analyze(
+        self,
+        files: Iterable[FileEntry],
+        progress: Optional[Callable[[int], object]] = None,
+    ) -> dict:
+        """Chunk every file and total the bytes shared between them.
+
+        Args:
+            files: Stat records of the files to analyze
+            progress: Optional callable receiving the number of bytes read
+
+        Returns:
+            Result record with the totals of the tree and the file pairs
+            sharing the most bytes
+        """
+        paths: List[str] = []
+        sizes: List[int] = []
+        inodes = set()
+        hard_links = 0
+        index = ChunkIndex(self.DIGEST_SIZE, self.memory_limit, self.spill_dir)
+        try:
+            for entry in files:
+                # Hard links share their blocks already
+                inode = (entry.device, entry.inode)
+                if inode in inodes:
+                    hard_links += 1
+                    continue
+                inodes.add(inode)
+                paths.append(entry.path)
+                sizes.append(entry.size)
+                try:
+                    self._chunk_file(entry, len(paths) - 1, index, progress)
+                except OSError as e:
+                    # Chunks read before the error still count
+                    logging.error(f"Error reading {entry.path}: {e}")
+
+            unique_chunks = 0
+            reclaimable = 0
+            within_files = 0
+            # (file id of the kept copies, file id repeating them) -> bytes
+            pairs: Dict[Tuple[int, int], int] = defaultdict(int)
+            for _, occurrences in index.groups():
+                unique_chunks += 1
+                kept, _ = occurrences[0]
+                for file_id, size in occurrences[1:]:
+                    reclaimable += size
+                    if file_id == kept:
+                        within_files += size
+                    else:
+                        pairs[(kept, file_id)] += size
+            chunks = index.chunks
+            spilled_runs = index.spilled_runs
+        finally:
+            index.close()
+
+        total_size = sum(sizes)
+        top = sorted(pairs.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "files": len(paths),
+            "bytes": total_size,
+            "hard_links_skipped": hard_links,
+            "chunks": chunks,
+            "unique_chunks": unique_chunks,
+            "average_chunk_size": total_size / chunks if chunks else 0,
+            "reclaimable_bytes": reclaimable,
+            "reclaimable_within_files": within_files,
+            "reclaimable_ratio": reclaimable / total_size if total_size else 0,
+            "file_pairs": len(pairs),
+            "spilled_runs": spilled_runs,
+            "top_pairs": [
+                {
+                    "kept": paths[kept],
+                    "repeating": paths[file_id],
+                    "shared_bytes": shared,
+                    "shared_ratio": shared / sizes[file_id],
+                }
+                for (kept, file_id), shared in top[: self.top_pairs]
+            ],
+        }
+
+    @staticmethod
+    def format_results(results: dict) -> str:
+        """Format results as tables.
+
+        Args:
+            results: Result record of an analysis
+
+        Returns:
+            str: The formatted totals and top file pairs
+        """
+        totals = tabulate(
+            [
+                ["Files", results["files"]],
+                ["Data", humanize.naturalsize(results["bytes"])],
+                [
+                    "Chunks",
+                    f"{results['chunks']} ({results['unique_chunks']} unique)",
+                ],
+                [
+                    "Average chunk size",
+                    humanize.naturalsize(results["average_chunk_size"]),
+                ],
+                [
+                    "Reclaimable by block-level dedup",
+                    f"{humanize.naturalsize(results['reclaimable_bytes'])} "
+                    f"({results['reclaimable_ratio']:.1%})",
+                ],
+                [
+                    "  of which within single files",
+                    humanize.naturalsize(results["reclaimable_within_files"]),
+                ],
+                ["File pairs sharing chunks", results["file_pairs"]],
+            ],
+            tablefmt="grid",
+        )
+        if not results["top_pairs"]:
+            return totals
+        pairs = tabulate(
+            [
+                [
+                    pair["kept"],
+                    pair["repeating"],
+                    humanize.naturalsize(pair["shared_bytes"]),
+                    f"{pair['shared_ratio']:.1%}",
+                ]
+                for pair in results["top_pairs"]
+            ],
+            headers=["Kept copy in", "Repeated in", "Shared", "Of repeating file"],
+            tablefmt="grid",
+        )
+        return f"{totals}\n{pairs}"
+
+    def _chunk_file(
+        self,
+        entry: FileEntry,
+        file_id: int,
+        index: ChunkIndex,
+        progress: Optional[Callable[[int], object]],
+    ) -> None:
+        """Stream a file through the chunker into the chunk index."""
+        chunker = self.chunker
+        hash_func = self.hash_func
+        # Data from the last boundary found on
+        pending = bytearray()
+
+        def add_chunks(final: bool) -> None:
+            cuts = chunker.cut_points(pending, final)
+            start = 0
+            with memoryview(pending) as view:
+                for end in cuts:
+                    hasher: HashBackend = hash_func()
+                    hasher.update(view[start:end])
+                    index.add(hasher.digest(), file_id, end - start)
+                    start = end
+            del pending[:start]
+
+        def update(data: memoryview) -> None:
+            # Memory-mapped files come in large blocks, split to bound memory
+            for offset in range(0, len(data), self.WINDOW):
+                pending.extend(data[offset : offset + self.WINDOW])
+                if len(pending) >= self.WINDOW:
+                    add_chunks(final=False)
+
+        self.reader.feed(entry.path, entry.size, update, progress)
+        add_chunks(final=True)
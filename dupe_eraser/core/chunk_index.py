@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import tempfile
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class ChunkIndex:
+    """Index of chunk digests spilling to disk past a memory budget.
+
+    Each chunk is recorded as a fixed-size packed record of its digest, the
+    id of its file and its length. Once the records in memory reach the
+    budget, they are sorted by digest and written out as a run to an
+    anonymous temporary file. Reading the index back merges the runs, so
+    occurrences of a digest come out together whatever the size of the
+    tree, using memory proportional to the number of runs only.
+    """
+
+    # Records read from each run at a time while merging
+    READ_BATCH = 65536
+
+    def __init__(
+        self,
+        digest_size: int,
+        memory_limit: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+    ):
+        """Initialize an empty index.
+
+        Args:
+            digest_size: Number of digest bytes recorded per chunk
+            memory_limit: Bytes of records held in memory before they are
+                spilled to disk
+            spill_dir: Directory of the spilled runs, the system temporary
+                directory by default
+        """
+        self.dtype = np.dtype(
+            [("digest", f"S{digest_size}"), ("file_id", "<u4"), ("size", "<u4")]
+        )
+        if memory_limit < self.dtype.itemsize:
+            raise ValueError("Chunk index memory limit is too small")
+        self.digest_size = digest_size
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.chunks = 0
+        self._records = bytearray()
+        self._runs: List[BinaryIO] = []
+
+    @property
+    def spilled_runs(self) -> int:
+        """Number of sorted runs written to disk so far."""
+        return len(self._runs)
+
+    def add(self, digest: bytes, file_id: int, size: int) -> None:
+        """Record a chunk.
+
+        Args:
+            digest: Digest of the chunk, truncated to digest_size bytes
+            file_id: Id of the file holding the chunk
+            size: Length of the chunk in bytes
+        """
+        self._records += digest[: self.digest_size]
+        self._records += file_id.to_bytes(4, "little")
+        self._records += size.to_bytes(4, "little")
+        self.chunks += 1
+        if len(self._records) >= self.memory_limit:
+            self._spill()
+
+    def groups(self) -> Iterator[Tuple[bytes, List[Tuple[int, int]]]]:
+        """Iterate over the distinct chunks.
+
+        Occurrences of a chunk are listed in the order they were added.
+
+        Returns:
+            Iterator of (digest, [(file id, size), ...]) tuples, by digest
+        """
+        runs = [self._read_run(run) for run in self._runs]
+        runs.append(self._sorted_records().tolist())
+        # Merging is stable, so earlier runs come first among equal digests
+        merged = heapq.merge(*runs, key=lambda record: record[0])
+        for digest, records in itertools.groupby(merged, key=lambda r: r[0]):
+            yield digest, [(file_id, size) for _, file_id, size in records]
+
+    def close(self) -> None:
+        """Delete the spilled runs."""
+        for run in self._runs:
+            run.close()
+        self._runs.clear()
+        self._records = bytearray()
+
+    def _sorted_records(self) -> np.ndarray:
+        records = np.frombuffer(self._records, dtype=self.dtype)
+        return records[np.argsort(records["digest"], kind="stable")]
+
+    def _spill(self) -> None:
+        run = tempfile.TemporaryFile(prefix="dupe_eraser-chunks-", dir=self.spill_dir)
+        self._sorted_records().tofile(run)
+        run.flush()
+        self._runs.append(run)
+        self._records = bytearray()
+
+    def _read_run(self, run: BinaryIO) -> Iterator[Tuple[bytes, int, int]]:
+        run.seek(0)
+        while True:
+            records = np.fromfile(run, dtype=self.dtype, count=self.READ_BATCH)
+            if not len(records):
+                return
+            yield from records.tolist()
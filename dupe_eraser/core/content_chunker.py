@@ -0,0 +1,117 @@
+from typing import List, Optional
+
+import numpy as np
+
+# Random 32-bit value of every byte, fixed so chunk boundaries are the same
+# from one run to the next
+_GEAR = np.random.default_rng(0x6765_6172).integers(
+    0, 2**32, size=256, dtype=np.uint32
+)
+
+
+class ContentChunker:
+    """FastCDC-style content-defined chunking with a vectorized gear hash.
+
+    A chunk ends where the gear hash of the bytes before it matches a mask,
+    so an insertion only moves the boundaries next to it and the rest of a
+    file still splits into the same chunks. As in FastCDC, boundaries are
+    never placed before min_size, a stricter mask applies before avg_size
+    and a looser one after it, which narrows the size distribution around
+    the average, and a boundary is forced at max_size.
+
+    The 32-bit gear hash of byte i covers the 32 bytes ending at i, and is
+    the sum of their gear values shifted by their distance to i. Summing
+    shifted copies of the gear values in log2(32) passes gives the hash of
+    every position of a buffer at once with NumPy, instead of one position
+    at a time in Python.
+    """
+
+    # Bytes covered by the gear hash of a position
+    WINDOW = 32
+
+    def __init__(
+        self,
+        avg_size: int = 8192,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+    ):
+        """Initialize the chunker.
+
+        Args:
+            avg_size: Target average chunk size in bytes, a power of two
+            min_size: Minimum chunk size in bytes, a quarter of avg_size by
+                default
+            max_size: Maximum chunk size in bytes, eight times avg_size by
+                default
+        """
+        if avg_size < 256 or avg_size & (avg_size - 1):
+            raise ValueError("Average chunk size must be a power of two >= 256")
+        self.avg_size = avg_size
+        self.min_size = min_size if min_size is not None else avg_size // 4
+        self.max_size = max_size if max_size is not None else avg_size * 8
+        if not self.WINDOW <= self.min_size <= avg_size <= self.max_size:
+            raise ValueError(
+                f"Chunk sizes must satisfy {self.WINDOW} <= min <= avg <= max"
+            )
+        # Normalized chunking: two more mask bits before the average size,
+        # two fewer after it
+        bits = avg_size.bit_length() - 1
+        self._mask_strict = self._high_bits(bits + 2)
+        self._mask_loose = self._high_bits(bits - 2)
+
+    def cut_points(self, data: bytes, final: bool = False) -> List[int]:
+        """Find the chunk boundaries of a buffer starting at a boundary.
+
+        Args:
+            data: Buffer to split
+            final: Whether the buffer ends the stream, its last chunk ending
+                at its end; otherwise only boundaries that no later data can
+                move are returned
+
+        Returns:
+            List of chunk end offsets, in increasing order
+        """
+        length = len(data)
+        if length == 0:
+            return []
+        hashes = self._gear_hashes(np.frombuffer(data, dtype=np.uint8))
+        # A position matching the mask ends a chunk right after it
+        strict = np.flatnonzero((hashes & self._mask_strict) == 0) + 1
+        loose = np.flatnonzero((hashes & self._mask_loose) == 0) + 1
+
+        cuts = []
+        start = 0
+        while length - start > self.min_size:
+            normal = start + self.avg_size
+            limit = start + self.max_size
+            i = np.searchsorted(strict, start + self.min_size + 1)
+            if i < len(strict) and strict[i] <= normal:
+                end = int(strict[i])
+            else:
+                i = np.searchsorted(loose, normal + 1)
+                if i < len(loose) and loose[i] <= limit:
+                    end = int(loose[i])
+                elif limit <= length:
+                    end = limit
+                else:
+                    break
+            cuts.append(end)
+            start = end
+
+        if final and start < length:
+            cuts.append(length)
+        return cuts
+
+    @staticmethod
+    def _high_bits(count: int) -> np.uint32:
+        """Mask of the highest bits, which cover the widest window."""
+        return np.uint32(((1 << count) - 1) << (32 - count))
+
+    def _gear_hashes(self, data: np.ndarray) -> np.ndarray:
+        hashes = _GEAR.take(data)
+        shift = 1
+        while shift < self.WINDOW:
+            # The shifted operand is computed in full before the sum
+            hashes[shift:] += hashes[:-shift] << np.uint32(shift)
+            shift *= 2
+        return hashes
@@ -0,0 +1,7 @@
+class DuplicateAction:
+    """Enum-like class for what happens to a duplicate once it is found."""
+
+    DELETE = "delete"
+    HARDLINK = "hardlink"
+    REFLINK = "reflink"
+    SYMLINK = "symlink"
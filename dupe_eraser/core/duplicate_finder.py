@@ -0,0 +1,198 @@
+import logging
+import os
+import stat
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+
+from core.comparison_method import ComparisonMethod
+from core.duplicate_group import DuplicateGroup
+from core.duplicate_remover import DuplicateRemover
+from core.file_entry import FileEntry
+from core.hash_registry import HashRegistry
+from core.io_backend_kind import IOBackendKind
+from core.keeper_policy import KeeperPolicy
+from core.metrics import Metrics
+from core.pool_kind import PoolKind
+from core.scan_filter import ScanFilter
+
+if TYPE_CHECKING:
+    from core.file_index import FileIndex
+
+# A file given to the finder, by path or by stat record
+FileSpec = Union[str, os.PathLike, FileEntry]
+
+
+class DuplicateFinder:
+    """Library entry point finding duplicate files without acting on them.
+
+    Files come from any iterable of paths or FileEntry records, or from a
+    scanned tree. Duplicate groups are yielded one size bucket at a time as
+    soon as they are confirmed, so a caller can handle the first groups while
+    later buckets are still being compared. Near-duplicate images are yielded
+    as pairs, each image paired with the kept image it is close to. Nothing
+    is deleted, reported or checkpointed: what to do with each group is up to
+    the caller.
+
+    Example:
+        with DuplicateFinder(hash_algorithm="blake3") as finder:
+            for group in finder.find_in_tree("/data"):
+                print(group.keeper.path, [e.path for e in group.duplicates])
+    """
+
+    def __init__(
+        self,
+        comparison_method: str = ComparisonMethod.HASH,
+        hash_algorithm: str = "xxh3_128",
+        perceptual_threshold: int = 5,
+        prefilter_kb: int = 16,
+        prefilter_samples: int = 3,
+        cache_path: Optional[str] = None,
+        workers: int = 1,
+        pool_kind: str = PoolKind.THREAD,
+        block_size: Optional[int] = None,
+        max_open_files: int = 256,
+        io_backend: str = IOBackendKind.SYNC,
+        queue_depth: int = 32,
+        scan_workers: int = 1,
+        scan_filter: Optional[ScanFilter] = None,
+        keeper_policy: Optional[KeeperPolicy] = None,
+        largest_first: bool = False,
+    ):
+        """Initialize the finder.
+
+        Args:
+            comparison_method: Method to use for file comparison (hash or bytes)
+            hash_algorithm: Name of a hash registered in the HashRegistry
+            perceptual_threshold: Maximum Hamming distance between the
+                perceptual hashes of two images considered near-duplicates
+            prefilter_kb: Size in KiB of each sample used to prune same-sized
+                candidates before a full read, or 0 to disable the prefilter
+            prefilter_samples: Number of interior samples taken in addition
+                to the head and tail of each file
+            cache_path: Path to a persistent hash cache reused across runs, or
+                None to always hash from scratch
+            workers: Number of workers digesting files concurrently
+            pool_kind: Worker backend, PoolKind.THREAD or PoolKind.PROCESS
+            block_size: Read block size in bytes, or None to pick one per file
+            max_open_files: Maximum number of files kept open at once while
+                comparing a size bucket byte by byte
+            io_backend: How files are read, one of the IOBackendKind values
+            queue_depth: Maximum number of outstanding reads of the async
+                I/O backend
+            scan_workers: Number of threads listing directories concurrently
+            scan_filter: Rules deciding which files and directories of a tree
+                are considered, or None to consider everything
+            keeper_policy: Rules choosing the file put first in each group,
+                or None to put the first file given first
+            largest_first: Yield the groups of the size buckets holding the
+                most reclaimable space first, instead of by increasing size
+        """
+        self.keeper_policy = keeper_policy or KeeperPolicy()
+        self.largest_first = largest_first
+        self.perceptual = (
+            comparison_method == ComparisonMethod.HASH
+            and HashRegistry.kind(hash_algorithm) == HashRegistry.PERCEPTUAL
+        )
+        self._engine = DuplicateRemover(
+            comparison_method=comparison_method,
+            hash_algorithm=hash_algorithm,
+            perceptual_threshold=perceptual_threshold,
+            show_progress=False,
+            prefilter_kb=prefilter_kb,
+            prefilter_samples=prefilter_samples,
+            cache_path=cache_path,
+            workers=workers,
+            pool_kind=pool_kind,
+            block_size=block_size,
+            max_open_files=max_open_files,
+            scan_workers=scan_workers,
+            io_backend=io_backend,
+            queue_depth=queue_depth,
+            scan_filter=scan_filter,
+            keeper_policy=self.keeper_policy,
+        )
+
+    @property
+    def stage_stats(self) -> dict:
+        """Candidates and bytes each pipeline stage saw, by stage name."""
+        return self._engine.stage_stats
+
+    @property
+    def metrics(self) -> Metrics:
+        """Per-operation timings of the reads and comparisons done so far."""
+        return self._engine.metrics
+
+    def find(self, files: Iterable[FileSpec]) -> Iterator[DuplicateGroup]:
+        """Find the duplicates among the given files.
+
+        Nothing is read until the first group is requested. Paths are
+        stat'ed once, without following symbolic links; anything but a
+        regular file is ignored. FileEntry records are trusted as they
+        are, so files already stat'ed cost no extra system call.
+
+        Args:
+            files: Paths or stat records of the files to compare
+
+        Returns:
+            Iterator of duplicate groups, keeper first in each
+        """
+        from core.file_index import FileIndex
+
+        index = FileIndex()
+        for spec in files:
+            entry = spec if isinstance(spec, FileEntry) else self._stat(spec)
+            if entry is not None:
+                index.add(entry)
+        yield from self._groups(index)
+
+    def find_in_tree(self, root_dir: str) -> Iterator[DuplicateGroup]:
+        """Find the duplicates anywhere under a directory tree.
+
+        Args:
+            root_dir: Root directory to scan
+
+        Returns:
+            Iterator of duplicate groups, keeper first in each
+        """
+        from core.file_index import FileIndex
+
+        index = FileIndex()
+        for dirpath, entries in self._engine.scanner.scan_dirs(
+            os.path.abspath(root_dir)
+        ):
+            index.add_dir(dirpath, entries)
+        yield from self._groups(index)
+
+    def close(self) -> None:
+        """Release resources such as the hash cache and worker pool."""
+        self._engine.close()
+
+    def __enter__(self) -> "DuplicateFinder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _groups(self, index: "FileIndex") -> Iterator[DuplicateGroup]:
+        if self.perceptual:
+            # Pairs are matched and ordered as the images are hashed
+            entries = (index.entry(i) for i in range(len(index)))
+            yield from self._engine.find_near_duplicate_images(entries)
+            return
+
+        for size, files in index.buckets(self.largest_first):
+            for group in self._engine.find_duplicates_in_size_groups(
+                [(size, files)]
+            ):
+                yield self.keeper_policy.order(group)
+
+    @staticmethod
+    def _stat(spec: Union[str, os.PathLike]) -> Optional[FileEntry]:
+        path = os.path.abspath(os.fspath(spec))
+        try:
+            st = os.lstat(path)
+        except OSError as e:
+            logging.error(f"Error reading {path}: {e}")
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return FileEntry.from_stat(path, st)
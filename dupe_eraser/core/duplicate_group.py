@@ -0,0 +1,22 @@
+from typing import List, NamedTuple, Optional
+
+from core.file_entry import FileEntry
+
+
+class DuplicateGroup(NamedTuple):
+    """Set of identical (or perceptually similar) files, keeper first."""
+
+    # Digest shared by the files, or None when they were compared byte by
+    # byte or clustered by perceptual distance
+    digest: Optional[str]
+    files: List[FileEntry]
+
+    @property
+    def keeper(self) -> FileEntry:
+        """File kept as the original."""
+        return self.files[0]
+
+    @property
+    def duplicates(self) -> List[FileEntry]:
+        """Files to get rid of."""
+        return self.files[1:]
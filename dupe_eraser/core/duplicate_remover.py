@@ -1,54 +1,63 @@
-import hashlib
+import itertools
 import logging
 import os
 import time
 from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
-import blake3
 import humanize
-import mmh3
-import xxhash
-from tqdm import tqdm
-from PIL import Image
-import imagehash
-from tabulate import tabulate
 
+from core.adaptive_concurrency import AdaptiveConcurrency
+from core.bk_tree import BKTree
+from core.bucket_comparator import BucketComparator
+from core.checkpoint import Checkpoint
 from core.comparison_method import ComparisonMethod
+from core.duplicate_action import DuplicateAction
+from core.duplicate_group import DuplicateGroup
+from core.duplicate_report import DuplicateReport
+from core.file_entry import FileEntry
+from core.file_reader import FileReader
+from core.file_replacer import FileReplacer
+from core.hash_backend import HashBackend
+from core.hash_cache import HashCache
 from core.hash_performance import HashPerformance
+from core.hash_pool import HashPool, hash_file
+from core.hash_registry import HashRegistry
+from core.metrics import Metrics
+from core.io_backend import IOBackend
+from core.io_backend_kind import IOBackendKind
+from core.keeper_policy import KeeperPolicy
+from core.latency_backend import LatencyBackend
+from core.pool_kind import PoolKind
+from core.rate_limiter import RateLimiter
+from core.removal_log import RemovalLog
+from core.sample_fingerprint import SampleFingerprinter
+from core.scan_filter import ScanFilter
+from core.scanner import Scanner
+from core.shard_index import ShardIndex
+from core.size_index import SizeIndex
+from core.stage_stats import StageStats
+from core.throttled_backend import ThrottledBackend
+
+# Modules pulling in NumPy, PIL or asyncio are imported where they are used,
+# keeping the startup of a plain scan short
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+    from core.file_index import FileIndex
 
 
 class DuplicateRemover:
-    # Cryptographic hash functions
-    CRYPTO_HASHES = {
-        "md5": hashlib.md5,
-        "sha1": hashlib.sha1,
-        "sha256": hashlib.sha256,
-        "sha512": hashlib.sha512,
-        "sha3_256": hashlib.sha3_256,
-        "sha3_512": hashlib.sha3_512,
-        "blake2b": hashlib.blake2b,
-        "blake2s": hashlib.blake2s,
-        "blake3": lambda: blake3.blake3(),
-    }
-
-    # Non-cryptographic hash functions (faster)
-    FAST_HASHES = {
-        "xxh32": lambda: xxhash.xxh32(),
-        "xxh64": lambda: xxhash.xxh64(),
-        "xxh3_64": lambda: xxhash.xxh3_64(),
-        "xxh3_128": lambda: xxhash.xxh3_128(),
-        "murmur3_32": lambda: mmh3,
-    }
-
-    # Perceptual hash functions for images
-    PERCEPTUAL_HASHES = {
-        "phash": imagehash.average_hash,
-        "dhash": imagehash.dhash,
-        "whash": imagehash.whash,
-        "colorhash": imagehash.colorhash,
-    }
-
     def __init__(
         self,
         comparison_method: str = ComparisonMethod.HASH,
@@ -57,6 +66,30 @@ class DuplicateRemover:
         perceptual_threshold: int = 5,  # Hamming distance threshold for perceptual hashes
         show_progress: bool = True,
         print_only: bool = False,
+        cross_tree: bool = False,
+        prefilter_kb: int = 16,
+        prefilter_samples: int = 3,
+        cache_path: Optional[str] = None,
+        workers: int = 1,
+        pool_kind: str = PoolKind.THREAD,
+        block_size: Optional[int] = None,
+        max_open_files: int = 256,
+        scan_workers: int = 1,
+        streaming: bool = False,
+        action: str = DuplicateAction.DELETE,
+        report_path: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        resume: bool = False,
+        io_backend: str = IOBackendKind.SYNC,
+        queue_depth: int = 32,
+        inject_latency: float = 0.0,
+        scan_filter: Optional[ScanFilter] = None,
+        largest_first: bool = False,
+        keeper_policy: Optional[KeeperPolicy] = None,
+        removal_batch: int = 1024,
+        max_read_rate: Optional[float] = None,
+        max_iops: Optional[float] = None,
+        target_latency: Optional[float] = None,
     ):
         """Initialize DuplicateRemover with configurable settings.
 
@@ -65,42 +98,148 @@ class DuplicateRemover:
             hash_algorithm: Hash algorithm to use for file comparison
             hash_progress_threshold_mb: Show hash progress for files larger than
                 this size in MB
-            perceptual_threshold: Hamming distance threshold for perceptual hashes
+            perceptual_threshold: Maximum Hamming distance between the
+                perceptual hashes of two images considered near-duplicates
+            cross_tree: Match duplicates across the whole tree instead of only
+                within each directory
+            prefilter_kb: Size in KiB of each sample used to prune same-sized
+                candidates before a full read, or 0 to disable the prefilter
+            prefilter_samples: Number of interior samples taken in addition
+                to the head and tail of each file
+            cache_path: Path to a persistent hash cache reused across runs, or
+                None to always hash from scratch
+            workers: Number of workers digesting files concurrently
+            pool_kind: Worker backend, PoolKind.THREAD or PoolKind.PROCESS
+            block_size: Read block size in bytes, or None to pick one per file
+                size and memory-map large files
+            max_open_files: Maximum number of files kept open at once while
+                comparing a size bucket byte by byte
+            scan_workers: Number of threads listing directories concurrently
+            streaming: Match duplicates across the whole tree while it is being
+                scanned, instead of after a full indexing pass
+            action: What to do with duplicates, one of the DuplicateAction
+                values
+            report_path: Path to a JSON Lines plan the duplicate groups are
+                written to instead of being acted on, or None to act on them
+                directly
+            checkpoint_path: Path to a state file periodically recording the
+                progress of the run, or None to disable checkpointing
+            resume: Pick up the run recorded in the state file where it
+                stopped
+            io_backend: How files are read, IOBackendKind.SYNC for one
+                request at a time or IOBackendKind.ASYNC for many outstanding
+                requests across files
+            queue_depth: Maximum number of outstanding read requests of the
+                async backend
+            inject_latency: Delay in seconds added to every open and read
+                request, to try the backends as if on a network filesystem
+            scan_filter: Rules deciding which files and directories are
+                scanned, or None to scan everything
+            largest_first: Process the size groups holding the most
+                reclaimable space first, instead of by increasing size
+            keeper_policy: Rules choosing the file kept in each duplicate
+                group, or None to keep the first file found
+            removal_batch: Number of removals queued before they are issued,
+                grouped by directory
+            max_read_rate: Maximum bytes read per second by hashing and
+                comparison, or None for no limit
+            max_iops: Maximum number of open, read, stat and removal requests
+                per second across all stages, or None for no limit
+            target_latency: Read latency in seconds above which fewer reads
+                are issued concurrently, or None to keep the concurrency fixed
         """
         self.comparison_method = comparison_method
         self.hash_algorithm = hash_algorithm
         self.perceptual_threshold = perceptual_threshold
         self.show_progress = show_progress
         self.print_only = print_only
+        self.cross_tree = cross_tree
+        self.streaming = streaming
+        self.largest_first = largest_first
+        self.keeper_policy = keeper_policy or KeeperPolicy()
+        if removal_batch < 1:
+            raise ValueError("Removal batch size must be at least 1")
+        self.removal_batch = removal_batch
+        # Duplicates waiting to be removed, with the path of their keeper
+        self._pending_removals: List[Tuple[FileEntry, str]] = []
+        # Checkpoint records only written once the pending removals are done
+        self._pending_records: List[Callable[[], None]] = []
 
         # Select appropriate hash function if using hash comparison
         if comparison_method == ComparisonMethod.HASH:
-            if hash_algorithm in self.CRYPTO_HASHES:
-                self.hash_func = self.CRYPTO_HASHES[hash_algorithm]
-                self.hash_type = "crypto"
-            elif hash_algorithm in self.FAST_HASHES:
-                self.hash_func = self.FAST_HASHES[hash_algorithm]
-                self.hash_type = "fast"
-            elif hash_algorithm in self.PERCEPTUAL_HASHES:
-                self.hash_func = self.PERCEPTUAL_HASHES[hash_algorithm]
-                self.hash_type = "perceptual"
-            else:
-                raise ValueError(
-                    f"Unsupported hash algorithm. Available options:\n"
-                    f"Cryptographic: {', '.join(self.CRYPTO_HASHES.keys())}\n"
-                    f"Fast: {', '.join(self.FAST_HASHES.keys())}\n"
-                    f"Perceptual: {', '.join(self.PERCEPTUAL_HASHES.keys())}"
-                )
+            self.hash_type = HashRegistry.kind(hash_algorithm)
+            # Perceptual hashes are computed by the ImageHasher, loaded below
+            if self.hash_type != HashRegistry.PERCEPTUAL:
+                self.hash_func = HashRegistry.factory(hash_algorithm)
 
         self.hash_threshold = hash_progress_threshold_mb * 1024 * 1024
         self.total_files_processed = 0
         self.total_bytes_processed = 0
         self.duplicates_found = 0
         self.space_saved = 0
+        self.hard_links_skipped = 0
+        # Digests found in the hash cache or checkpoint instead of computed
+        self.digests_reused = 0
         self.performance = HashPerformance(
             hash_algorithm if comparison_method == ComparisonMethod.HASH else "bytes"
         )
 
+        # Perceptually equal images rarely share bytes, so sampling would
+        # wrongly discard them
+        perceptual = (
+            comparison_method == ComparisonMethod.HASH
+            and self.hash_type == "perceptual"
+        )
+        self.fingerprinter = (
+            SampleFingerprinter(prefilter_kb, prefilter_samples)
+            if prefilter_kb > 0 and not perceptual
+            else None
+        )
+        self.stage_stats = {
+            name: StageStats(name) for name in ("size", "sample", "full")
+        }
+        self.hash_cache = HashCache(cache_path) if cache_path else None
+        self.image_hasher = None
+        if perceptual:
+            image_hasher = HashRegistry.factory(hash_algorithm)
+            self.image_hasher = image_hasher([hash_algorithm])
+        self.hash_pool = HashPool(workers, pool_kind)
+        self.metrics = Metrics()
+        self.limiter = (
+            RateLimiter(max_read_rate, max_iops, metrics=self.metrics)
+            if max_read_rate is not None or max_iops is not None
+            else None
+        )
+        self.concurrency = (
+            AdaptiveConcurrency(
+                queue_depth if io_backend == IOBackendKind.ASYNC else workers,
+                target_latency,
+            )
+            if target_latency is not None
+            else None
+        )
+        backend = IOBackend()
+        if inject_latency > 0:
+            backend = LatencyBackend(inject_latency, backend)
+        if self.limiter is not None or self.concurrency is not None:
+            # Under the async backend, so requests are limited as they are
+            # issued rather than as they are queued
+            backend = ThrottledBackend(self.limiter, self.concurrency, backend)
+        if io_backend == IOBackendKind.ASYNC:
+            from core.async_io_backend import AsyncIOBackend
+
+            backend = AsyncIOBackend(queue_depth, backend)
+        self.reader = FileReader(block_size, metrics=self.metrics, backend=backend)
+        self.comparator = BucketComparator(self.reader, max_open_files)
+        self.scan_filter = scan_filter
+        self.scanner = Scanner(scan_workers, self.metrics, scan_filter, self.limiter)
+        self.replacer = FileReplacer(action)
+        self.report_path = report_path
+        self.report: Optional[DuplicateReport] = None
+        self.checkpoint_path = checkpoint_path
+        self.resume = resume
+        self.checkpoint: Optional[Checkpoint] = None
+
     def compare_files_bytes(self, file1: str, file2: str, file_size: int) -> bool:
         """Compare two files byte by byte with progress bar for large files.
 
@@ -112,38 +251,51 @@ class DuplicateRemover:
         Returns:
             bool: True if files are identical
         """
-        chunk_size = 8192  # Larger chunk size for byte comparison
-        total_chunks = (file_size + chunk_size - 1) // chunk_size
-
         if file_size > self.hash_threshold:
-            with tqdm(
-                total=total_chunks,
+            with self._progress_bar(
+                total=file_size,
                 desc=f"Comparing {os.path.basename(file1)} and {os.path.basename(file2)}",
-                unit="chunk",
+                unit="B",
+                unit_scale=True,
                 colour="yellow",
                 leave=False,
                 disable=not self.show_progress,
             ) as pbar:
-                with open(file1, "rb") as f1, open(file2, "rb") as f2:
-                    while True:
-                        chunk1 = f1.read(chunk_size)
-                        chunk2 = f2.read(chunk_size)
-                        if chunk1 != chunk2:
-                            return False
-                        if not chunk1:  # EOF
-                            break
-                        pbar.update(1)
-        else:
-            with open(file1, "rb") as f1, open(file2, "rb") as f2:
-                while True:
-                    chunk1 = f1.read(chunk_size)
-                    chunk2 = f2.read(chunk_size)
-                    if chunk1 != chunk2:
-                        return False
-                    if not chunk1:  # EOF
-                        break
+                return self._compare_contents(file1, file2, file_size, pbar.update)
+        return self._compare_contents(file1, file2, file_size)
 
-        return True
+    def _compare_contents(
+        self,
+        file1: str,
+        file2: str,
+        file_size: int,
+        progress: Optional[Callable[[int], object]] = None,
+    ) -> bool:
+        """Compare two files block by block through reused buffers."""
+        if not self.reader.backend.native:
+            groups, _ = self.comparator.group([file1, file2], file_size, progress)
+            return bool(groups)
+
+        block_size = self.reader.block_size_for(file_size)
+        buffer1, buffer2 = bytearray(block_size), bytearray(block_size)
+
+        with self.reader.open(file1) as f1, self.reader.open(file2) as f2:
+            blocks1 = self.reader.read_blocks(f1, buffer1)
+            blocks2 = self.reader.read_blocks(f2, buffer2)
+            for length1 in blocks1:
+                length2 = next(blocks2, 0)
+                if length1 != length2:
+                    return False
+                # Comparing whole bytearrays is a memcmp; only the last
+                # partial block needs slicing
+                if length1 == block_size:
+                    if buffer1 != buffer2:
+                        return False
+                elif buffer1[:length1] != buffer2[:length2]:
+                    return False
+                if progress:
+                    progress(length1)
+            return next(blocks2, None) is None
 
     def are_files_equal(self, file1: str, file2: str, file_size: int) -> bool:
         """Compare two files using the selected comparison method.
@@ -164,69 +316,484 @@ class DuplicateRemover:
             return hash1 == hash2
 
     def group_files_by_size(
-        self, dirpath: str, filenames: List[str]
-    ) -> Dict[int, List[str]]:
+        self, entries: Iterable[FileEntry]
+    ) -> Dict[int, List[FileEntry]]:
         """Group files by size for initial quick comparison.
 
         Args:
-            dirpath: Directory path
-            filenames: List of filenames
+            entries: Stat records of the files
 
         Returns:
-            Dictionary mapping file sizes to lists of file paths
+            Dictionary mapping file sizes to lists of file entries
         """
         size_groups = defaultdict(list)
-        for filename in filenames:
-            filepath = os.path.join(dirpath, filename)
-            if os.path.isfile(filepath):
-                try:
-                    file_size = os.path.getsize(filepath)
-                    size_groups[file_size].append(filepath)
-                except OSError:
-                    continue
+        for entry in entries:
+            size_groups[entry.size].append(entry)
         return size_groups
 
-    def find_duplicates_in_dir(
-        self, dirpath: str, filenames: List[str]
-    ) -> Dict[str, List[Tuple[str, int]]]:
+    def find_duplicates_in_dir(self, entries: List[FileEntry]) -> List[DuplicateGroup]:
         """Find duplicate files within a directory.
 
         Args:
-            dirpath: Directory path
-            filenames: List of filenames
+            entries: Stat records of the files in the directory
 
         Returns:
-            Dictionary mapping file identifiers to lists of duplicate files
+            List of duplicate groups, the original first in each
         """
         # First group by size
-        size_groups = self.group_files_by_size(dirpath, filenames)
+        size_groups = self.group_files_by_size(entries)
+        self.stage_stats["size"].record(
+            len(entries),
+            sum(len(files) for files in size_groups.values() if len(files) > 1),
+            bytes_skipped=sum(
+                size for size, files in size_groups.items() if len(files) == 1
+            ),
+        )
 
         # Then compare files of the same size
-        duplicates = defaultdict(list)
-        for size, files in size_groups.items():
-            if len(files) > 1:
-                # Use first file as reference
-                reference = files[0]
-                duplicates[reference].append((reference, size))
+        buckets = size_groups.items()
+        if self.largest_first:
+            buckets = sorted(
+                buckets,
+                key=lambda bucket: bucket[0] * (len(bucket[1]) - 1),
+                reverse=True,
+            )
+        return self.find_duplicates_in_size_groups(buckets)
+
+    def find_duplicates_in_size_groups(
+        self, size_groups: Iterable[Tuple[int, List[FileEntry]]]
+    ) -> List[DuplicateGroup]:
+        """Find duplicate files among groups of same-sized files.
+
+        Args:
+            size_groups: Iterable of (size, file entries) tuples
+
+        Returns:
+            List of duplicate groups, the original first in each
+        """
+        duplicates = []
+        for size, files in size_groups:
+            files = self._skip_hard_links(files)
+            if len(files) < 2:
+                continue
+
+            for candidates in self._prefilter(files, size):
+                duplicates.extend(self.group_duplicates(candidates, size))
+
+        return duplicates
 
-                # Compare others to reference
-                for other in files[1:]:
-                    if self.are_files_equal(reference, other, size):
-                        duplicates[reference].append((other, size))
+    def _skip_hard_links(self, files: List[FileEntry]) -> List[FileEntry]:
+        """Drop files that are hard links to an inode already in the list."""
+        inodes = set()
+        unique = []
+        for entry in files:
+            inode = (entry.device, entry.inode)
+            if inode in inodes:
+                self.hard_links_skipped += 1
+                continue
+            inodes.add(inode)
+            unique.append(entry)
+        return unique
+
+    def group_duplicates(
+        self, files: List[FileEntry], size: int
+    ) -> List[DuplicateGroup]:
+        """Partition same-sized files into groups of identical files.
 
-        return {ref: dups for ref, dups in duplicates.items() if len(dups) > 1}
+        Args:
+            files: Stat records of files sharing the same size
+            size: Size of the files in bytes
+
+        Returns:
+            List of groups holding at least two identical files, each in the
+            order the files were given so the first one is kept as original
+        """
+        if self.comparison_method == ComparisonMethod.BYTES:
+            groups, bytes_read = self._group_by_bytes(files, size)
+            bytes_reused = 0
+        else:
+            reused = self.digests_reused
+            groups = self._group_by_hash(files, size)
+            bytes_reused = (self.digests_reused - reused) * size
+            bytes_read = len(files) * size - bytes_reused
+
+        self.stage_stats["full"].record(
+            len(files),
+            sum(len(group.files) for group in groups),
+            bytes_read=bytes_read,
+            bytes_skipped=bytes_reused,
+        )
+        return groups
+
+    def _group_by_hash(
+        self, files: List[FileEntry], size: int
+    ) -> List[DuplicateGroup]:
+        """Bucket files by digest, hashing each file exactly once."""
+        digests = self._hash_digests(files, size)
+
+        groups = defaultdict(list)
+        for entry, digest in zip(files, digests):
+            # Perceptual hashing marks unusable files instead of hashing them
+            if digest is None or digest in ("non_image", "invalid_image"):
+                continue
+            groups[digest].append(entry)
+
+        duplicates = [
+            DuplicateGroup(digest, group)
+            for digest, group in groups.items()
+            if len(group) > 1
+        ]
+        return duplicates
+
+    def _hash_digests(
+        self, files: List[FileEntry], size: int
+    ) -> List[Optional[str]]:
+        """Digest same-sized files with the configured hash algorithm."""
+        if self.hash_pool.kind == PoolKind.PROCESS and self.hash_pool.is_parallel:
+            # Workers record their own timings, so time the batch instead
+            start_time = time.time()
+            digests = self._digest_files(
+                files,
+                self.hash_algorithm,
+                partial(hash_file, self.hash_algorithm, self.reader.block_size),
+            )
+            elapsed_time = time.time() - start_time
+            self.performance.record(elapsed_time, len(files) * size)
+            # Worker processes read and hash files out of reach of the metrics
+            self.metrics.observe(
+                "hash", elapsed_time, len(files) * size, count=len(files)
+            )
+        elif (
+            self.reader.backend.is_concurrent
+            and self.hash_type != "perceptual"
+            and len(files) > 1
+        ):
+            digests = self._digest_files(
+                files,
+                self.hash_algorithm,
+                self._compute_file_hash,
+                self._hash_files_concurrently,
+            )
+        else:
+            digests = self._digest_files(
+                files, self.hash_algorithm, self._compute_file_hash
+            )
+        return digests
+
+    def _group_by_bytes(
+        self, files: List[FileEntry], size: int
+    ) -> Tuple[List[DuplicateGroup], int]:
+        """Split files into byte-identical groups, reading each file once."""
+        paths = [entry.path for entry in files]
+        if size * len(files) > self.hash_threshold:
+            with self._progress_bar(
+                total=size * len(files),
+                desc=f"Comparing {len(files)} files of {humanize.naturalsize(size)}",
+                unit="B",
+                unit_scale=True,
+                colour="yellow",
+                leave=False,
+                disable=not self.show_progress,
+            ) as pbar:
+                groups, bytes_read = self.comparator.group(paths, size, pbar.update)
+        else:
+            groups, bytes_read = self.comparator.group(paths, size)
+
+        entries = {entry.path: entry for entry in files}
+        duplicates = [
+            DuplicateGroup(None, [entries[path] for path in group]) for group in groups
+        ]
+        return duplicates, bytes_read
+
+    def _prefilter(
+        self, files: List[FileEntry], size: int
+    ) -> List[List[FileEntry]]:
+        """Split same-sized files by sample fingerprint, dropping singletons.
+
+        Args:
+            files: Stat records of files sharing the same size
+            size: Size of the files in bytes
+
+        Returns:
+            List of candidate groups that still need a full comparison
+        """
+        if self.fingerprinter is None or not self.fingerprinter.is_worthwhile(size):
+            return [files]
+
+        reused = self.digests_reused
+        fingerprints = self._sample_digests(files)
+        reused = self.digests_reused - reused
+
+        groups = defaultdict(list)
+        for entry, fingerprint in zip(files, fingerprints):
+            if fingerprint is not None:
+                groups[fingerprint].append(entry)
+
+        candidates = [group for group in groups.values() if len(group) > 1]
+        survivors = sum(len(group) for group in candidates)
+        bytes_per_file = self.fingerprinter.bytes_per_file
+        self.stage_stats["sample"].record(
+            len(files),
+            survivors,
+            bytes_read=(len(files) - reused) * bytes_per_file,
+            bytes_skipped=(len(files) - survivors) * size + reused * bytes_per_file,
+        )
+        return candidates
+
+    def _sample_digests(self, files: List[FileEntry]) -> List[Optional[str]]:
+        """Get the sample fingerprints of same-sized files."""
+        return self._digest_files(
+            files,
+            f"sample_{self.fingerprinter.sample_size}"
+            f"x{self.fingerprinter.sample_count}",
+            self.fingerprinter.fingerprint,
+            self._fingerprint_many(),
+        )
+
+    def _fingerprint_many(
+        self,
+    ) -> Optional[Callable[[List[str], List[int]], List[Optional[str]]]]:
+        """Get the function fingerprinting files through the I/O backend, if
+        they are not read directly."""
+        backend = self.reader.backend
+        # Samples are too small for the native read paths to matter, so
+        # throttled samples are simply read through the backend
+        if backend.native and not backend.throttled:
+            return None
+
+        def fingerprint_many(
+            filepaths: List[str], file_sizes: List[int]
+        ) -> List[Optional[str]]:
+            # Files are digested one size bucket at a time
+            return self.fingerprinter.fingerprint_many(
+                filepaths, file_sizes[0], backend
+            )
+
+        return fingerprint_many
+
+    def build_file_index(self, root_dir: str) -> "FileIndex":
+        """Index every file under a directory tree in a single pass.
+
+        When checkpointing, every directory listing is recorded, and a resumed
+        run reloads the recorded listings and only scans the rest of the tree.
+
+        Args:
+            root_dir: Root directory to scan
+
+        Returns:
+            FileIndex covering all regular files under root_dir
+        """
+        from core.file_index import FileIndex
+
+        index = FileIndex()
+        if self.checkpoint is None:
+            for dirpath, entries in self.scanner.scan_dirs(root_dir):
+                index.add_dir(dirpath, entries)
+            return index
+
+        for dirpath, entries in self.checkpoint.listed_dirs():
+            index.add_dir(dirpath, entries)
+        for dirpath, entries, subdirs in self.scanner.walk(
+            self.checkpoint.pending_dirs()
+        ):
+            index.add_dir(dirpath, entries)
+            self.checkpoint.record_dir(dirpath, subdirs, entries)
+        return index
+
+    @property
+    def shard_settings(self) -> dict:
+        """Settings every shard merged together must share."""
+        return {
+            "algorithm": self.hash_algorithm,
+            "prefilter_kb": (
+                self.fingerprinter.sample_size // 1024
+                if self.fingerprinter is not None
+                else 0
+            ),
+            "prefilter_samples": (
+                self.fingerprinter.sample_count
+                if self.fingerprinter is not None
+                else 0
+            ),
+        }
+
+    def write_shard_index(
+        self, roots: List[str], index_path: str, shard: str
+    ) -> ShardIndex:
+        """Scan the roots of a shard into a new partial index.
+
+        Only stat records are written: nothing is read until a merge of
+        all the shards asks for it.
+
+        Args:
+            roots: Directories the shard is made of
+            index_path: Path to the index file, overwritten if it exists
+            shard: Name of the shard
+
+        Returns:
+            ShardIndex written, already closed
+        """
+        if (
+            self.comparison_method != ComparisonMethod.HASH
+            or self.hash_type == HashRegistry.PERCEPTUAL
+        ):
+            raise ValueError("Shards can only be matched by exact content hash")
+
+        index = ShardIndex.create(index_path, shard, roots, self.shard_settings)
+        try:
+            for root_dir in roots:
+                for entry in self.scanner.scan(root_dir):
+                    index.add(entry)
+        finally:
+            index.close()
+        return index
+
+    def answer_shard_requests(
+        self, requests_path: str, index_path: str
+    ) -> Tuple[int, int]:
+        """Fingerprint or hash the files a merge asked a shard about.
+
+        Answers are appended to the shard's index. Files that changed since
+        the shard was scanned are dropped from the index instead, the merge
+        no longer considering them.
+
+        Args:
+            requests_path: Path to the requests file written by the merge
+            index_path: Path to the index of the shard
+
+        Returns:
+            Tuple of the number of files answered and dropped
+        """
+        records = ShardIndex.read_requests(requests_path)
+        header = next(records)
+        index = ShardIndex.append_to(index_path)
+        if header["shard"] != index.header["shard"]:
+            index.close()
+            raise ValueError(
+                f"{requests_path} is for shard '{header['shard']}', "
+                f"not '{index.header['shard']}'"
+            )
+        if index.header["settings"] != self.shard_settings:
+            index.close()
+            raise ValueError(
+                f"Shard '{header['shard']}' was scanned with settings "
+                f"{index.header['settings']}, not {self.shard_settings}"
+            )
+
+        answered = dropped = 0
+        try:
+            # Files are digested one size bucket at a time
+            buckets: Dict[Tuple[str, int], List[FileEntry]] = defaultdict(list)
+            for request in records:
+                try:
+                    st = os.stat(request["path"], follow_symlinks=False)
+                except OSError:
+                    st = None
+                if (
+                    st is None
+                    or st.st_size != request["size"]
+                    or st.st_mtime_ns != request["mtime_ns"]
+                ):
+                    index.remove(request["path"])
+                    dropped += 1
+                    continue
+                entry = FileEntry.from_stat(request["path"], st)
+                buckets[(request["need"], entry.size)].append(entry)
+
+            for (need, size), files in buckets.items():
+                if need == ShardIndex.SAMPLE:
+                    digests = self._sample_digests(files)
+                    bytes_read = self.fingerprinter.bytes_per_file
+                else:
+                    digests = self._hash_digests(files, size)
+                    bytes_read = size
+                for entry, digest in zip(files, digests):
+                    if digest is None:
+                        index.remove(entry.path)
+                        dropped += 1
+                    else:
+                        index.answer(entry.path, need, digest)
+                        answered += 1
+                self.total_files_processed += len(files)
+                self.total_bytes_processed += len(files) * bytes_read
+        finally:
+            index.close()
+        return answered, dropped
 
     def find_and_remove_duplicates(
         self, root_dir: str, disable_progress: bool = False
-    ) -> Dict[str, str]:
+    ) -> RemovalLog:
         """Recursively scan directories and remove duplicate files."""
-        deleted_files = {}
+        if self.report_path is not None and self.report is None:
+            self.report = DuplicateReport(
+                self.report_path,
+                root_dir,
+                self.comparison_method,
+                (
+                    self.hash_algorithm
+                    if self.comparison_method == ComparisonMethod.HASH
+                    else None
+                ),
+                self.replacer.action,
+            )
+            logging.info(f"Writing duplicate plan to {self.report_path}")
+
+        if (
+            self.comparison_method == ComparisonMethod.HASH
+            and self.hash_type == "perceptual"
+        ):
+            mode = "perceptual"
+            run = self._find_and_remove_near_duplicates
+        elif self.streaming:
+            mode = "streaming"
+            run = self._find_and_remove_duplicates_streaming
+        elif self.cross_tree:
+            mode = "cross_tree"
+            run = self._find_and_remove_duplicates_across_tree
+        else:
+            mode = "per_dir"
+            run = self._find_and_remove_duplicates_per_dir
+
+        if self.checkpoint_path is not None and self.checkpoint is None:
+            self.checkpoint = Checkpoint(
+                self.checkpoint_path,
+                root_dir,
+                {
+                    "mode": mode,
+                    "method": self.comparison_method,
+                    "algorithm": self.hash_algorithm,
+                    "prefilter": (
+                        [
+                            self.fingerprinter.sample_size,
+                            self.fingerprinter.sample_count,
+                        ]
+                        if self.fingerprinter is not None
+                        else None
+                    ),
+                    "filter": (
+                        self.scan_filter.settings()
+                        if self.scan_filter is not None
+                        else None
+                    ),
+                },
+                resume=self.resume,
+            )
 
-        logging.info("Calculating total files and size...")
-        total_files, total_size = self.count_files_and_size(root_dir)
-        logging.info(
-            f"Found {total_files} files (Total size: {humanize.naturalsize(total_size)})"
-        )
+        deleted_files = run(root_dir, disable_progress)
+        self._flush_removals(deleted_files)
+        if self.checkpoint is not None:
+            self.checkpoint.finish()
+        return deleted_files
+
+    def _find_and_remove_duplicates_per_dir(
+        self, root_dir: str, disable_progress: bool = False
+    ) -> RemovalLog:
+        """Remove duplicates within each directory as it is scanned.
+
+        When checkpointing, each directory is recorded once processed, and a
+        resumed run only scans the directories not processed yet.
+        """
+        deleted_files = RemovalLog()
 
         method_str = (
             "byte-by-byte comparison"
@@ -235,9 +802,11 @@ class DuplicateRemover:
         )
         logging.info(f"Using {method_str} for file comparison")
 
+        # Directories are processed as they are scanned, so the total is an
+        # estimate refined as the scan goes
         if not disable_progress:
-            progress_bar = tqdm(
-                total=total_files,
+            progress_bar = self._progress_bar(
+                total=0,
                 desc="Processing files",
                 unit="file",
                 colour="green",
@@ -246,42 +815,554 @@ class DuplicateRemover:
         else:
             progress_bar = None
 
-        for dirpath, _, filenames in os.walk(root_dir):
-            if not filenames:
-                continue
+        start_dirs = [root_dir]
+        if self.checkpoint is not None:
+            start_dirs = self.checkpoint.pending_dirs()
+        for dirpath, entries, subdirs in self.scanner.walk(start_dirs):
+            if entries:
+                duplicates = self.find_duplicates_in_dir(entries)
+                self._remove_duplicates(duplicates, deleted_files)
+
+                self.total_files_processed += len(entries)
+                self.total_bytes_processed += sum(entry.size for entry in entries)
+                if progress_bar is not None:
+                    self._update_estimated_progress(progress_bar, len(entries))
+
+            if self.checkpoint is not None:
+                self._after_removals(
+                    partial(self.checkpoint.record_dir, dirpath, subdirs)
+                )
 
-            duplicates = self.find_duplicates_in_dir(dirpath, filenames)
-
-            for original, duplicate_list in duplicates.items():
-                for filepath, size in duplicate_list[1:]:
-                    try:
-                        if not self.print_only:
-                            os.remove(filepath)
-                        deleted_files[filepath] = original
-                        self.space_saved += size
-                        self.duplicates_found += 1
-                        logging.info(
-                            f"Deleted duplicate: {filepath} ({humanize.naturalsize(size)})"
-                        )
-                    except OSError as e:
-                        logging.error(f"Error deleting {filepath}: {e}")
+        if progress_bar is not None:
+            progress_bar.close()
+
+        if self.hash_cache is not None:
+            self.hash_cache.evict_missing(root_dir)
+
+        return deleted_files
+
+    def _find_and_remove_duplicates_across_tree(
+        self, root_dir: str, disable_progress: bool = False
+    ) -> RemovalLog:
+        """Remove duplicates matched across the whole tree using a file index."""
+        deleted_files = RemovalLog()
+
+        logging.info("Indexing files by size...")
+        index = self.build_file_index(root_dir)
+        candidate_files = index.candidate_files
+        self.stage_stats["size"].record(
+            index.total_files,
+            candidate_files,
+            bytes_skipped=index.total_size - index.candidate_size,
+        )
+        logging.info(
+            f"Found {index.total_files} files "
+            f"(Total size: {humanize.naturalsize(index.total_size)}), "
+            f"{candidate_files} sharing their size with another file"
+        )
+
+        method_str = (
+            "byte-by-byte comparison"
+            if self.comparison_method == ComparisonMethod.BYTES
+            else f"{self.hash_algorithm} hashing"
+        )
+        logging.info(f"Using {method_str} for file comparison")
+
+        # Files with a unique size cannot have duplicates
+        self.total_files_processed += index.total_files - candidate_files
+        self.total_bytes_processed += index.total_size - index.candidate_size
+
+        if not disable_progress:
+            progress_bar = self._progress_bar(
+                total=candidate_files,
+                desc="Processing size groups",
+                unit="file",
+                colour="green",
+                postfix=self._get_progress_stats(),
+            )
+        else:
+            progress_bar = None
 
+        for size, files in index.buckets(self.largest_first):
+            if self.checkpoint is None or not self.checkpoint.is_bucket_done(size):
+                duplicates = self.find_duplicates_in_size_groups([(size, files)])
+                self._remove_duplicates(duplicates, deleted_files)
+                if self.checkpoint is not None:
+                    self._after_removals(
+                        partial(self.checkpoint.record_bucket, size)
+                    )
+
+            self.total_files_processed += len(files)
+            self.total_bytes_processed += size * len(files)
             if progress_bar:
-                self.total_files_processed += len(filenames)
-                progress_bar.update(len(filenames))
+                progress_bar.update(len(files))
                 progress_bar.set_postfix(**self._get_progress_stats())
 
         if progress_bar:
             progress_bar.close()
 
+        if self.hash_cache is not None:
+            self.hash_cache.evict_missing(root_dir)
+
+        return deleted_files
+
+    def _find_and_remove_duplicates_streaming(
+        self, root_dir: str, disable_progress: bool = False
+    ) -> RemovalLog:
+        """Remove duplicates across the tree as soon as they are confirmed.
+
+        Scanned files are fed into the size index directly. A file is only
+        fingerprinted once another file of its size has been seen, and only
+        fully hashed once another file shares its fingerprint, so duplicates
+        are found and removed while the scan is still running.
+        """
+        deleted_files = RemovalLog()
+        index = SizeIndex()
+        # Files seen so far for each (size, sample fingerprint)
+        fingerprints: Dict[Tuple[int, str], List[FileEntry]] = {}
+        # Originals, with their number of copies, for each (size, fingerprint)
+        originals: Dict[Tuple[int, str], Dict[str, list]] = {}
+        # Inodes of the files sharing their size, to skip existing hard links
+        inodes = set()
+
+        method_str = (
+            "byte-by-byte comparison"
+            if self.comparison_method == ComparisonMethod.BYTES
+            else f"{self.hash_algorithm} hashing"
+        )
+        logging.info(f"Using {method_str} for file comparison while scanning")
+
+        if not disable_progress:
+            progress_bar = self._progress_bar(
+                total=0,
+                desc="Scanning and processing files",
+                unit="file",
+                colour="green",
+                postfix=self._get_progress_stats(),
+            )
+        else:
+            progress_bar = None
+
+        for _, entries in self.scanner.scan_dirs(root_dir):
+            for entry in entries:
+                group = index.add(entry)
+                # The first file of a size is only looked at once a second
+                # one shows up
+                if group is not None:
+                    for new_entry in group if len(group) == 2 else [entry]:
+                        inode = (new_entry.device, new_entry.inode)
+                        if inode in inodes:
+                            self.hard_links_skipped += 1
+                            continue
+                        inodes.add(inode)
+
+                        duplicate = self._match_streamed_entry(
+                            new_entry, fingerprints, originals
+                        )
+                        if duplicate is not None:
+                            self._remove_duplicates([duplicate], deleted_files)
+                            # A replaced keeper may be the original of queued
+                            # removals, so removals are not held back here
+                            self._flush_removals(deleted_files)
+
+            self.total_files_processed += len(entries)
+            self.total_bytes_processed += sum(entry.size for entry in entries)
+            if progress_bar is not None:
+                self._update_estimated_progress(progress_bar, len(entries))
+
+        if progress_bar is not None:
+            progress_bar.close()
+
+        self.stage_stats["size"].record(
+            index.total_files,
+            index.candidate_files,
+            bytes_skipped=index.total_size - index.candidate_size,
+        )
+        logging.info(
+            f"Found {index.total_files} files "
+            f"(Total size: {humanize.naturalsize(index.total_size)}), "
+            f"{index.candidate_files} sharing their size with another file"
+        )
+
+        if self.hash_cache is not None:
+            self.hash_cache.evict_missing(root_dir)
+
+        return deleted_files
+
+    def _match_streamed_entry(
+        self,
+        entry: FileEntry,
+        fingerprints: Dict[Tuple[int, str], List[FileEntry]],
+        originals: Dict[Tuple[int, str], Dict[str, list]],
+    ) -> Optional[DuplicateGroup]:
+        """Match a file against the files of the same size seen so far.
+
+        Args:
+            entry: Stat record of the newly scanned file
+            fingerprints: Files seen so far for each (size, fingerprint)
+            originals: Originals and copy counts for each (size, fingerprint)
+
+        Returns:
+            The file paired with the original it duplicates, or None if it is
+            the first of its kind
+        """
+        size = entry.size
+        key = ""
+        if self.fingerprinter is not None and self.fingerprinter.is_worthwhile(size):
+            reused = self.digests_reused
+            key = self._sample_digests([entry])[0]
+            if key is None:
+                return None
+
+            members = fingerprints.setdefault((size, key), [])
+            members.append(entry)
+            # Stats are cumulative: a unique fingerprint counts as eliminated
+            # until a second file shares it and brings the first one back
+            sample_stats = self.stage_stats["sample"]
+            bytes_read = self.fingerprinter.bytes_per_file
+            bytes_reused = 0
+            if self.digests_reused > reused:
+                bytes_read, bytes_reused = 0, bytes_read
+            if len(members) == 1:
+                sample_stats.record(1, 0, bytes_read, bytes_skipped=size + bytes_reused)
+                return None
+            if len(members) == 2:
+                sample_stats.record(1, 2, bytes_read, bytes_skipped=bytes_reused - size)
+                self._match_fully(members[0], key, originals)
+            else:
+                sample_stats.record(1, 1, bytes_read, bytes_skipped=bytes_reused)
+
+        return self._match_fully(entry, key, originals)
+
+    def _match_fully(
+        self,
+        entry: FileEntry,
+        key: str,
+        originals: Dict[Tuple[int, str], Dict[str, list]],
+    ) -> Optional[DuplicateGroup]:
+        """Match a file against the originals sharing its size and fingerprint."""
+        size = entry.size
+        known = originals.setdefault((size, key), {})
+        full_stats = self.stage_stats["full"]
+
+        if self.comparison_method == ComparisonMethod.BYTES:
+            digest = None
+            for candidate, (original, _) in known.items():
+                full_stats.bytes_read += 2 * size
+                try:
+                    if self.compare_files_bytes(original.path, entry.path, size):
+                        digest = candidate
+                        break
+                except OSError as e:
+                    logging.error(f"Error comparing {entry.path}: {e}")
+                    return None
+            if digest is None:
+                # Byte-compared originals are simply numbered
+                digest = str(len(known))
+            bytes_read = bytes_reused = 0
+        else:
+            reused = self.digests_reused
+            digest = self._digest_files(
+                [entry], self.hash_algorithm, self._compute_file_hash
+            )[0]
+            if digest is None or digest in ("non_image", "invalid_image"):
+                return None
+            bytes_read, bytes_reused = size, 0
+            if self.digests_reused > reused:
+                bytes_read, bytes_reused = 0, size
+
+        if digest not in known:
+            known[digest] = [entry, 1]
+            full_stats.record(1, 0, bytes_read, bytes_reused)
+            return None
+
+        original = known[digest]
+        original[1] += 1
+        full_stats.record(1, 2 if original[1] == 2 else 1, bytes_read, bytes_reused)
+        group = self.keeper_policy.order(
+            DuplicateGroup(
+                None if self.comparison_method == ComparisonMethod.BYTES else digest,
+                [original[0], entry],
+            )
+        )
+        # Later copies are matched against the file kept
+        original[0] = group.keeper
+        return group
+
+    def find_near_duplicate_images(
+        self, entries: Iterable[FileEntry], batch_size: int = 1024
+    ) -> Iterator[DuplicateGroup]:
+        """Match images whose perceptual hashes are within the threshold.
+
+        Every image is hashed once, regardless of its size. Images are taken
+        in order; an image within perceptual_threshold of an earlier original
+        is paired with the closest one, otherwise it becomes an original
+        itself. Only originals are indexed in a BK-tree, so each lookup is a
+        sub-linear range query, and nothing else is kept: each match is
+        yielded as soon as its batch is hashed. As in streaming mode, later
+        matches of an original are paired with the file kept from it, so every
+        image removed is close to one that is kept.
+
+        Args:
+            entries: Stat records of candidate files; non-images are ignored
+            batch_size: Number of images hashed together on the worker pool
+
+        Returns:
+            Iterator over the matched pairs, keeper first
+        """
+        # Items are [file kept, matched yet] lists updated as matches are found
+        originals = BKTree()
+        full_stats = self.stage_stats["full"]
+
+        batch: List[FileEntry] = []
+        for entry in itertools.chain(entries, [None]):
+            if entry is not None:
+                if self.is_image_file(entry.path):
+                    batch.append(entry)
+                if len(batch) < batch_size:
+                    continue
+            if not batch:
+                continue
+
+            digests = self._perceptual_digests(batch)
+            hashed = batch
+            batch = []
+
+            for image, digest in zip(hashed, digests):
+                if digest is None or digest in ("non_image", "invalid_image"):
+                    continue
+                value = int(digest, 16)
+                matches = originals.search(value, self.perceptual_threshold)
+                if not matches:
+                    originals.add(value, [image, False])
+                    full_stats.record(1, 0)
+                    continue
+
+                original = matches[0][1]
+                # A first match brings its original back among the survivors
+                full_stats.record(1, 1 if original[1] else 2)
+                original[1] = True
+                group = self.keeper_policy.order(
+                    DuplicateGroup(digest, [original[0], image])
+                )
+                original[0] = group.keeper
+                yield group
+
+    def _find_and_remove_near_duplicates(
+        self, root_dir: str, disable_progress: bool = False
+    ) -> RemovalLog:
+        """Remove images perceptually similar to another image of the tree."""
+        deleted_files = RemovalLog()
+        logging.info(
+            f"Clustering images by {self.hash_algorithm} within a Hamming "
+            f"distance of {self.perceptual_threshold}"
+        )
+
+        if not disable_progress:
+            progress_bar = self._progress_bar(
+                total=0,
+                desc="Hashing images",
+                unit="file",
+                colour="green",
+                postfix=self._get_progress_stats(),
+            )
+        else:
+            progress_bar = None
+
+        def scanned_entries() -> Iterator[FileEntry]:
+            for _, entries in self.scanner.scan_dirs(root_dir):
+                yield from entries
+                self.total_files_processed += len(entries)
+                self.total_bytes_processed += sum(entry.size for entry in entries)
+                if progress_bar is not None:
+                    self._update_estimated_progress(progress_bar, len(entries))
+
+        matches = 0
+        for group in self.find_near_duplicate_images(scanned_entries()):
+            matches += 1
+            self._remove_duplicates([group], deleted_files)
+
+        if progress_bar is not None:
+            progress_bar.close()
+
+        logging.info(f"Found {matches} near-duplicate images")
+
+        if self.hash_cache is not None:
+            self.hash_cache.evict_missing(root_dir)
+
         return deleted_files
 
+    def _perceptual_digests(self, images: List[FileEntry]) -> List[Optional[str]]:
+        """Compute the perceptual hash of a batch of images on the worker pool.
+
+        Images missing from the hash cache are split into one sub-batch per
+        worker. When a hash cache is used, every perceptual hash is computed
+        from the single decode and cached, so switching algorithm later does
+        not need to decode the images again.
+
+        Args:
+            images: Stat records of the images
+
+        Returns:
+            List of digests aligned with images, None for unreadable images
+        """
+        from core.image_hasher import ImageHasher, hash_images
+
+        digests: List[Optional[str]] = [None] * len(images)
+        pending = []
+        for i, entry in enumerate(images):
+            digests[i] = self._lookup_digest(entry, self.hash_algorithm)
+            if digests[i] is None:
+                pending.append(i)
+        self.digests_reused += len(images) - len(pending)
+        decoded = sum(images[i].size for i in pending)
+        # Cached images are not decoded again
+        self.stage_stats["full"].record(
+            0,
+            0,
+            bytes_read=decoded,
+            bytes_skipped=sum(entry.size for entry in images) - decoded,
+        )
+        if not pending:
+            return digests
+
+        hash_names = (
+            self.image_hasher.hash_names
+            if self.hash_cache is None
+            else ImageHasher.HASH_NAMES
+        )
+        batch_size = -(-len(pending) // self.hash_pool.workers)
+        batches = [
+            [images[i].path for i in pending[start : start + batch_size]]
+            for start in range(0, len(pending), batch_size)
+        ]
+
+        start_time = time.time()
+        results = itertools.chain.from_iterable(
+            self.hash_pool.map_batches(partial(hash_images, hash_names), batches)
+        )
+        for i, hashes in zip(pending, results):
+            if hashes is None:
+                continue
+            digests[i] = hashes[self.hash_algorithm]
+            if self.hash_cache is not None:
+                for name, digest in hashes.items():
+                    self.hash_cache.put(images[i], name, digest)
+            if self.checkpoint is not None:
+                self.checkpoint.put(images[i], self.hash_algorithm, digests[i])
+
+        elapsed_time = time.time() - start_time
+        self.performance.record(elapsed_time, decoded)
+        # Decoding and hashing are done together by the workers
+        self.metrics.observe("hash", elapsed_time, decoded, count=len(pending))
+        return digests
+
+    @staticmethod
+    def _progress_bar(**kwargs) -> "tqdm":
+        """Create a tqdm progress bar, importing tqdm on first use."""
+        from tqdm import tqdm
+
+        return tqdm(**kwargs)
+
+    def _update_estimated_progress(self, progress_bar: "tqdm", files: int) -> None:
+        """Advance a progress bar whose total is estimated from the scan so far."""
+        progress_bar.total = max(
+            self.scanner.estimated_total_files, progress_bar.n + files
+        )
+        progress_bar.update(files)
+        progress_bar.set_postfix(**self._get_progress_stats())
+
     def is_image_file(self, filepath: str) -> bool:
         """Check if file is an image based on extension."""
         image_extensions = {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"}
         return os.path.splitext(filepath)[1].lower() in image_extensions
 
     def get_file_hash(self, filepath: str, file_size: int) -> str:
+        """Get the file hash, from the hash cache when it is still valid.
+
+        Args:
+            filepath: Path to the file to hash
+            file_size: Size of the file in bytes
+
+        Returns:
+            str: Hex digest of file hash or perceptual hash distance
+        """
+        return self._cached_digest(
+            filepath,
+            self.hash_algorithm,
+            lambda: self._compute_file_hash(filepath, file_size),
+        )
+
+    def _digest_files(
+        self,
+        files: List[FileEntry],
+        algorithm: str,
+        compute: Callable[[str, int], str],
+        compute_many: Optional[
+            Callable[[List[str], List[int]], List[Optional[str]]]
+        ] = None,
+    ) -> List[Optional[str]]:
+        """Digest many files through the hash cache and the worker pool.
+
+        Cache lookups and writes stay on the calling thread; only misses are
+        dispatched to the pool, or digested together by compute_many.
+
+        Args:
+            files: Stat records of the files
+            algorithm: Name under which digests are cached
+            compute: Digest function taking a file path and size
+            compute_many: Optional function digesting all misses at once from
+                their paths and sizes, yielding None for unreadable files
+
+        Returns:
+            List of digests aligned with files, None for unreadable files
+        """
+        digests: List[Optional[str]] = [None] * len(files)
+        pending = []
+        for i, entry in enumerate(files):
+            digests[i] = self._lookup_digest(entry, algorithm)
+            if digests[i] is None:
+                pending.append(i)
+        self.digests_reused += len(files) - len(pending)
+
+        paths = [files[i].path for i in pending]
+        sizes = [files[i].size for i in pending]
+        if compute_many is not None and pending:
+            results = compute_many(paths, sizes)
+        else:
+            results = self.hash_pool.map(compute, paths, sizes)
+        for i, digest in zip(pending, results):
+            digests[i] = digest
+            if digest is not None:
+                self._store_digest(files[i], algorithm, digest)
+
+        return digests
+
+    def _lookup_digest(self, entry: FileEntry, algorithm: str) -> Optional[str]:
+        """Find a digest in the hash cache or the checkpoint of a resumed run."""
+        digest = None
+        if self.hash_cache is not None:
+            digest = self.hash_cache.get(entry, algorithm)
+        if digest is None and self.checkpoint is not None:
+            digest = self.checkpoint.get(entry, algorithm)
+        return digest
+
+    def _store_digest(self, entry: FileEntry, algorithm: str, digest: str) -> None:
+        """Save a digest to the hash cache and the checkpoint, if any."""
+        if self.hash_cache is not None:
+            self.hash_cache.put(entry, algorithm, digest)
+        if self.checkpoint is not None:
+            self.checkpoint.put(entry, algorithm, digest)
+
+    def _cached_digest(
+        self, filepath: str, algorithm: str, compute: Callable[[], str]
+    ) -> str:
+        """Compute a digest through the hash cache if one is configured."""
+        if self.hash_cache is None:
+            return compute()
+        return self.hash_cache.get_or_compute(filepath, algorithm, compute)
+
+    def _compute_file_hash(self, filepath: str, file_size: int) -> str:
         """Calculate file hash with progress bar for large files.
 
         Args:
@@ -297,19 +1378,18 @@ class DuplicateRemover:
         if self.hash_type == "perceptual":
             if not self.is_image_file(filepath):
                 return "non_image"
-            try:
-                with Image.open(filepath) as img:
-                    hash_value = str(self.hash_func(img))
-            except Exception:
+            hashes = self.image_hasher.hash_batch([filepath])[0]
+            if hashes is None:
                 return "invalid_image"
+            hash_value = hashes[self.hash_algorithm]
 
         # Handle regular file hashing
         else:
-            hasher = self.hash_func()
-            chunk_size = 4096
+            hasher: HashBackend = self.hash_func()
+            update = hasher.update
 
             if file_size > self.hash_threshold:
-                with tqdm(
+                with self._progress_bar(
                     total=file_size,
                     desc=f"Hashing {os.path.basename(filepath)} ({self.hash_algorithm})",
                     unit="B",
@@ -318,74 +1398,86 @@ class DuplicateRemover:
                     leave=False,
                     disable=not self.show_progress,
                 ) as pbar:
-                    with open(filepath, "rb") as f:
-                        for byte_block in iter(lambda: f.read(chunk_size), b""):
-                            if (
-                                self.hash_type == "fast"
-                                and self.hash_algorithm == "murmur3_32"
-                            ):
-                                hasher.hash_bytes(byte_block)
-                            else:
-                                hasher.update(byte_block)
-                            pbar.update(len(byte_block))
+                    self.reader.feed(filepath, file_size, update, pbar.update)
             else:
-                with open(filepath, "rb") as f:
-                    for byte_block in iter(lambda: f.read(chunk_size), b""):
-                        if (
-                            self.hash_type == "fast"
-                            and self.hash_algorithm == "murmur3_32"
-                        ):
-                            hasher.hash_bytes(byte_block)
-                        else:
-                            hasher.update(byte_block)
-
-            hash_value = (
-                hasher.hexdigest() if hasattr(hasher, "hexdigest") else str(hasher)
-            )
+                self.reader.feed(filepath, file_size, update)
+
+            hash_value = hasher.digest().hex()
 
         # Record performance metrics
         elapsed_time = time.time() - start_time
-        self.performance.times.append(elapsed_time)
-        self.performance.sizes.append(file_size)
+        self.performance.record(elapsed_time, file_size)
 
         return hash_value
 
+    def _hash_files_concurrently(
+        self, filepaths: List[str], file_sizes: List[int]
+    ) -> List[Optional[str]]:
+        """Hash many files with their reads overlapped by the I/O backend.
+
+        Args:
+            filepaths: Paths to the files to hash
+            file_sizes: Sizes of the files in bytes
+
+        Returns:
+            List of hex digests aligned with filepaths, None for unreadable
+            files
+        """
+        start_time = time.time()
+        hashers = [self.hash_func() for _ in filepaths]
+        errors = self.reader.feed_many(
+            filepaths,
+            file_sizes,
+            [hasher.update for hasher in hashers],
+        )
+        self.performance.record(time.time() - start_time, sum(file_sizes))
+
+        digests: List[Optional[str]] = []
+        for filepath, hasher, error in zip(filepaths, hashers, errors):
+            if error is not None:
+                logging.error(f"Error reading {filepath}: {error}")
+                digests.append(None)
+            else:
+                digests.append(hasher.digest().hex())
+        return digests
+
     @staticmethod
     def benchmark_hashes(
-        sample_file: str, iterations: int = 3
+        sample_file: str, iterations: int = 3, block_size: Optional[int] = None
     ) -> List[HashPerformance]:
         """Benchmark different hash algorithms on a sample file.
 
         Args:
             sample_file: Path to file for benchmarking
             iterations: Number of iterations for each algorithm
+            block_size: Read block size in bytes, or None for the automatic
+                read path
 
         Returns:
             List of HashPerformance objects with results
         """
         results = []
         file_size = os.path.getsize(sample_file)
+        reader = FileReader(block_size)
 
         # Test all hash algorithms
-        all_hashes = {**DuplicateRemover.CRYPTO_HASHES, **DuplicateRemover.FAST_HASHES}
+        names = HashRegistry.names(HashRegistry.CRYPTO) + HashRegistry.names(
+            HashRegistry.FAST
+        )
 
-        for name, hash_func in all_hashes.items():
+        for name in names:
+            hash_func = HashRegistry.factory(name)
             perf = HashPerformance(name)
 
             for _ in range(iterations):
                 hasher = hash_func()
+                update = hasher.update
                 start_time = time.time()
 
-                with open(sample_file, "rb") as f:
-                    for chunk in iter(lambda: f.read(4096), b""):
-                        if name == "murmur3_32":
-                            hasher.hash_bytes(chunk)
-                        else:
-                            hasher.update(chunk)
+                reader.feed(sample_file, file_size, update)
 
                 elapsed_time = time.time() - start_time
-                perf.times.append(elapsed_time)
-                perf.sizes.append(file_size)
+                perf.record(elapsed_time, file_size)
 
             results.append(perf)
 
@@ -393,6 +1485,54 @@ class DuplicateRemover:
         results.sort(key=lambda x: x.avg_speed_mbps, reverse=True)
         return results
 
+    @staticmethod
+    def benchmark_buffer_sizes(
+        sample_file: str,
+        hash_algorithm: str = "xxh3_128",
+        block_sizes: Iterable[int] = (4096, 65536, 262144, 1048576, 8388608),
+        iterations: int = 3,
+    ) -> List[HashPerformance]:
+        """Benchmark one hash algorithm with different read block sizes.
+
+        The automatic read path, including mmap for large files, is measured
+        alongside the fixed block sizes.
+
+        Args:
+            sample_file: Path to file for benchmarking
+            hash_algorithm: Hash algorithm to use
+            block_sizes: Read block sizes in bytes to compare
+            iterations: Number of iterations for each block size
+
+        Returns:
+            List of HashPerformance objects named after their block size
+        """
+        results = []
+        file_size = os.path.getsize(sample_file)
+        hash_func = HashRegistry.factory(hash_algorithm)
+
+        for block_size in [None, *block_sizes]:
+            reader = FileReader(block_size)
+            label = (
+                "auto"
+                if block_size is None
+                else humanize.naturalsize(block_size, binary=True)
+            )
+            perf = HashPerformance(f"{hash_algorithm} ({label})")
+
+            for _ in range(iterations):
+                hasher = hash_func()
+                update = hasher.update
+                start_time = time.time()
+
+                reader.feed(sample_file, file_size, update)
+
+                elapsed_time = time.time() - start_time
+                perf.record(elapsed_time, file_size)
+
+            results.append(perf)
+
+        return results
+
     @staticmethod
     def print_benchmark_results(results: List[HashPerformance]) -> None:
         """Print benchmark results in a formatted table.
@@ -410,6 +1550,8 @@ class DuplicateRemover:
                 ]
             )
 
+        from tabulate import tabulate
+
         logging.info("\nHash Algorithm Benchmark Results:")
         logging.info(
             tabulate(
@@ -428,40 +1570,129 @@ class DuplicateRemover:
         """
         total_files = 0
         total_size = 0
-        for _, _, files in os.walk(root_dir):
-            total_files += len(files)
-            for file in files:
-                try:
-                    total_size += os.path.getsize(os.path.join(root_dir, file))
-                except OSError:
-                    continue
+        for entry in self.scanner.scan(root_dir):
+            total_files += 1
+            total_size += entry.size
         return total_files, total_size
 
     def _remove_duplicates(
-        self, files_by_hash: Dict[str, list], deleted_files: Dict[str, str]
+        self, groups: Iterable[DuplicateGroup], deleted_files: RemovalLog
     ) -> None:
-        """Remove duplicate files from the given hash groups.
+        """Queue the duplicates of the given groups for removal.
+
+        The keeper of each group is chosen by the keeper policy. Removals are
+        issued once removal_batch of them are queued, or when the run ends.
+        When a report is being written, the groups are recorded in it and no
+        file is touched.
 
         Args:
-            files_by_hash: Dictionary mapping file hashes to file paths and sizes
-            deleted_files: Dictionary to track deleted files
+            groups: Duplicate groups, their files in the order they were found
+            deleted_files: Log the removed duplicates are appended to
         """
-        for file_list in files_by_hash.values():
-            if len(file_list) > 1:
-                original, _ = file_list[0]
-                for duplicate, dup_size in file_list[1:]:
-                    try:
-                        if not self.print_only:
-                            os.remove(duplicate)
-                        deleted_files[duplicate] = original
-                        self.space_saved += dup_size
-                        self.duplicates_found += 1
-                        logging.info(
-                            f"\nDeleted duplicate: {duplicate} "
-                            f"({humanize.naturalsize(dup_size)})"
-                        )
-                    except OSError as e:
-                        logging.error(f"\nError deleting {duplicate}: {e}")
+        for group in groups:
+            if len(group.files) < 2:
+                continue
+            group = self.keeper_policy.order(group)
+            if self.report is not None:
+                self.report.write(group)
+
+            original = group.keeper.path
+            for entry in group.duplicates:
+                self._pending_removals.append((entry, original))
+
+        if len(self._pending_removals) >= self.removal_batch:
+            self._flush_removals(deleted_files)
+
+    def _flush_removals(self, deleted_files: RemovalLog) -> None:
+        """Remove the queued duplicates, one directory after the other.
+
+        Grouping removals by directory keeps consecutive updates on the same
+        directory metadata, which limits lock contention on network filers.
+        Checkpoint records held back until these removals are done are
+        written afterwards.
+
+        Args:
+            deleted_files: Log the removed duplicates are appended to
+        """
+        if self.report is not None:
+            done = "Planned duplicate"
+        elif self.replacer.action == DuplicateAction.DELETE:
+            done = "Deleted duplicate"
+        else:
+            done = f"Replaced duplicate with {self.replacer.action}"
+
+        removals = sorted(
+            self._pending_removals,
+            key=lambda removal: os.path.dirname(removal[0].path),
+        )
+        self._pending_removals = []
+        for entry, original in removals:
+            duplicate = entry.path
+            try:
+                if self.report is None and not self.print_only:
+                    if self.limiter is not None:
+                        self.limiter.acquire()
+                    with self.metrics.time("unlink", entry.size):
+                        self.replacer.replace(duplicate, original)
+                deleted_files.append(duplicate, original)
+                self.space_saved += entry.size
+                self.duplicates_found += 1
+                logging.info(
+                    f"\n{done}: {duplicate} "
+                    f"({humanize.naturalsize(entry.size)})"
+                )
+            except OSError as e:
+                logging.error(f"\nError replacing {duplicate}: {e}")
+
+        records, self._pending_records = self._pending_records, []
+        for record in records:
+            record()
+
+    def _after_removals(self, record: Callable[[], None]) -> None:
+        """Write a checkpoint record once the queued removals are done.
+
+        A resumed run must not skip work whose removals were still queued
+        when the run was interrupted.
+
+        Args:
+            record: Callable writing the record
+        """
+        if self._pending_removals:
+            self._pending_records.append(record)
+        else:
+            record()
+
+    def close(self) -> None:
+        """Release resources such as the hash cache and worker pool."""
+        self.metrics.stop_export()
+        if self.checkpoint is not None:
+            # Left unfinished, so an interrupted run can be resumed
+            self.checkpoint.close()
+        if self.report is not None:
+            self.report.close()
+            self.report = None
+        self.hash_pool.close()
+        self.reader.backend.shutdown()
+        if self.hash_cache is not None:
+            self.hash_cache.close()
+
+    def log_stage_stats(self) -> None:
+        """Log how many candidates each pipeline stage eliminated."""
+        if self.scanner.files_filtered or self.scanner.dirs_pruned:
+            logging.info(
+                f"Scan filter: {self.scanner.files_filtered} files skipped, "
+                f"{self.scanner.dirs_pruned} directories pruned"
+            )
+        logging.info("Candidate pruning by stage:")
+        for stats in self.stage_stats.values():
+            if not stats.candidates:
+                continue
+            logging.info(
+                f"  {stats.name}: {stats.candidates} candidates, "
+                f"{stats.eliminated} eliminated, "
+                f"{humanize.naturalsize(stats.bytes_read)} read, "
+                f"{humanize.naturalsize(stats.bytes_skipped)} of full reads avoided"
+            )
 
     def _get_progress_stats(self, current_dir: Optional[str] = None) -> dict:
         """Generate statistics for progress bar display.
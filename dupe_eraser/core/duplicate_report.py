@@ -0,0 +1,117 @@
+import json
+import time
+from typing import Iterator, List, Optional
+
+from core.duplicate_group import DuplicateGroup
+from core.file_entry import FileEntry
+
+
+class DuplicateReport:
+    """Streaming JSON Lines plan of the duplicates found by a scan.
+
+    The first line is a header describing the run. Every following line is
+    one duplicate group with its size, digest, keeper and duplicates, each
+    file recorded with the size and mtime it had when it was scanned, so the
+    plan can be applied later after checking nothing changed in between.
+    Files of a plan merged from several shards also record their shard.
+    Groups are written as soon as they are found, so a plan of any size is
+    produced in constant memory.
+    """
+
+    FORMAT = "dupe_eraser-plan"
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: str,
+        root_dir: str,
+        method: str,
+        algorithm: Optional[str],
+        action: str,
+    ):
+        """Create the report and write its header.
+
+        Args:
+            path: Path to the report file, overwritten if it exists
+            root_dir: Root directory that was scanned
+            method: Comparison method used to match files
+            algorithm: Hash algorithm used, or None for byte comparison
+            action: Action to apply to the duplicates, one of the
+                DuplicateAction values
+        """
+        self.path = path
+        self.groups = 0
+        self._file = open(path, "w", encoding="utf-8")
+        self._write_line(
+            {
+                "format": self.FORMAT,
+                "version": self.VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "root": root_dir,
+                "method": method,
+                "algorithm": algorithm,
+                "action": action,
+            }
+        )
+
+    def write(
+        self, group: DuplicateGroup, shards: Optional[List[str]] = None
+    ) -> None:
+        """Append a duplicate group to the report.
+
+        Args:
+            group: Group to record, keeper first
+            shards: Names of the shards holding the files of a merged group,
+                aligned with its files, or None for a single tree
+        """
+        records = [
+            self._file_record(entry, shards[i] if shards else None)
+            for i, entry in enumerate(group.files)
+        ]
+        self._write_line(
+            {
+                "size": group.keeper.size,
+                "digest": group.digest,
+                "keeper": records[0],
+                "duplicates": records[1:],
+            }
+        )
+        self.groups += 1
+
+    def close(self) -> None:
+        """Flush and close the report."""
+        self._file.close()
+
+    @classmethod
+    def read(cls, path: str) -> Iterator[dict]:
+        """Iterate over the records of a report, header first.
+
+        Args:
+            path: Path to the report file
+
+        Returns:
+            Iterator of the decoded JSON records
+        """
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != cls.FORMAT:
+                raise ValueError(f"{path} is not a dupe_eraser plan")
+            if header.get("version") != cls.VERSION:
+                raise ValueError(
+                    f"Unsupported plan version {header.get('version')} in {path}"
+                )
+            yield header
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def _file_record(entry: FileEntry, shard: Optional[str] = None) -> dict:
+        record = {"path": entry.path, "size": entry.size, "mtime_ns": entry.mtime_ns}
+        if shard is not None:
+            record["shard"] = shard
+        return record
+
+    def _write_line(self, record: dict) -> None:
+        # Paths that are not valid UTF-8 survive as escaped surrogates
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
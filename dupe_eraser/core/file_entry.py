@@ -0,0 +1,29 @@
+import os
+from typing import NamedTuple
+
+
+class FileEntry(NamedTuple):
+    """Stat record of a scanned file, reused by every later stage."""
+
+    path: str
+    size: int
+    inode: int
+    device: int
+    mtime_ns: int
+    # Number of hard links to the inode
+    nlink: int = 1
+
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result) -> "FileEntry":
+        """Build an entry from a stat result.
+
+        Args:
+            path: Path to the file
+            st: Stat result of the file
+
+        Returns:
+            FileEntry for the file
+        """
+        return cls(
+            path, st.st_size, st.st_ino, st.st_dev, st.st_mtime_ns, st.st_nlink
+        )
@@ -0,0 +1,160 @@
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.file_entry import FileEntry
+
+
+class FileIndex:
+    """Columnar index of every file of a tree, sized for very large scans.
+
+    Stat fields are stored in parallel typed arrays rather than as Python
+    objects, and each path is split into a directory id, pointing into a
+    shared directory table, and the file name, stored as encoded bytes in a
+    single pool. A file costs about 48 bytes plus the length of its name.
+    FileEntry records are only rebuilt for the files of a bucket as it is
+    processed, and buckets are found with a vectorized stable sort by size.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._sizes = array("Q")
+        self._inodes = array("Q")
+        self._devices = array("Q")
+        self._mtimes = array("q")
+        self._nlinks = array("I")
+        self._dir_ids = array("I")
+        # Name of file i is _names[_name_offsets[i]:_name_offsets[i + 1]]
+        self._names = bytearray()
+        self._name_offsets = array("Q", [0])
+        self._dirs: List[str] = []
+        self._dir_ids_by_path: Dict[str, int] = {}
+        self._sorted: Optional[Tuple[np.ndarray, ...]] = None
+        self.total_size = 0
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def total_files(self) -> int:
+        """Number of files in the index."""
+        return len(self._sizes)
+
+    def add_dir(self, dirpath: str, entries: Iterable[FileEntry]) -> None:
+        """Register the files of one directory.
+
+        Args:
+            dirpath: Path to the directory
+            entries: Stat records of the files directly inside it
+        """
+        dir_id = self._dir_id(dirpath)
+        prefix = len(os.path.join(dirpath, ""))
+        for entry in entries:
+            self._append(dir_id, entry.path[prefix:], entry)
+
+    def add(self, entry: FileEntry) -> None:
+        """Register a single file.
+
+        Args:
+            entry: Stat record of the file
+        """
+        dirpath, name = os.path.split(entry.path)
+        self._append(self._dir_id(dirpath), name, entry)
+
+    def entry(self, index: int) -> FileEntry:
+        """Rebuild the stat record of a file.
+
+        Args:
+            index: Position of the file in the index
+
+        Returns:
+            FileEntry of the file
+        """
+        start, end = self._name_offsets[index], self._name_offsets[index + 1]
+        name = os.fsdecode(bytes(self._names[start:end]))
+        return FileEntry(
+            os.path.join(self._dirs[self._dir_ids[index]], name),
+            self._sizes[index],
+            self._inodes[index],
+            self._devices[index],
+            self._mtimes[index],
+            self._nlinks[index],
+        )
+
+    def buckets(
+        self, largest_first: bool = False
+    ) -> Iterator[Tuple[int, List[FileEntry]]]:
+        """Iterate over sizes shared by more than one file.
+
+        Args:
+            largest_first: Order buckets by decreasing reclaimable space, the
+                size of a file times the number of its possible copies,
+                instead of by increasing size
+
+        Returns:
+            Iterator of (size, entries) tuples, the entries of a size being in
+            the order they were added
+        """
+        order, sizes, starts, counts = self._sort()
+        shared = np.flatnonzero(counts > 1)
+        if largest_first:
+            reclaimable = sizes[shared] * (counts[shared] - 1).astype(np.uint64)
+            # Stable, so equally reclaimable buckets stay by increasing size
+            shared = shared[
+                np.argsort(-reclaimable.astype(np.float64), kind="stable")
+            ]
+        for bucket in shared:
+            start, count = starts[bucket], counts[bucket]
+            yield int(sizes[bucket]), [
+                self.entry(int(i)) for i in order[start : start + count]
+            ]
+
+    @property
+    def candidate_files(self) -> int:
+        """Number of files that share their size with at least one other file."""
+        _, _, _, counts = self._sort()
+        return int(counts[counts > 1].sum())
+
+    @property
+    def candidate_size(self) -> int:
+        """Combined size in bytes of the files sharing their size."""
+        _, sizes, _, counts = self._sort()
+        shared = counts > 1
+        return int((sizes[shared] * counts[shared].astype(np.uint64)).sum())
+
+    def _sort(self) -> Tuple[np.ndarray, ...]:
+        """Stable argsort by size, with the distinct sizes, where each starts
+        in the sorted order and how many files have it."""
+        if self._sorted is None:
+            # Copied so the arrays can still grow while results are in use
+            sizes = np.array(self._sizes, dtype=np.uint64)
+            order = np.argsort(sizes, kind="stable")
+            sorted_sizes = sizes[order]
+            starts = np.flatnonzero(np.diff(sorted_sizes)) + 1
+            if len(sorted_sizes):
+                starts = np.concatenate(([0], starts))
+            counts = np.diff(np.append(starts, len(sorted_sizes)))
+            self._sorted = (order, sorted_sizes[starts], starts, counts)
+        return self._sorted
+
+    def _dir_id(self, dirpath: str) -> int:
+        dir_id = self._dir_ids_by_path.get(dirpath)
+        if dir_id is None:
+            dir_id = len(self._dirs)
+            self._dirs.append(dirpath)
+            self._dir_ids_by_path[dirpath] = dir_id
+        return dir_id
+
+    def _append(self, dir_id: int, name: str, entry: FileEntry) -> None:
+        self._sizes.append(entry.size)
+        self._inodes.append(entry.inode)
+        self._devices.append(entry.device)
+        self._mtimes.append(entry.mtime_ns)
+        self._nlinks.append(entry.nlink)
+        self._dir_ids.append(dir_id)
+        self._names += os.fsencode(name)
+        self._name_offsets.append(len(self._names))
+        self.total_size += entry.size
+        self._sorted = None
@@ -0,0 +1,262 @@
+import mmap
+import time
+from typing import BinaryIO, Callable, Iterator, List, Optional
+
+from core.io_backend import IOBackend
+from core.metrics import Metrics
+
+
+class FileReader:
+    """Large-buffer read path shared by hashing and byte comparison.
+
+    Files are read with ``readinto`` into a single reused buffer instead of
+    allocating a new ``bytes`` object per chunk. Files at or above
+    ``MMAP_THRESHOLD`` are memory-mapped and handed to the consumer as
+    ``memoryview`` slices, avoiding the copy into user space entirely.
+
+    Over a throttled backend, every open and read of these paths is still
+    charged through the backend's request. With any other I/O backend than
+    the plain blocking one, files are instead read through it in blocks; a
+    concurrent backend keeps several requests in flight per file and,
+    through feed_many, across files.
+    """
+
+    # Block sizes picked by file size: (largest file size, block size)
+    BLOCK_SIZES = (
+        (256 * 1024, 64 * 1024),
+        (16 * 1024 * 1024, 256 * 1024),
+    )
+    LARGE_BLOCK_SIZE = 1024 * 1024
+
+    MMAP_THRESHOLD = 64 * 1024 * 1024
+    MMAP_BLOCK_SIZE = 8 * 1024 * 1024
+
+    def __init__(
+        self,
+        block_size: Optional[int] = None,
+        use_mmap: bool = True,
+        metrics: Optional[Metrics] = None,
+        backend: Optional[IOBackend] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            block_size: Fixed block size in bytes, or None to pick one per file
+            use_mmap: Memory-map files of at least MMAP_THRESHOLD bytes
+            metrics: Metrics receiving open, read and hash timings, if any
+            backend: I/O backend serving reads, a blocking IOBackend by
+                default
+        """
+        if block_size is not None and block_size <= 0:
+            raise ValueError("Block size must be a positive number of bytes")
+        self.block_size = block_size
+        self.use_mmap = use_mmap
+        self.metrics = metrics
+        self.backend = backend or IOBackend()
+
+    def block_size_for(self, file_size: int) -> int:
+        """Pick the block size used to read a file.
+
+        Args:
+            file_size: Size of the file in bytes
+
+        Returns:
+            int: Block size in bytes
+        """
+        if self.block_size is not None:
+            return self.block_size
+        for max_file_size, block_size in self.BLOCK_SIZES:
+            if file_size <= max_file_size:
+                return block_size
+        return self.LARGE_BLOCK_SIZE
+
+    def feed(
+        self,
+        filepath: str,
+        file_size: int,
+        update: Callable[[memoryview], object],
+        progress: Optional[Callable[[int], object]] = None,
+    ) -> None:
+        """Stream the whole content of a file into a consumer.
+
+        The views passed to update are only valid for the duration of the
+        call and must not be kept.
+
+        Args:
+            filepath: Path to the file
+            file_size: Size of the file in bytes
+            update: Callable receiving each block, such as a hasher's update
+            progress: Optional callable receiving the number of bytes consumed
+        """
+        if not self.backend.native:
+            if progress:
+                consume = update
+
+                def update(data: bytes) -> None:
+                    consume(data)
+                    progress(len(data))
+
+            error = self.feed_many([filepath], [file_size], [update])[0]
+            if error is not None:
+                raise error
+            return
+
+        metrics = self.metrics
+        start_time = time.perf_counter()
+        with self.open(filepath) as f:
+            if metrics is not None:
+                metrics.observe("open", time.perf_counter() - start_time)
+
+            if (
+                self.use_mmap
+                and self.block_size is None
+                and file_size >= self.MMAP_THRESHOLD
+            ):
+                start_time = time.perf_counter()
+                self._feed_mmap(f, file_size, update, progress)
+                if metrics is not None:
+                    # Pages are faulted in by the consumer, so reading cannot
+                    # be told apart from hashing
+                    metrics.observe("hash", time.perf_counter() - start_time, file_size)
+                return
+
+            buffer = bytearray(self.block_size_for(file_size))
+            view = memoryview(buffer)
+            if metrics is None:
+                for length in self.read_blocks(f, buffer):
+                    update(view[:length])
+                    if progress:
+                        progress(length)
+                return
+
+            read_time = update_time = 0.0
+            size = 0
+            blocks = self.read_blocks(f, buffer)
+            while True:
+                start_time = time.perf_counter()
+                length = next(blocks, 0)
+                read_end = time.perf_counter()
+                read_time += read_end - start_time
+                if not length:
+                    break
+                update(view[:length])
+                update_time += time.perf_counter() - read_end
+                size += length
+                if progress:
+                    progress(length)
+            metrics.observe("read", read_time, size)
+            metrics.observe("hash", update_time, size)
+
+    def feed_many(
+        self,
+        filepaths: List[str],
+        file_sizes: List[int],
+        updates: List[Callable[[bytes], object]],
+    ) -> List[Optional[OSError]]:
+        """Stream the content of many files into their consumers at once.
+
+        Reads of every file are issued through the backend together, so a
+        concurrent backend overlaps them; each consumer still receives the
+        blocks of its file in order.
+
+        Args:
+            filepaths: Paths to the files
+            file_sizes: Sizes of the files in bytes
+            updates: Callables receiving the blocks of each file
+
+        Returns:
+            List aligned with filepaths of None, or the error that stopped
+            reading the file
+        """
+        jobs = [
+            (
+                filepath,
+                self.backend.block_ranges(size, self.block_size_for(size)),
+                update,
+            )
+            for filepath, size, update in zip(filepaths, file_sizes, updates)
+        ]
+        start_time = time.perf_counter()
+        errors = self.backend.feed_many(jobs)
+        if self.metrics is not None:
+            # Consumers run as blocks arrive, so hashing is included
+            self.metrics.observe(
+                "read",
+                time.perf_counter() - start_time,
+                sum(file_sizes),
+                count=len(filepaths),
+            )
+        return errors
+
+    def open(self, filepath: str) -> BinaryIO:
+        """Open a file for the native read paths, unbuffered.
+
+        Args:
+            filepath: Path to the file
+
+        Returns:
+            File opened in binary mode
+        """
+        with self.backend.request():
+            return open(filepath, "rb", buffering=0)
+
+    def read_blocks(self, f: BinaryIO, buffer: bytearray) -> Iterator[int]:
+        """Fill a buffer with successive blocks of a file.
+
+        Every block but the last fills the buffer completely, so two files
+        read with equally sized buffers stay aligned.
+
+        Args:
+            f: File opened in binary mode
+            buffer: Buffer reused for every block
+
+        Returns:
+            Iterator over the number of bytes placed in the buffer
+        """
+        view = memoryview(buffer)
+        while True:
+            length = self.readinto_full(f, view)
+            if not length:
+                return
+            yield length
+            if length < len(buffer):
+                return
+
+    def readinto_full(self, f: BinaryIO, view: memoryview) -> int:
+        """Read into a view until it is full or the end of file is reached.
+
+        Args:
+            f: File opened in binary mode
+            view: Writable view to fill
+
+        Returns:
+            int: Number of bytes read, less than len(view) only at end of file
+        """
+        length = 0
+        with self.backend.request(len(view)):
+            while length < len(view):
+                read = f.readinto(view[length:])
+                if not read:
+                    break
+                length += read
+        return length
+
+    def _feed_mmap(
+        self,
+        f: BinaryIO,
+        file_size: int,
+        update: Callable[[memoryview], object],
+        progress: Optional[Callable[[int], object]],
+    ) -> None:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mapped) as view:
+                for offset in range(0, file_size, self.MMAP_BLOCK_SIZE):
+                    block = view[offset : offset + self.MMAP_BLOCK_SIZE]
+                    # Pages are read as the consumer faults them in
+                    with self.backend.request(len(block)):
+                        update(block)
+                    if progress:
+                        progress(len(block))
+                    block.release()
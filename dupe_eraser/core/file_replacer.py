@@ -0,0 +1,69 @@
+import os
+import shutil
+import uuid
+
+from core.duplicate_action import DuplicateAction
+
+# ioctl request cloning a whole file on copy-on-write filesystems (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+class FileReplacer:
+    """Get rid of a duplicate by deleting it or by linking it to its original.
+
+    Links are first created under a temporary name next to the duplicate and
+    then renamed over it, so the duplicate's path always points to valid
+    content, even if the operation is interrupted.
+    """
+
+    def __init__(self, action: str = DuplicateAction.DELETE):
+        """Initialize the replacer.
+
+        Args:
+            action: One of the DuplicateAction values
+        """
+        if action not in (
+            DuplicateAction.DELETE,
+            DuplicateAction.HARDLINK,
+            DuplicateAction.REFLINK,
+            DuplicateAction.SYMLINK,
+        ):
+            raise ValueError(f"Unsupported duplicate action: {action}")
+        self.action = action
+
+    def replace(self, duplicate: str, original: str) -> None:
+        """Apply the action to a duplicate.
+
+        Args:
+            duplicate: Path to the duplicate file
+            original: Path to the file kept as the original
+        """
+        if self.action == DuplicateAction.DELETE:
+            os.remove(duplicate)
+            return
+
+        directory, name = os.path.split(duplicate)
+        temp_path = os.path.join(
+            directory, f".{name}.dupe_eraser-{uuid.uuid4().hex[:8]}.tmp"
+        )
+        try:
+            if self.action == DuplicateAction.HARDLINK:
+                os.link(original, temp_path)
+            elif self.action == DuplicateAction.SYMLINK:
+                os.symlink(os.path.abspath(original), temp_path)
+            else:
+                self._clone(original, temp_path)
+                shutil.copystat(duplicate, temp_path)
+            os.replace(temp_path, duplicate)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _clone(source: str, destination: str) -> None:
+        """Create destination as a copy-on-write clone of source."""
+        import fcntl
+
+        with open(source, "rb") as src, open(destination, "xb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
@@ -0,0 +1,29 @@
+class HashBackend:
+    """Interface of the hashers digesting file contents.
+
+    A hasher receives every block of a file through update, then produces
+    the digest of all of them. hashlib, blake3, xxhash and mmh3 hashers
+    already provide this interface and are used as they are, so reading a
+    block calls straight into the hasher with no per-block dispatch. Custom
+    hashers subclass this class and are made available with
+    HashRegistry.register.
+    """
+
+    def update(self, data: memoryview) -> None:
+        """Feed a block of data.
+
+        The view is only valid for the duration of the call and must not be
+        kept.
+
+        Args:
+            data: Next block of the content
+        """
+        raise NotImplementedError
+
+    def digest(self) -> bytes:
+        """Get the digest of all the data fed so far.
+
+        Returns:
+            bytes: Digest, compared and cached as its hex representation
+        """
+        raise NotImplementedError
@@ -0,0 +1,195 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Callable, Optional
+
+from core.file_entry import FileEntry
+
+
+class HashCache:
+    """Persistent SQLite cache of file digests keyed by stat identity.
+
+    A digest is stored per (device, inode, algorithm) together with the size
+    and modification time it was computed for. A lookup only hits when the
+    file's current size and mtime still match, so modified files are rehashed
+    automatically.
+    """
+
+    DEFAULT_PATH = os.path.join(
+        os.path.expanduser("~"), ".cache", "dupe_eraser", "hashes.sqlite3"
+    )
+
+    # Number of writes buffered before committing to disk
+    COMMIT_INTERVAL = 1000
+    # Version of the stored data, kept in the database's user_version
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """Open (or create) the cache database.
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._pending_writes = 0
+        # Entries touched before this timestamp were not seen during this run
+        self._run_started_ns = time.time_ns()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS digests (
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                last_seen_ns INTEGER NOT NULL,
+                PRIMARY KEY (device, inode, algorithm)
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS digests_path ON digests (path)")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            # Version 0 murmur3_32 digests were the repr of the mmh3 module,
+            # identical for every file; no valid digest starts with "<"
+            self._db.execute("DELETE FROM digests WHERE digest LIKE '<%'")
+            self._db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            self._db.commit()
+
+    def get(self, entry: FileEntry, algorithm: str) -> Optional[str]:
+        """Look up the cached digest of a file.
+
+        Args:
+            entry: Current stat record of the file
+            algorithm: Name of the hash algorithm
+
+        Returns:
+            The cached digest, or None if missing or stale
+        """
+        row = self._db.execute(
+            "SELECT size, mtime_ns, digest FROM digests "
+            "WHERE device = ? AND inode = ? AND algorithm = ?",
+            (entry.device, entry.inode, algorithm),
+        ).fetchone()
+        if row is None or row[0] != entry.size or row[1] != entry.mtime_ns:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._write(
+            "UPDATE digests SET path = ?, last_seen_ns = ? "
+            "WHERE device = ? AND inode = ? AND algorithm = ?",
+            (entry.path, time.time_ns(), entry.device, entry.inode, algorithm),
+        )
+        return row[2]
+
+    def put(self, entry: FileEntry, algorithm: str, digest: str) -> None:
+        """Store the digest of a file, replacing any stale entry.
+
+        Args:
+            entry: Stat record the digest was computed for
+            algorithm: Name of the hash algorithm
+            digest: Digest to store
+        """
+        self._write(
+            "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry.device,
+                entry.inode,
+                algorithm,
+                entry.size,
+                entry.mtime_ns,
+                entry.path,
+                digest,
+                time.time_ns(),
+            ),
+        )
+
+    def get_or_compute(
+        self, filepath: str, algorithm: str, compute: Callable[[], str]
+    ) -> str:
+        """Return the cached digest of a file, computing and storing it on a miss.
+
+        Args:
+            filepath: Path to the file
+            algorithm: Name of the hash algorithm
+            compute: Callable computing the digest when it is not cached
+
+        Returns:
+            str: Digest of the file
+        """
+        entry = FileEntry.from_stat(filepath, os.stat(filepath))
+        digest = self.get(entry, algorithm)
+        if digest is None:
+            digest = compute()
+            self.put(entry, algorithm, digest)
+        return digest
+
+    def evict_missing(self, root_dir: str) -> int:
+        """Drop entries under a directory whose file no longer exists unchanged.
+
+        Only entries that were not used during this run are checked, so the
+        cost is one stat per file that disappeared from the candidate set.
+
+        Args:
+            root_dir: Directory whose entries should be checked
+
+        Returns:
+            int: Number of evicted entries
+        """
+        prefix = os.path.join(root_dir, "")
+        rows = self._db.execute(
+            "SELECT DISTINCT device, inode, size, mtime_ns, path FROM digests "
+            "WHERE last_seen_ns < ? AND substr(path, 1, ?) = ?",
+            (self._run_started_ns, len(prefix), prefix),
+        ).fetchall()
+
+        evicted = 0
+        for device, inode, size, mtime_ns, path in rows:
+            try:
+                st = os.stat(path)
+                if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) == (
+                    device,
+                    inode,
+                    size,
+                    mtime_ns,
+                ):
+                    continue
+            except OSError:
+                pass
+            self._db.execute(
+                "DELETE FROM digests WHERE device = ? AND inode = ?", (device, inode)
+            )
+            evicted += 1
+
+        self.commit()
+        if evicted:
+            logging.info(f"Evicted {evicted} stale entries from hash cache")
+        return evicted
+
+    def commit(self) -> None:
+        """Flush buffered writes to disk."""
+        self._db.commit()
+        self._pending_writes = 0
+
+    def close(self) -> None:
+        """Flush buffered writes and close the database."""
+        self.commit()
+        self._db.close()
+
+    def _write(self, query: str, params: tuple) -> None:
+        self._db.execute(query, params)
+        self._pending_writes += 1
+        if self._pending_writes >= self.COMMIT_INTERVAL:
+            self.commit()
@@ -1,27 +1,38 @@
-from typing import List
-
-
 class HashPerformance:
     def __init__(self, name: str):
         """Initialize hash performance tracker.
 
+        Only running totals are kept, so memory does not grow with the number
+        of files hashed.
+
         Args:
             name: Name of the hash algorithm
         """
         self.name = name
-        self.times: List[float] = []
-        self.sizes: List[int] = []
+        self.count = 0
+        self.total_time = 0.0
+        self.total_size = 0
+
+    def record(self, elapsed_time: float, size: int) -> None:
+        """Record one timed hash.
+
+        Args:
+            elapsed_time: Time taken in seconds
+            size: Number of bytes hashed
+        """
+        self.count += 1
+        self.total_time += elapsed_time
+        self.total_size += size
 
     @property
     def avg_speed_mbps(self) -> float:
         """Calculate average speed in MB/s."""
-        if not self.times:
+        if not self.count:
             return 0.0
-        total_mb = sum(self.sizes) / (1024 * 1024)
-        total_time = sum(self.times)
-        return total_mb / total_time if total_time > 0 else 0.0
+        total_mb = self.total_size / (1024 * 1024)
+        return total_mb / self.total_time if self.total_time > 0 else 0.0
 
     @property
     def avg_time_ms(self) -> float:
         """Calculate average time in milliseconds."""
-        return (sum(self.times) / len(self.times) * 1000) if self.times else 0.0
+        return (self.total_time / self.count * 1000) if self.count else 0.0
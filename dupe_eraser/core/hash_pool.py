@@ -0,0 +1,132 @@
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.pool_kind import PoolKind
+
+# Per-process hashers used by process pool workers, keyed by settings
+_worker_removers: Dict[Tuple[str, Optional[int]], object] = {}
+
+
+def hash_file(
+    hash_algorithm: str, block_size: Optional[int], filepath: str, file_size: int
+) -> str:
+    """Hash a file inside a pool worker.
+
+    Module-level so it can be pickled for process pools; each worker process
+    builds its own DuplicateRemover the first time an algorithm is used.
+
+    Args:
+        hash_algorithm: Hash algorithm to use
+        block_size: Read block size in bytes, or None for the automatic choice
+        filepath: Path to the file to hash
+        file_size: Size of the file in bytes
+
+    Returns:
+        str: Hex digest of file hash or perceptual hash
+    """
+    key = (hash_algorithm, block_size)
+    remover = _worker_removers.get(key)
+    if remover is None:
+        from core.duplicate_remover import DuplicateRemover
+
+        remover = DuplicateRemover(
+            hash_algorithm=hash_algorithm,
+            show_progress=False,
+            prefilter_kb=0,
+            block_size=block_size,
+        )
+        _worker_removers[key] = remover
+    return remover.get_file_hash(filepath, file_size)
+
+
+def _call_logging_errors(
+    func: Callable[[str, int], str], filepath: str, file_size: int
+) -> Optional[str]:
+    try:
+        return func(filepath, file_size)
+    except OSError as e:
+        logging.error(f"Error reading {filepath}: {e}")
+        return None
+
+
+class HashPool:
+    def __init__(self, workers: int = 1, kind: str = PoolKind.THREAD):
+        """Initialize a pool digesting many files concurrently.
+
+        Args:
+            workers: Number of workers, 1 to digest files in the calling thread
+            kind: PoolKind.THREAD for I/O-bound hashing or PoolKind.PROCESS for
+                CPU-bound work such as perceptual hashing
+        """
+        if workers < 1:
+            raise ValueError("Number of workers must be at least 1")
+        if kind not in (PoolKind.THREAD, PoolKind.PROCESS):
+            raise ValueError(f"Unsupported pool kind: {kind}")
+        self.workers = workers
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+
+    @property
+    def is_parallel(self) -> bool:
+        """Whether work is dispatched to a pool rather than run inline."""
+        return self.workers > 1
+
+    def map(
+        self,
+        func: Callable[[str, int], str],
+        files: List[str],
+        file_sizes: List[int],
+    ) -> List[Optional[str]]:
+        """Apply func(filepath, file_size) to every file.
+
+        Results are returned in the order of files regardless of how the work
+        was scheduled. Files that could not be read yield None. With a process
+        pool, func must be picklable.
+
+        Args:
+            func: Digest function taking a file path and size
+            files: Paths of the files to digest
+            file_sizes: Sizes of the files in bytes
+
+        Returns:
+            List of digests aligned with files
+        """
+        call = partial(_call_logging_errors, func)
+        if not self.is_parallel or len(files) < 2:
+            return [call(*args) for args in zip(files, file_sizes)]
+        return list(self._get_executor().map(call, files, file_sizes))
+
+    def map_batches(
+        self, func: Callable[[list], list], batches: List[list]
+    ) -> List[list]:
+        """Apply func to every batch, one batch per task.
+
+        Args:
+            func: Function processing a whole batch; picklable for process pools
+            batches: Batches of work items
+
+        Returns:
+            List of the results of func, aligned with batches
+        """
+        if not self.is_parallel or len(batches) < 2:
+            return [func(batch) for batch in batches]
+        return list(self._get_executor().map(func, batches))
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == PoolKind.PROCESS:
+                # Imported here as it pulls in multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
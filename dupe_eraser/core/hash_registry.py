@@ -0,0 +1,117 @@
+import importlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def _attribute(module: str, name: str) -> Callable[[], Callable]:
+    """Build a loader importing an attribute of a module on first use."""
+    return lambda: getattr(importlib.import_module(module), name)
+
+
+class HashRegistry:
+    """Hash providers by name, each imported on first use only.
+
+    Providers such as the ImageHasher pull in NumPy and PIL, which costs
+    hundreds of milliseconds of import time. Registering a loader instead of
+    the provider itself means a run only imports the modules of the
+    algorithms it actually uses, and ``--help`` imports none of them.
+    """
+
+    CRYPTO = "crypto"
+    FAST = "fast"
+    PERCEPTUAL = "perceptual"
+    KINDS = (CRYPTO, FAST, PERCEPTUAL)
+
+    # Algorithm name -> (kind, loader returning the factory of HashBackend
+    # compatible hashers)
+    _providers: Dict[str, Tuple[str, Callable[[], Callable]]] = {
+        # Cryptographic hash functions
+        "md5": (CRYPTO, _attribute("hashlib", "md5")),
+        "sha1": (CRYPTO, _attribute("hashlib", "sha1")),
+        "sha256": (CRYPTO, _attribute("hashlib", "sha256")),
+        "sha512": (CRYPTO, _attribute("hashlib", "sha512")),
+        "sha3_256": (CRYPTO, _attribute("hashlib", "sha3_256")),
+        "sha3_512": (CRYPTO, _attribute("hashlib", "sha3_512")),
+        "blake2b": (CRYPTO, _attribute("hashlib", "blake2b")),
+        "blake2s": (CRYPTO, _attribute("hashlib", "blake2s")),
+        "blake3": (CRYPTO, _attribute("blake3", "blake3")),
+        # Non-cryptographic hash functions (faster)
+        "xxh32": (FAST, _attribute("xxhash", "xxh32")),
+        "xxh64": (FAST, _attribute("xxhash", "xxh64")),
+        "xxh3_64": (FAST, _attribute("xxhash", "xxh3_64")),
+        "xxh3_128": (FAST, _attribute("xxhash", "xxh3_128")),
+        "murmur3_32": (FAST, _attribute("mmh3", "mmh3_32")),
+        # Perceptual hash functions for images, all computed by the batched
+        # ImageHasher
+        "ahash": (PERCEPTUAL, _attribute("core.image_hasher", "ImageHasher")),
+        "phash": (PERCEPTUAL, _attribute("core.image_hasher", "ImageHasher")),
+        "dhash": (PERCEPTUAL, _attribute("core.image_hasher", "ImageHasher")),
+        "whash": (PERCEPTUAL, _attribute("core.image_hasher", "ImageHasher")),
+        "colorhash": (PERCEPTUAL, _attribute("core.image_hasher", "ImageHasher")),
+    }
+    _loaded: Dict[str, Callable] = {}
+
+    @classmethod
+    def register(cls, name: str, kind: str, loader: Callable[[], Callable]) -> None:
+        """Register a content hash provider, replacing any of the same name.
+
+        The hashers created by the factory must provide the HashBackend
+        interface. Providers registered at runtime are not seen by the
+        workers of a process pool started with the spawn method.
+
+        Args:
+            name: Algorithm name, as given to --hash-algorithm
+            kind: CRYPTO or FAST; perceptual hashes are computed by the
+                ImageHasher and cannot be registered
+            loader: Callable importing the provider and returning the factory
+                of its hashers, only called the first time it is needed
+        """
+        if kind not in (cls.CRYPTO, cls.FAST):
+            raise ValueError(f"Cannot register a hash of kind '{kind}'")
+        cls._providers[name] = (kind, loader)
+        cls._loaded.pop(name, None)
+
+    @classmethod
+    def names(cls, kind: Optional[str] = None) -> List[str]:
+        """Get the registered algorithm names, of one kind if given."""
+        return [
+            name
+            for name, (provider_kind, _) in cls._providers.items()
+            if kind is None or provider_kind == kind
+        ]
+
+    @classmethod
+    def kind(cls, name: str) -> str:
+        """Get the kind of an algorithm, without importing its provider.
+
+        Args:
+            name: Algorithm name
+
+        Returns:
+            str: One of KINDS
+        """
+        provider = cls._providers.get(name)
+        if provider is None:
+            raise ValueError(
+                f"Unsupported hash algorithm. Available options:\n"
+                f"Cryptographic: {', '.join(cls.names(cls.CRYPTO))}\n"
+                f"Fast: {', '.join(cls.names(cls.FAST))}\n"
+                f"Perceptual: {', '.join(cls.names(cls.PERCEPTUAL))}"
+            )
+        return provider[0]
+
+    @classmethod
+    def factory(cls, name: str) -> Callable:
+        """Get the hasher factory of an algorithm, importing it if needed.
+
+        Args:
+            name: Algorithm name
+
+        Returns:
+            Callable creating a hasher, or the ImageHasher class for
+            perceptual hashes
+        """
+        factory = cls._loaded.get(name)
+        if factory is None:
+            cls.kind(name)
+            factory = cls._loaded[name] = cls._providers[name][1]()
+        return factory
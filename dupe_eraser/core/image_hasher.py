@@ -0,0 +1,193 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from PIL import Image
+
+
+def hash_images(
+    hash_names: Sequence[str], paths: List[str]
+) -> List[Optional[Dict[str, str]]]:
+    """Hash a batch of images inside a pool worker.
+
+    Module-level so it can be pickled for process pools.
+
+    Args:
+        hash_names: Perceptual hashes to compute
+        paths: Paths of the images
+
+    Returns:
+        List aligned with paths of {hash name: hex digest}, None for images
+        that could not be decoded
+    """
+    return ImageHasher(hash_names).hash_batch(paths)
+
+
+class ImageHasher:
+    """Batched perceptual hashing computing several hashes from one decode.
+
+    JPEGs are decoded directly at a reduced scale with PIL's draft mode, then
+    every image of the batch is shrunk once to a small thumbnail. The hash
+    math itself runs on NumPy arrays stacked across the whole batch. Results
+    are hex strings in the same format as imagehash.
+    """
+
+    HASH_NAMES = ("ahash", "phash", "dhash", "whash", "colorhash")
+
+    HASH_SIZE = 8
+    # Side of the thumbnail every hash is derived from
+    THUMBNAIL_SIZE = 64
+    # pHash keeps the low frequencies of a DCT over a 32x32 image
+    PHASH_SIZE = 32
+    COLORHASH_BINBITS = 3
+
+    def __init__(self, hash_names: Sequence[str] = HASH_NAMES):
+        """Initialize the hasher.
+
+        Args:
+            hash_names: Perceptual hashes to compute for every image
+        """
+        unknown = set(hash_names) - set(self.HASH_NAMES)
+        if unknown:
+            raise ValueError(f"Unsupported perceptual hashes: {', '.join(unknown)}")
+        self.hash_names = tuple(hash_names)
+
+        # Rows of the unnormalised DCT-II matrix for the kept low frequencies
+        n = np.arange(self.PHASH_SIZE)
+        k = np.arange(self.HASH_SIZE)[:, None]
+        self._dct = np.cos(np.pi * k * (2 * n + 1) / (2 * self.PHASH_SIZE))
+
+    def load(self, filepath: str) -> Optional[Image.Image]:
+        """Decode an image at reduced scale into an RGB thumbnail.
+
+        Args:
+            filepath: Path to the image
+
+        Returns:
+            Square RGB thumbnail, or None if the file cannot be decoded
+        """
+        size = (self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE)
+        try:
+            with Image.open(filepath) as img:
+                # Only JPEG supports draft; other formats are decoded in full
+                img.draft("RGB", size)
+                return img.convert("RGB").resize(size, Image.LANCZOS)
+        except Exception:
+            return None
+
+    def hash_batch(self, paths: List[str]) -> List[Optional[Dict[str, str]]]:
+        """Compute every configured hash for a batch of images.
+
+        Args:
+            paths: Paths of the images
+
+        Returns:
+            List aligned with paths of {hash name: hex digest}, None for images
+            that could not be decoded
+        """
+        thumbnails = [self.load(path) for path in paths]
+        decoded = [thumb for thumb in thumbnails if thumb is not None]
+        if not decoded:
+            return [None] * len(paths)
+
+        bits = {name: getattr(self, f"_{name}")(decoded) for name in self.hash_names}
+
+        results: List[Optional[Dict[str, str]]] = []
+        index = 0
+        for thumb in thumbnails:
+            if thumb is None:
+                results.append(None)
+                continue
+            results.append(
+                {name: self._to_hex(bits[name][index]) for name in self.hash_names}
+            )
+            index += 1
+        return results
+
+    def _gray(self, images: List[Image.Image], width: int, height: int) -> np.ndarray:
+        """Stack grayscale resized copies of the images into one array."""
+        return np.stack(
+            [
+                np.asarray(img.convert("L").resize((width, height), Image.LANCZOS))
+                for img in images
+            ]
+        ).astype(np.float64)
+
+    def _ahash(self, images: List[Image.Image]) -> np.ndarray:
+        pixels = self._gray(images, self.HASH_SIZE, self.HASH_SIZE)
+        means = pixels.mean(axis=(1, 2), keepdims=True)
+        return (pixels > means).reshape(len(images), -1)
+
+    def _dhash(self, images: List[Image.Image]) -> np.ndarray:
+        pixels = self._gray(images, self.HASH_SIZE + 1, self.HASH_SIZE)
+        return (pixels[:, :, 1:] > pixels[:, :, :-1]).reshape(len(images), -1)
+
+    def _phash(self, images: List[Image.Image]) -> np.ndarray:
+        pixels = self._gray(images, self.PHASH_SIZE, self.PHASH_SIZE)
+        # 2-D DCT of the whole batch, restricted to the low frequencies
+        low = self._dct @ pixels @ self._dct.T
+        flat = low.reshape(len(images), -1)
+        medians = np.median(flat, axis=1, keepdims=True)
+        return flat > medians
+
+    def _whash(self, images: List[Image.Image]) -> np.ndarray:
+        # With the global LL coefficient removed, the Haar approximation at
+        # the hash level is the block average of the image minus its mean,
+        # and subtracting a constant does not change the comparison below
+        size = self.THUMBNAIL_SIZE
+        block = size // self.HASH_SIZE
+        pixels = self._gray(images, size, size)
+        blocks = pixels.reshape(
+            len(images), self.HASH_SIZE, block, self.HASH_SIZE, block
+        ).mean(axis=(2, 4))
+        flat = blocks.reshape(len(images), -1)
+        medians = np.median(flat, axis=1, keepdims=True)
+        return flat > medians
+
+    def _colorhash(self, images: List[Image.Image]) -> np.ndarray:
+        intensity = np.stack([np.asarray(img.convert("L")) for img in images])
+        hsv = np.stack([np.asarray(img.convert("HSV")) for img in images])
+        intensity = intensity.reshape(len(images), -1)
+        hue = hsv[..., 0].reshape(len(images), -1)
+        saturation = hsv[..., 1].reshape(len(images), -1)
+
+        black = intensity < 256 // 8
+        gray = saturation < 256 // 3
+        colors = ~black & ~gray
+        faint = colors & (saturation < 256 * 2 // 3)
+        bright = colors & (saturation > 256 * 2 // 3)
+
+        # Six hue bins, counted separately for faint and bright colours
+        hue_bins = np.minimum(np.digitize(hue, np.linspace(0, 255, 7)[1:-1]), 5)
+        faint_counts = np.stack(
+            [(faint & (hue_bins == b)).sum(axis=1) for b in range(6)], axis=1
+        )
+        bright_counts = np.stack(
+            [(bright & (hue_bins == b)).sum(axis=1) for b in range(6)], axis=1
+        )
+        color_total = np.maximum(1, colors.sum(axis=1, keepdims=True))
+
+        max_value = 2**self.COLORHASH_BINBITS
+        fractions = np.concatenate(
+            [
+                black.mean(axis=1, keepdims=True),
+                (~black & gray).mean(axis=1, keepdims=True),
+                faint_counts / color_total,
+                bright_counts / color_total,
+            ],
+            axis=1,
+        )
+        values = np.minimum(max_value - 1, (fractions * max_value).astype(int))
+
+        binbits = self.COLORHASH_BINBITS
+        bits = [
+            (values // 2 ** (binbits - i - 1)) % 2 ** (binbits - i) > 0
+            for i in range(binbits)
+        ]
+        return np.stack(bits, axis=2).reshape(len(images), -1)
+
+    @staticmethod
+    def _to_hex(bits: np.ndarray) -> str:
+        value = 0
+        for bit in bits:
+            value = (value << 1) | int(bit)
+        return f"{value:0{(len(bits) + 3) // 4}x}"
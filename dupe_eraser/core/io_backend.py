@@ -0,0 +1,165 @@
+import contextlib
+import os
+from typing import Callable, ContextManager, List, Optional, Tuple, Union
+
+# A file to read: its path, the (offset, length) ranges to read in order and
+# the callable receiving each range's data
+FeedJob = Tuple[str, List[Tuple[int, int]], Callable[[bytes], object]]
+
+# Context manager of the requests of a backend that does not account for them
+_NO_ACCOUNTING = contextlib.nullcontext()
+
+
+class IOBackend:
+    """Blocking file access issuing one read request at a time.
+
+    Reads are positional, so a file descriptor can be shared by several
+    outstanding requests. Subclasses overlap requests to hide per-request
+    latency; wrappers can also alter requests, e.g. to inject latency.
+    """
+
+    # Number of read requests this backend keeps in flight
+    queue_depth = 1
+    # Whether readers may bypass the backend for their own buffered and
+    # memory-mapped read paths, only true of plain blocking access
+    native = True
+    # Whether requests wait for a rate or concurrency budget
+    throttled = False
+
+    @property
+    def is_concurrent(self) -> bool:
+        """Whether requests of a batch are overlapped."""
+        return self.queue_depth > 1
+
+    def open(self, filepath: str) -> int:
+        """Open a file for reading.
+
+        Args:
+            filepath: Path to the file
+
+        Returns:
+            int: File descriptor
+        """
+        return os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+
+    def close(self, fd: int) -> None:
+        """Close a file descriptor returned by open."""
+        os.close(fd)
+
+    def pread(self, fd: int, length: int, offset: int) -> bytes:
+        """Read a range of a file, short only at end of file.
+
+        Args:
+            fd: File descriptor returned by open
+            length: Number of bytes to read
+            offset: Position of the first byte
+
+        Returns:
+            bytes: Data read
+        """
+        chunks = []
+        while length > 0:
+            chunk = os.pread(fd, length, offset)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            length -= len(chunk)
+            offset += len(chunk)
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+    def open_many(self, filepaths: List[str]) -> List[Union[int, OSError]]:
+        """Open several files for reading.
+
+        Args:
+            filepaths: Paths to the files
+
+        Returns:
+            List aligned with filepaths of file descriptors, or the error raised
+        """
+        results: List[Union[int, OSError]] = []
+        for filepath in filepaths:
+            try:
+                results.append(self.open(filepath))
+            except OSError as e:
+                results.append(e)
+        return results
+
+    def pread_many(
+        self, requests: List[Tuple[int, int, int]]
+    ) -> List[Union[bytes, OSError]]:
+        """Read several ranges, possibly of different files.
+
+        Args:
+            requests: (file descriptor, length, offset) tuples
+
+        Returns:
+            List aligned with requests of the data read, or the error raised
+        """
+        results: List[Union[bytes, OSError]] = []
+        for request in requests:
+            try:
+                results.append(self.pread(*request))
+            except OSError as e:
+                results.append(e)
+        return results
+
+    def feed_many(self, jobs: List[FeedJob]) -> List[Optional[OSError]]:
+        """Read ranges of many files, each file's ranges delivered in order.
+
+        Args:
+            jobs: (path, ranges, update) tuples
+
+        Returns:
+            List aligned with jobs of None, or the error that stopped the job
+        """
+        errors: List[Optional[OSError]] = []
+        for job in jobs:
+            try:
+                self.feed(*job)
+                errors.append(None)
+            except OSError as e:
+                errors.append(e)
+        return errors
+
+    def feed(
+        self,
+        filepath: str,
+        ranges: List[Tuple[int, int]],
+        update: Callable[[bytes], object],
+    ) -> None:
+        """Read ranges of one file in order, stopping at end of file."""
+        fd = self.open(filepath)
+        try:
+            for offset, length in ranges:
+                data = self.pread(fd, length, offset)
+                if data:
+                    update(data)
+                if len(data) < length:
+                    return
+        finally:
+            self.close(fd)
+
+    def request(self, length: int = 0) -> ContextManager[None]:
+        """Account for a request issued by a native read path.
+
+        Readers bypassing the backend wrap every open and read in it, so a
+        wrapper limiting requests still sees them.
+
+        Args:
+            length: Number of bytes the request reads, 0 for an open
+
+        Returns:
+            Context manager around the request
+        """
+        return _NO_ACCOUNTING
+
+    def shutdown(self) -> None:
+        """Release the resources of the backend."""
+
+    @staticmethod
+    def block_ranges(file_size: int, block_size: int) -> List[Tuple[int, int]]:
+        """Split a whole file into consecutive (offset, length) blocks."""
+        return [
+            (offset, min(block_size, file_size - offset))
+            for offset in range(0, file_size, block_size)
+        ]
@@ -0,0 +1,5 @@
+class IOBackendKind:
+    """Enum-like class for file read backends."""
+
+    SYNC = "sync"
+    ASYNC = "async"
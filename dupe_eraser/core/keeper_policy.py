@@ -0,0 +1,110 @@
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.duplicate_group import DuplicateGroup
+from core.file_entry import FileEntry
+
+
+class KeeperPolicy:
+    """Rules choosing which file of a duplicate group is kept.
+
+    Rules are applied in order, each later rule only breaking the ties left
+    by the earlier ones, and files still tied keep the order they were found
+    in. Every rule works from the stat records collected by the scan, so
+    choosing a keeper costs no extra system call.
+    """
+
+    # Keep the file found first, the default
+    FIRST = "first"
+    # Keep the file with the oldest or newest modification time
+    OLDEST = "oldest"
+    NEWEST = "newest"
+    # Keep the file with the shortest path, usually the least nested
+    SHORTEST_PATH = "shortest-path"
+    # Keep the file under the first matching preferred directory
+    PREFERRED_DIR = "preferred-dir"
+    # Keep the file with the most hard links, since removing any of them
+    # would not free its space
+    MOST_LINKS = "most-links"
+
+    POLICIES = (FIRST, OLDEST, NEWEST, SHORTEST_PATH, PREFERRED_DIR, MOST_LINKS)
+
+    def __init__(
+        self,
+        policies: Optional[List[str]] = None,
+        preferred_dirs: Optional[List[str]] = None,
+    ):
+        """Initialize the policy.
+
+        Args:
+            policies: Rules to apply in order of precedence, FIRST if None
+            preferred_dirs: Directories whose files are kept over others, in
+                order of preference. If given, PREFERRED_DIR takes precedence
+                over every other rule unless it is listed explicitly.
+        """
+        policies = list(policies or [self.FIRST])
+        for position, policy in enumerate(policies):
+            if policy not in self.POLICIES:
+                raise ValueError(
+                    f"Unsupported keeper policy '{policy}'. "
+                    f"Available options: {', '.join(self.POLICIES)}"
+                )
+            # FIRST leaves no tie for a later rule to break
+            if policy == self.FIRST and position < len(policies) - 1:
+                raise ValueError(
+                    f"Keeper policy '{self.FIRST}' must be the last rule, "
+                    f"not followed by {', '.join(policies[position + 1 :])}"
+                )
+        self.preferred_dirs = [
+            os.path.join(os.path.abspath(directory), "")
+            for directory in preferred_dirs or []
+        ]
+        if self.preferred_dirs and self.PREFERRED_DIR not in policies:
+            policies.insert(0, self.PREFERRED_DIR)
+        self.policies = policies
+
+        keys: Dict[str, Callable[[FileEntry], object]] = {
+            self.OLDEST: lambda entry: entry.mtime_ns,
+            self.NEWEST: lambda entry: -entry.mtime_ns,
+            self.SHORTEST_PATH: lambda entry: len(entry.path),
+            self.PREFERRED_DIR: self._preference,
+            self.MOST_LINKS: lambda entry: -entry.nlink,
+        }
+        # FIRST orders nothing: ties are already kept in discovery order, and
+        # it can only be the last rule
+        self._keys = [keys[policy] for policy in policies if policy != self.FIRST]
+
+    @property
+    def is_default(self) -> bool:
+        """Whether the first file found is always kept."""
+        return not self._keys
+
+    def order(self, group: DuplicateGroup) -> DuplicateGroup:
+        """Move the file to keep to the front of a group.
+
+        Args:
+            group: Duplicate group, its files in the order they were found
+
+        Returns:
+            The group with its keeper first, the other files in their order
+        """
+        if not self._keys:
+            return group
+        files = group.files
+        keeper = min(range(len(files)), key=lambda i: self._key(files[i], i))
+        if keeper == 0:
+            return group
+        return group._replace(
+            files=[files[keeper]] + files[:keeper] + files[keeper + 1 :]
+        )
+
+    def _key(self, entry: FileEntry, position: int) -> Tuple:
+        return tuple(key(entry) for key in self._keys) + (position,)
+
+    def _preference(self, entry: FileEntry) -> int:
+        # Scanned paths are already absolute
+        path = entry.path if os.path.isabs(entry.path) else os.path.abspath(entry.path)
+        for rank, directory in enumerate(self.preferred_dirs):
+            if path.startswith(directory):
+                return rank
+        return len(self.preferred_dirs)
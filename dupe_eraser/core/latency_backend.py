@@ -0,0 +1,41 @@
+import time
+from typing import Optional
+
+from core.io_backend import IOBackend
+
+
+class LatencyBackend(IOBackend):
+    """Backend adding a fixed delay to every request of another backend.
+
+    Stands in for a high-latency network filesystem, so concurrent backends
+    can be tried and measured against local files.
+    """
+
+    native = False
+
+    def __init__(self, latency: float, base: Optional[IOBackend] = None):
+        """Initialize the backend.
+
+        Args:
+            latency: Delay in seconds added to every open and read request
+            base: Backend performing the actual requests, a plain IOBackend
+                by default
+        """
+        if latency < 0:
+            raise ValueError("Latency cannot be negative")
+        self.latency = latency
+        self.base = base or IOBackend()
+
+    def open(self, filepath: str) -> int:
+        time.sleep(self.latency)
+        return self.base.open(filepath)
+
+    def close(self, fd: int) -> None:
+        self.base.close(fd)
+
+    def pread(self, fd: int, length: int, offset: int) -> bytes:
+        time.sleep(self.latency)
+        return self.base.pread(fd, length, offset)
+
+    def shutdown(self) -> None:
+        self.base.shutdown()
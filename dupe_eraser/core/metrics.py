@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import humanize
+
+from core.operation_metrics import OperationMetrics
+
+
+class Metrics:
+    """Thread-safe registry of per-operation timings of a run.
+
+    Every I/O or CPU step of the pipeline reports here: stat (one
+    observation per directory listed), open, read, hash, compare and unlink,
+    plus the time requests were held back by I/O throttling. Comparing their
+    totals shows whether a run is bound by metadata, disk or CPU. Snapshots
+    can be exported as JSON or in the Prometheus text format, once or
+    periodically from a background thread.
+    """
+
+    OPERATIONS = (
+        "stat",
+        "open",
+        "read",
+        "hash",
+        "compare",
+        "unlink",
+        "throttle",
+    )
+
+    JSON = "json"
+    PROMETHEUS = "prometheus"
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.started = time.time()
+        self.operations: Dict[str, OperationMetrics] = {
+            name: OperationMetrics(name) for name in self.OPERATIONS
+        }
+        self._lock = threading.Lock()
+        self._export_stop: Optional[threading.Event] = None
+        self._export_thread: Optional[threading.Thread] = None
+
+    def observe(self, operation: str, seconds: float, size: int = 0, count: int = 1):
+        """Record the time taken by one or more operations.
+
+        Args:
+            operation: One of OPERATIONS
+            seconds: Time taken
+            size: Number of bytes processed
+            count: Number of operations covered by the observation
+        """
+        with self._lock:
+            self.operations[operation].observe(seconds, size, count)
+
+    @contextmanager
+    def time(self, operation: str, size: int = 0) -> Iterator[None]:
+        """Time the body of a with statement as one operation."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(operation, time.perf_counter() - start_time, size)
+
+    def snapshot(self) -> dict:
+        """Current aggregates as a JSON serialisable dictionary."""
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "uptime_seconds": time.time() - self.started,
+                "operations": {
+                    name: metrics.snapshot()
+                    for name, metrics in self.operations.items()
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Current aggregates in the Prometheus text exposition format."""
+        lines = [
+            "# HELP dupe_eraser_operation_seconds Time spent per operation.",
+            "# TYPE dupe_eraser_operation_seconds histogram",
+        ]
+        with self._lock:
+            for name, metrics in self.operations.items():
+                cumulative = 0
+                for index, bucket in enumerate(metrics.buckets):
+                    cumulative += bucket
+                    bound = metrics.bucket_bound(index)
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f'dupe_eraser_operation_seconds_bucket{{operation="{name}",'
+                        f'le="{le}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'dupe_eraser_operation_seconds_sum{{operation="{name}"}} '
+                    f"{metrics.total_time}"
+                )
+                lines.append(
+                    f'dupe_eraser_operation_seconds_count{{operation="{name}"}} '
+                    f"{sum(metrics.buckets)}"
+                )
+            lines.append("# HELP dupe_eraser_operations_total Operations performed.")
+            lines.append("# TYPE dupe_eraser_operations_total counter")
+            for name, metrics in self.operations.items():
+                lines.append(
+                    f'dupe_eraser_operations_total{{operation="{name}"}} '
+                    f"{metrics.count}"
+                )
+            lines.append("# HELP dupe_eraser_bytes_total Bytes processed.")
+            lines.append("# TYPE dupe_eraser_bytes_total counter")
+            for name, metrics in self.operations.items():
+                lines.append(
+                    f'dupe_eraser_bytes_total{{operation="{name}"}} {metrics.bytes}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: str = JSON) -> None:
+        """Atomically write a snapshot to a file.
+
+        Args:
+            path: Destination file, replaced on every write so readers never
+                see a partial snapshot
+            fmt: Metrics.JSON or Metrics.PROMETHEUS
+        """
+        if fmt == self.PROMETHEUS:
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def start_export(self, path: str, fmt: str = JSON, interval: float = 10.0):
+        """Write a snapshot every interval seconds until stop_export.
+
+        Args:
+            path: Destination file
+            fmt: Metrics.JSON or Metrics.PROMETHEUS
+            interval: Seconds between two snapshots
+        """
+        if fmt not in (self.JSON, self.PROMETHEUS):
+            raise ValueError(f"Unsupported metrics format: {fmt}")
+        self._export_stop = threading.Event()
+
+        def export() -> None:
+            while not self._export_stop.wait(interval):
+                try:
+                    self.write(path, fmt)
+                except OSError as e:
+                    logging.error(f"Error writing metrics to {path}: {e}")
+
+        self._export_thread = threading.Thread(
+            target=export, name="metrics-export", daemon=True
+        )
+        self._export_thread.start()
+
+    def stop_export(self) -> None:
+        """Stop the periodic export started by start_export."""
+        if self._export_thread is not None:
+            self._export_stop.set()
+            self._export_thread.join()
+            self._export_thread = None
+
+    def log_summary(self) -> None:
+        """Log the time spent in each operation."""
+        logging.info("Time by operation:")
+        for metrics in self.operations.values():
+            if not metrics.count:
+                continue
+            logging.info(
+                f"  {metrics.name}: {metrics.count} ops, "
+                f"{humanize.naturalsize(metrics.bytes)}, "
+                f"{metrics.total_time:.2f} s total, "
+                f"p50 {metrics.quantile(0.5) * 1000:.3f} ms, "
+                f"p99 {metrics.quantile(0.99) * 1000:.3f} ms"
+            )
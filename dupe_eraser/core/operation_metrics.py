@@ -0,0 +1,96 @@
+from typing import List
+
+
+class OperationMetrics:
+    """Fixed-size aggregate of the timings of one kind of operation.
+
+    Keeps a count, a byte total and a latency histogram with power-of-two
+    buckets from 1 microsecond up, so memory stays constant however many
+    operations are observed.
+    """
+
+    # Upper bound of the first bucket, in seconds
+    BASE_LATENCY = 1e-6
+    # Buckets cover latencies up to BASE_LATENCY * 2**(BUCKETS - 2), about
+    # 9 minutes; the last bucket catches anything slower
+    BUCKETS = 31
+
+    def __init__(self, name: str):
+        """Initialize empty aggregates.
+
+        Args:
+            name: Name of the operation
+        """
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets: List[int] = [0] * self.BUCKETS
+
+    def observe(self, seconds: float, size: int = 0, count: int = 1) -> None:
+        """Record one or more operations that took a given time.
+
+        Args:
+            seconds: Time taken
+            size: Number of bytes processed
+            count: Number of operations covered by the observation
+        """
+        self.count += count
+        self.bytes += size
+        self.total_time += seconds
+        if seconds > self.max_time:
+            self.max_time = seconds
+        # Bucket i holds latencies below BASE_LATENCY * 2**i
+        index = int(seconds / self.BASE_LATENCY).bit_length()
+        self.buckets[min(index, self.BUCKETS - 1)] += 1
+
+    @classmethod
+    def bucket_bound(cls, index: int) -> float:
+        """Upper latency bound of a histogram bucket in seconds."""
+        if index >= cls.BUCKETS - 1:
+            return float("inf")
+        return cls.BASE_LATENCY * 2**index
+
+    def quantile(self, q: float) -> float:
+        """Estimate a latency quantile from the histogram.
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            float: Upper bound of the bucket holding the quantile, in seconds
+        """
+        observations = sum(self.buckets)
+        if not observations:
+            return 0.0
+        rank = q * observations
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(self.bucket_bound(index), self.max_time)
+        return self.max_time
+
+    @property
+    def avg_speed_mbps(self) -> float:
+        """Calculate average speed in MB/s."""
+        if not self.total_time:
+            return 0.0
+        return self.bytes / (1024 * 1024) / self.total_time
+
+    def snapshot(self) -> dict:
+        """Aggregates as a JSON serialisable dictionary."""
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "seconds": self.total_time,
+            "max_seconds": self.max_time,
+            "p50_seconds": self.quantile(0.5),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": {
+                str(self.bucket_bound(index)): bucket
+                for index, bucket in enumerate(self.buckets)
+                if bucket
+            },
+        }
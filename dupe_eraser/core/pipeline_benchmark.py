@@ -0,0 +1,339 @@
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import humanize
+from tabulate import tabulate
+
+from core.comparison_method import ComparisonMethod
+from core.duplicate_action import DuplicateAction
+from core.duplicate_group import DuplicateGroup
+from core.duplicate_remover import DuplicateRemover
+from core.file_entry import FileEntry
+
+
+class PipelineBenchmark:
+    """End-to-end throughput of every stage of the deduplication pipeline.
+
+    Each stage runs on the output of the previous one, exactly as during a
+    cross-tree run, and is timed separately. Stages are only repeated for the
+    settings that affect them: scanning for each worker count, hashing for
+    each algorithm, block size and worker count, byte comparison for each
+    block size. The best of several iterations is kept, so results mostly
+    reflect warm page cache performance.
+    """
+
+    STAGES = ("scan", "size", "prefilter", "hash", "compare", "delete")
+
+    def __init__(
+        self,
+        root_dir: str,
+        iterations: int = 3,
+        prefilter_kb: int = 16,
+        prefilter_samples: int = 3,
+    ):
+        """Initialize the benchmark.
+
+        Args:
+            root_dir: Root of the tree to benchmark, typically a SyntheticTree
+            iterations: Number of timed runs of each measurement
+            prefilter_kb: Size in KiB of each prefilter sample
+            prefilter_samples: Number of interior prefilter samples
+        """
+        if iterations < 1:
+            raise ValueError("Number of iterations must be at least 1")
+        self.root_dir = root_dir
+        self.iterations = iterations
+        self.prefilter_kb = prefilter_kb
+        self.prefilter_samples = prefilter_samples
+
+    def run(
+        self,
+        algorithms: Iterable[str] = ("xxh3_128",),
+        block_sizes: Iterable[Optional[int]] = (None,),
+        workers: Iterable[int] = (1,),
+    ) -> List[dict]:
+        """Measure every stage over the given settings.
+
+        Args:
+            algorithms: Hash algorithms to measure
+            block_sizes: Read block sizes in bytes, None for the automatic
+                choice
+            workers: Worker counts used for scanning, prefiltering and hashing
+
+        Returns:
+            List of result records, one per stage and setting
+        """
+        algorithms = list(algorithms)
+        block_sizes = list(block_sizes)
+        results = []
+
+        for worker_count in workers:
+            entries = self._measure(
+                results,
+                "scan",
+                lambda remover: list(remover.scanner.scan(self.root_dir)),
+                lambda entries: (len(entries), sum(e.size for e in entries)),
+                scan_workers=worker_count,
+                record_workers=worker_count,
+            )
+        if not entries:
+            return results
+
+        buckets = self._measure(
+            results,
+            "size",
+            lambda remover: self._size_buckets(remover, entries),
+            lambda _: (len(entries), sum(e.size for e in entries)),
+        )
+
+        for worker_count in workers:
+            candidates = self._measure(
+                results,
+                "prefilter",
+                lambda remover: [
+                    (size, group)
+                    for size, files in buckets
+                    for group in remover._prefilter(files, size)
+                ],
+                lambda remover: (
+                    sum(len(files) for _, files in buckets),
+                    remover.stage_stats["sample"].bytes_read,
+                ),
+                workers=worker_count,
+                record_workers=worker_count,
+                stats_from_remover=True,
+            )
+
+        groups: List[DuplicateGroup] = []
+        for algorithm in algorithms:
+            for block_size in block_sizes:
+                for worker_count in workers:
+                    groups = self._measure(
+                        results,
+                        "hash",
+                        lambda remover: self._group(remover, candidates),
+                        lambda remover: (
+                            remover.stage_stats["full"].candidates,
+                            remover.stage_stats["full"].bytes_read,
+                        ),
+                        hash_algorithm=algorithm,
+                        block_size=block_size,
+                        workers=worker_count,
+                        record_workers=worker_count,
+                        stats_from_remover=True,
+                    )
+
+        for block_size in block_sizes:
+            self._measure(
+                results,
+                "compare",
+                lambda remover: self._group(remover, candidates),
+                lambda remover: (
+                    remover.stage_stats["full"].candidates,
+                    remover.stage_stats["full"].bytes_read,
+                ),
+                comparison_method=ComparisonMethod.BYTES,
+                block_size=block_size,
+                stats_from_remover=True,
+            )
+
+        results.append(self._measure_delete(groups))
+        return results
+
+    def _measure(
+        self,
+        results: List[dict],
+        stage: str,
+        func: Callable[[DuplicateRemover], object],
+        volume: Callable[[object], Tuple[int, int]],
+        record_workers: Optional[int] = None,
+        stats_from_remover: bool = False,
+        **settings,
+    ):
+        """Time func on a fresh remover, keeping the best of the iterations.
+
+        Args:
+            results: List the result record is appended to
+            stage: Name of the stage
+            func: Stage to run, given a remover built with settings
+            volume: Callable returning the (files, bytes) processed, given the
+                output of func or the remover when stats_from_remover is set
+            record_workers: Worker count to report, if relevant to the stage
+            stats_from_remover: Whether volume reads the remover's statistics
+            settings: Keyword arguments of the DuplicateRemover
+
+        Returns:
+            The output of the last run of func
+        """
+        settings.setdefault("prefilter_kb", self.prefilter_kb)
+        settings.setdefault("prefilter_samples", self.prefilter_samples)
+        best = None
+        for _ in range(self.iterations):
+            remover = DuplicateRemover(show_progress=False, **settings)
+            try:
+                start_time = time.perf_counter()
+                output = func(remover)
+                elapsed = time.perf_counter() - start_time
+                files, size = volume(remover if stats_from_remover else output)
+            finally:
+                remover.close()
+            if best is None or elapsed < best:
+                best = elapsed
+
+        results.append(
+            self._record(
+                stage,
+                files,
+                size,
+                best,
+                algorithm=(
+                    settings.get("hash_algorithm", "xxh3_128")
+                    if stage == "hash"
+                    else None
+                ),
+                block_size=settings.get("block_size"),
+                workers=record_workers,
+            )
+        )
+        return output
+
+    @staticmethod
+    def _size_buckets(
+        remover: DuplicateRemover, entries: List[FileEntry]
+    ) -> List[Tuple[int, List[FileEntry]]]:
+        buckets = []
+        for size, files in remover.group_files_by_size(entries).items():
+            files = remover._skip_hard_links(files)
+            if len(files) > 1:
+                buckets.append((size, files))
+        return buckets
+
+    @staticmethod
+    def _group(
+        remover: DuplicateRemover, candidates: List[Tuple[int, List[FileEntry]]]
+    ) -> List[DuplicateGroup]:
+        groups = []
+        for size, files in candidates:
+            groups.extend(remover.group_duplicates(files, size))
+        return groups
+
+    def _measure_delete(self, groups: List[DuplicateGroup]) -> dict:
+        """Time the removal of every duplicate without altering the tree.
+
+        Each duplicate gets a scratch hard link which is then deleted, so the
+        measured cost is the same unlink a real run performs.
+        """
+        best = None
+        duplicates = [
+            (entry, f"{entry.path}.benchmark-delete", group.keeper.path)
+            for group in groups
+            for entry in group.duplicates
+        ]
+        for _ in range(self.iterations):
+            for entry, scratch, _ in duplicates:
+                os.link(entry.path, scratch)
+            remover = DuplicateRemover(
+                show_progress=False, action=DuplicateAction.DELETE
+            )
+            try:
+                start_time = time.perf_counter()
+                for _, scratch, keeper in duplicates:
+                    remover.replacer.replace(scratch, keeper)
+                elapsed = time.perf_counter() - start_time
+            finally:
+                remover.close()
+                for _, scratch, _ in duplicates:
+                    if os.path.lexists(scratch):
+                        os.remove(scratch)
+            if best is None or elapsed < best:
+                best = elapsed
+
+        return self._record(
+            "delete",
+            len(duplicates),
+            sum(entry.size for entry, _, _ in duplicates),
+            best,
+        )
+
+    @staticmethod
+    def _record(
+        stage: str,
+        files: int,
+        size: int,
+        seconds: float,
+        algorithm: Optional[str] = None,
+        block_size: Optional[int] = None,
+        workers: Optional[int] = None,
+    ) -> dict:
+        return {
+            "stage": stage,
+            "algorithm": algorithm,
+            "block_size": block_size,
+            "workers": workers,
+            "files": files,
+            "bytes": size,
+            "seconds": seconds,
+            "files_per_s": files / seconds if seconds > 0 else 0.0,
+            "mb_per_s": size / (1024 * 1024) / seconds if seconds > 0 else 0.0,
+        }
+
+    @staticmethod
+    def key(record: dict) -> Tuple:
+        """Settings identifying a measurement across runs."""
+        return (
+            record["stage"],
+            record["algorithm"],
+            record["block_size"],
+            record["workers"],
+        )
+
+    @staticmethod
+    def format_results(
+        results: List[dict], baseline: Optional[List[dict]] = None
+    ) -> str:
+        """Format results as a table, optionally against a baseline run.
+
+        Args:
+            results: Result records of this run
+            baseline: Result records of an earlier run to compare with
+
+        Returns:
+            str: The formatted table
+        """
+        previous: Dict[Tuple, dict] = {
+            PipelineBenchmark.key(record): record for record in baseline or []
+        }
+        headers = ["Stage", "Algorithm", "Block", "Workers", "Files", "Data"]
+        headers += ["Time", "Files/s", "MB/s"]
+        if baseline is not None:
+            headers.append("vs baseline")
+
+        table_data = []
+        for record in results:
+            block_size = record["block_size"]
+            row = [
+                record["stage"],
+                record["algorithm"] or "",
+                (
+                    humanize.naturalsize(block_size, binary=True)
+                    if block_size
+                    else ("auto" if record["stage"] in ("hash", "compare") else "")
+                ),
+                record["workers"] or "",
+                record["files"],
+                humanize.naturalsize(record["bytes"]),
+                f"{record['seconds'] * 1000:.1f} ms",
+                f"{record['files_per_s']:.0f}",
+                f"{record['mb_per_s']:.1f}",
+            ]
+            if baseline is not None:
+                old = previous.get(PipelineBenchmark.key(record))
+                if old is None or not old["seconds"]:
+                    row.append("")
+                else:
+                    # Time ratio, so it holds for stages measured in files too
+                    row.append(f"{old['seconds'] / record['seconds']:.2f}x")
+            table_data.append(row)
+
+        return tabulate(table_data, headers=headers, tablefmt="grid")
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import time
+from typing import List, Optional, Set, Tuple
+
+import humanize
+
+from core.duplicate_action import DuplicateAction
+from core.duplicate_report import DuplicateReport
+from core.file_replacer import FileReplacer
+from core.hash_pool import hash_file
+
+
+class PlanApplier:
+    """Apply a duplicate plan written by an earlier scan.
+
+    Nothing is rescanned or rehashed: before each duplicate is replaced, the
+    duplicate and its keeper are stat'ed and must still have the size and
+    modification time recorded in the plan. Any file that changed since the
+    scan is left untouched. A plan merged from shards on several hosts is
+    applied on each host to the duplicates of its own shard. A keeper on
+    another shard cannot be checked from there, so its own shard first
+    confirms it still has the recorded size, mtime and digest, and groups
+    whose keeper was not confirmed are skipped.
+    """
+
+    CONFIRMATIONS_FORMAT = "dupe_eraser-confirmations"
+    VERSION = 1
+
+    def __init__(
+        self,
+        action: Optional[str] = None,
+        print_only: bool = False,
+        shard: Optional[str] = None,
+        confirmation_paths: Optional[List[str]] = None,
+    ):
+        """Initialize the applier.
+
+        Args:
+            action: DuplicateAction overriding the one recorded in the plan,
+                or None to use the plan's
+            print_only: Only log what would be done
+            shard: Only apply the duplicates of this shard of a merged plan,
+                or None to apply every duplicate
+            confirmation_paths: Files written by confirm_keepers on other
+                shards, vouching for the keepers they hold
+        """
+        self.action = action
+        self.print_only = print_only
+        self.shard = shard
+        # (shard, path, size, mtime_ns, digest) of every confirmed keeper
+        self.confirmed: Set[Tuple[str, str, int, int, str]] = set()
+        for path in confirmation_paths or []:
+            self.confirmed.update(self.read_confirmations(path))
+        self.files_replaced = 0
+        self.files_skipped = 0
+        self.space_saved = 0
+
+    def apply(self, plan_path: str) -> int:
+        """Apply every group of a plan.
+
+        Args:
+            plan_path: Path to the JSON Lines plan
+
+        Returns:
+            int: Number of duplicates deleted or replaced
+        """
+        records = DuplicateReport.read(plan_path)
+        header = next(records)
+        replacer = FileReplacer(self.action or header["action"])
+        if replacer.action == DuplicateAction.DELETE:
+            done = "Deleted duplicate"
+        else:
+            done = f"Replaced duplicate with {replacer.action}"
+        logging.info(
+            f"Applying plan of {header['root']} created {header['created']} "
+            f"({replacer.action})"
+        )
+
+        for group in records:
+            keeper = group["keeper"]
+            duplicates = group["duplicates"]
+            if self.shard is not None:
+                duplicates = [
+                    duplicate
+                    for duplicate in duplicates
+                    if duplicate.get("shard") == self.shard
+                ]
+                if not duplicates:
+                    continue
+
+            if self.shard is not None and keeper.get("shard") != self.shard:
+                # The keeper lives on another shard, possibly another host:
+                # it cannot be checked or linked to from here
+                if replacer.action != DuplicateAction.DELETE:
+                    logging.warning(
+                        f"\nSkipping group of {keeper['path']}: keeper on shard "
+                        f"'{keeper.get('shard')}' cannot be linked to"
+                    )
+                    self.files_skipped += len(duplicates)
+                    continue
+                key = self._confirmation_key(keeper, group["digest"])
+                if key not in self.confirmed:
+                    logging.warning(
+                        f"\nSkipping group of {keeper['path']}: keeper on shard "
+                        f"'{keeper.get('shard')}' not confirmed unchanged"
+                    )
+                    self.files_skipped += len(duplicates)
+                    continue
+            elif not self._unchanged(keeper):
+                logging.warning(
+                    f"\nSkipping group of {keeper['path']}: keeper changed "
+                    f"since the scan"
+                )
+                self.files_skipped += len(duplicates)
+                continue
+
+            for duplicate in duplicates:
+                if not self._unchanged(duplicate):
+                    logging.warning(
+                        f"\nSkipping {duplicate['path']}: changed since the scan"
+                    )
+                    self.files_skipped += 1
+                    continue
+                try:
+                    if not self.print_only:
+                        replacer.replace(duplicate["path"], keeper["path"])
+                    self.files_replaced += 1
+                    self.space_saved += duplicate["size"]
+                    logging.info(
+                        f"\n{done}: {duplicate['path']} "
+                        f"({humanize.naturalsize(duplicate['size'])})"
+                    )
+                except OSError as e:
+                    logging.error(f"\nError replacing {duplicate['path']}: {e}")
+
+        return self.files_replaced
+
+    def confirm_keepers(self, plan_path: str, confirmation_path: str) -> int:
+        """Confirm the keepers of this shard that other shards delete against.
+
+        Each such keeper is stat'ed and rehashed, and only recorded if it
+        still has the size, mtime and digest of the plan. The other shards
+        then apply the plan with the confirmations of every shard.
+
+        Args:
+            plan_path: Path to the JSON Lines plan written by a merge
+            confirmation_path: Path to the confirmations file, overwritten if
+                it exists
+
+        Returns:
+            int: Number of keepers confirmed
+        """
+        if self.shard is None:
+            raise ValueError("Keepers can only be confirmed for a shard")
+        records = DuplicateReport.read(plan_path)
+        header = next(records)
+        confirmed = 0
+        with open(confirmation_path, "w", encoding="utf-8") as f:
+            self._write_line(
+                f,
+                {
+                    "format": self.CONFIRMATIONS_FORMAT,
+                    "version": self.VERSION,
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "shard": self.shard,
+                },
+            )
+            for group in records:
+                keeper = group["keeper"]
+                if keeper.get("shard") != self.shard or all(
+                    duplicate.get("shard") == self.shard
+                    for duplicate in group["duplicates"]
+                ):
+                    continue
+                if not self._unchanged(keeper):
+                    logging.warning(
+                        f"\nNot confirming {keeper['path']}: changed since the scan"
+                    )
+                    continue
+                try:
+                    digest = hash_file(
+                        header["algorithm"], None, keeper["path"], keeper["size"]
+                    )
+                except OSError as e:
+                    logging.error(f"\nError reading {keeper['path']}: {e}")
+                    continue
+                if digest != group["digest"]:
+                    logging.warning(
+                        f"\nNot confirming {keeper['path']}: content changed "
+                        f"since the scan"
+                    )
+                    continue
+                self._write_line(
+                    f,
+                    {
+                        "path": keeper["path"],
+                        "size": keeper["size"],
+                        "mtime_ns": keeper["mtime_ns"],
+                        "digest": digest,
+                    },
+                )
+                confirmed += 1
+        return confirmed
+
+    @classmethod
+    def read_confirmations(
+        cls, path: str
+    ) -> Set[Tuple[str, str, int, int, str]]:
+        """Read the keepers confirmed by a shard.
+
+        Args:
+            path: Path to a confirmations file written by confirm_keepers
+
+        Returns:
+            Set of the (shard, path, size, mtime_ns, digest) of the keepers
+        """
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != cls.CONFIRMATIONS_FORMAT:
+                raise ValueError(f"{path} is not a dupe_eraser confirmations file")
+            if header.get("version") != cls.VERSION:
+                raise ValueError(
+                    f"Unsupported version {header.get('version')} in {path}"
+                )
+            return {
+                cls._confirmation_key(
+                    dict(record, shard=header["shard"]), record["digest"]
+                )
+                for record in map(json.loads, filter(str.strip, f))
+            }
+
+    @staticmethod
+    def _confirmation_key(
+        record: dict, digest: str
+    ) -> Tuple[str, str, int, int, str]:
+        return (
+            record.get("shard"),
+            record["path"],
+            record["size"],
+            record["mtime_ns"],
+            digest,
+        )
+
+    @staticmethod
+    def _write_line(f, record: dict) -> None:
+        # Paths that are not valid UTF-8 survive as escaped surrogates
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @staticmethod
+    def _unchanged(record: dict) -> bool:
+        """Check a file still has the size and mtime recorded in the plan."""
+        try:
+            st = os.stat(record["path"], follow_symlinks=False)
+        except OSError:
+            return False
+        return st.st_size == record["size"] and st.st_mtime_ns == record["mtime_ns"]
@@ -0,0 +1,5 @@
+class PoolKind:
+    """Enum-like class for hashing worker pool backends."""
+
+    THREAD = "thread"
+    PROCESS = "process"
@@ -0,0 +1,69 @@
+import logging
+import os
+import shutil
+import subprocess
+from typing import Optional
+
+
+class ProcessPriority:
+    """Lower the CPU and I/O scheduling priority of the running process.
+
+    Must be applied before any thread or worker process is started: Linux
+    schedules each thread on its own, and new threads and processes inherit
+    the priorities of the thread creating them.
+    """
+
+    # I/O scheduling classes of ionice(1)
+    IDLE = "idle"
+    BEST_EFFORT = "best-effort"
+    IO_CLASSES = (IDLE, BEST_EFFORT)
+    _IONICE_CLASSES = {IDLE: "3", BEST_EFFORT: "2"}
+
+    @classmethod
+    def lower(
+        cls,
+        nice: int = 0,
+        io_class: Optional[str] = None,
+        io_level: int = 7,
+    ) -> None:
+        """Lower the priorities of the process, logging what cannot be done.
+
+        Args:
+            nice: Increment added to the niceness of the process
+            io_class: I/O scheduling class, one of IO_CLASSES, or None to
+                keep the current one
+            io_level: Priority within the best-effort class, from 0 (highest)
+                to 7 (lowest)
+        """
+        if nice:
+            try:
+                os.nice(nice)
+            except (AttributeError, OSError) as e:
+                logging.error(f"Cannot change the niceness of the process: {e}")
+
+        if io_class is None:
+            return
+        if io_class not in cls.IO_CLASSES:
+            raise ValueError(
+                f"Unknown I/O class '{io_class}'. "
+                f"Available options: {', '.join(cls.IO_CLASSES)}"
+            )
+        if not 0 <= io_level <= 7:
+            raise ValueError("I/O priority level must be between 0 and 7")
+        ionice = shutil.which("ionice")
+        if ionice is None:
+            logging.error("Cannot change the I/O priority: ionice not found")
+            return
+        command = [ionice, "-c", cls._IONICE_CLASSES[io_class]]
+        if io_class == cls.BEST_EFFORT:
+            command += ["-n", str(io_level)]
+        try:
+            subprocess.run(
+                command + ["-p", str(os.getpid())],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+        except subprocess.CalledProcessError as e:
+            logging.error(f"Cannot change the I/O priority: {e.stderr.strip()}")
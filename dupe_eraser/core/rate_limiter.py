@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Optional
+
+from core.metrics import Metrics
+
+
+class RateLimiter:
+    """Token buckets bounding the bytes and operations issued per second.
+
+    One limiter is shared by every stage touching the storage, so their
+    combined load stays under the limits whatever the number of threads.
+    Each request takes its tokens up front, possibly driving a bucket into
+    debt, and then sleeps until the debt is paid back. Requests are served
+    in arrival order and never held under the lock while they wait.
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        ops_per_second: Optional[float] = None,
+        burst: float = 1.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            bytes_per_second: Maximum read throughput, or None for no limit
+            ops_per_second: Maximum number of open, read and stat requests
+                per second, or None for no limit
+            burst: Seconds worth of tokens that can be spent at once after
+                an idle period
+            metrics: Metrics receiving the time requests spend waiting, if
+                any
+        """
+        if bytes_per_second is not None and bytes_per_second <= 0:
+            raise ValueError("Byte rate limit must be positive")
+        if ops_per_second is not None and ops_per_second <= 0:
+            raise ValueError("Operation rate limit must be positive")
+        if burst <= 0:
+            raise ValueError("Burst duration must be positive")
+        self.bytes_per_second = bytes_per_second
+        self.ops_per_second = ops_per_second
+        self.burst = burst
+        self.metrics = metrics
+        # Seconds requests spent waiting for tokens, all threads combined
+        self.waited = 0.0
+        self._byte_tokens = (bytes_per_second or 0) * burst
+        self._op_tokens = (ops_per_second or 0) * burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        """Whether any limit is set."""
+        return self.bytes_per_second is not None or self.ops_per_second is not None
+
+    def acquire(self, size: int = 0, ops: int = 1) -> float:
+        """Wait until a request fits within the limits.
+
+        Args:
+            size: Number of bytes the request reads
+            ops: Number of operations the request issues
+
+        Returns:
+            float: Seconds waited
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            delay = 0.0
+            if self.bytes_per_second is not None:
+                self._byte_tokens = min(
+                    self._byte_tokens + elapsed * self.bytes_per_second,
+                    self.bytes_per_second * self.burst,
+                )
+                self._byte_tokens -= size
+                delay = max(delay, -self._byte_tokens / self.bytes_per_second)
+            if self.ops_per_second is not None:
+                self._op_tokens = min(
+                    self._op_tokens + elapsed * self.ops_per_second,
+                    self.ops_per_second * self.burst,
+                )
+                self._op_tokens -= ops
+                delay = max(delay, -self._op_tokens / self.ops_per_second)
+            self.waited += delay
+
+        if delay > 0:
+            time.sleep(delay)
+            if self.metrics is not None:
+                self.metrics.observe("throttle", delay, size, count=ops)
+        return delay
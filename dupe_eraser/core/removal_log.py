@@ -0,0 +1,66 @@
+import os
+import struct
+import tempfile
+from typing import Iterator, Optional, Tuple
+
+# Lengths of the encoded duplicate and original paths of a record
+_HEADER = struct.Struct("<II")
+
+
+class RemovalLog:
+    """Append-only record of the duplicates removed during a run.
+
+    Records are spilled to a temporary file as they are appended instead of
+    being kept in a dictionary, so memory does not grow with the number of
+    duplicates. The log can be iterated any number of times.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """Open an empty log.
+
+        Args:
+            path: File to write the log to, or None for an anonymous temporary
+                file deleted when the log is closed
+        """
+        if path is None:
+            self._file = tempfile.TemporaryFile()
+        else:
+            self._file = open(path, "w+b")
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, duplicate: str, original: str) -> None:
+        """Record that a duplicate was removed in favour of an original.
+
+        Args:
+            duplicate: Path to the removed duplicate
+            original: Path to the file kept as the original
+        """
+        duplicate_bytes = os.fsencode(duplicate)
+        original_bytes = os.fsencode(original)
+        # Iterating moves the file position
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(_HEADER.pack(len(duplicate_bytes), len(original_bytes)))
+        self._file.write(duplicate_bytes)
+        self._file.write(original_bytes)
+        self._count += 1
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """Iterate over the (duplicate, original) pairs in order of removal."""
+        offset = 0
+        for _ in range(self._count):
+            # Seek for every record, as appends may happen between two of them
+            self._file.seek(offset)
+            duplicate_length, original_length = _HEADER.unpack(
+                self._file.read(_HEADER.size)
+            )
+            duplicate = os.fsdecode(self._file.read(duplicate_length))
+            original = os.fsdecode(self._file.read(original_length))
+            offset = self._file.tell()
+            yield duplicate, original
+
+    def close(self) -> None:
+        """Close the log, deleting it if it was a temporary file."""
+        self._file.close()
@@ -0,0 +1,98 @@
+import logging
+from typing import List, Optional, Tuple
+
+from core.hash_registry import HashRegistry
+from core.io_backend import IOBackend
+
+
+class SampleFingerprinter:
+    """Cheap fingerprint of a file built from a few small samples of its content.
+
+    The head and tail of the file plus a number of evenly spaced interior
+    samples are hashed together. Two files with different fingerprints are
+    guaranteed to differ, so only files sharing a fingerprint need a full read.
+    """
+
+    def __init__(self, sample_size_kb: int = 16, sample_count: int = 3):
+        """Initialize the fingerprinter.
+
+        Args:
+            sample_size_kb: Size of each sample in KiB
+            sample_count: Number of interior samples taken between head and tail
+        """
+        if sample_size_kb <= 0:
+            raise ValueError("Sample size must be a positive number of KiB")
+        if sample_count < 0:
+            raise ValueError("Sample count cannot be negative")
+        self.sample_size = sample_size_kb * 1024
+        self.sample_count = sample_count
+        # Only loaded once a prefilter is actually used
+        self._hasher = HashRegistry.factory("xxh3_64")
+
+    @property
+    def bytes_per_file(self) -> int:
+        """Number of bytes read to fingerprint a file."""
+        return self.sample_size * (self.sample_count + 2)
+
+    def is_worthwhile(self, file_size: int) -> bool:
+        """Check whether sampling reads noticeably less than the whole file."""
+        return file_size > 2 * self.bytes_per_file
+
+    def fingerprint(self, filepath: str, file_size: int) -> str:
+        """Compute the sample fingerprint of a file.
+
+        Args:
+            filepath: Path to the file
+            file_size: Size of the file in bytes
+
+        Returns:
+            str: Hex digest of the sampled content
+        """
+        hasher = self._hasher()
+        with open(filepath, "rb") as f:
+            for offset, length in self.sample_ranges(file_size):
+                f.seek(offset)
+                hasher.update(f.read(length))
+
+        return hasher.digest().hex()
+
+    def fingerprint_many(
+        self, filepaths: List[str], file_size: int, backend: IOBackend
+    ) -> List[Optional[str]]:
+        """Compute the sample fingerprints of same-sized files at once.
+
+        Samples of every file are requested together through the backend, so
+        a concurrent backend overlaps them.
+
+        Args:
+            filepaths: Paths to the files
+            file_size: Size of the files in bytes
+            backend: I/O backend serving the reads
+
+        Returns:
+            List of hex digests aligned with filepaths, None for unreadable
+            files
+        """
+        ranges = self.sample_ranges(file_size)
+        hashers = [self._hasher() for _ in filepaths]
+        errors = backend.feed_many(
+            [
+                (filepath, ranges, hasher.update)
+                for filepath, hasher in zip(filepaths, hashers)
+            ]
+        )
+        fingerprints: List[Optional[str]] = []
+        for filepath, hasher, error in zip(filepaths, hashers, errors):
+            if error is not None:
+                logging.error(f"Error reading {filepath}: {error}")
+                fingerprints.append(None)
+            else:
+                fingerprints.append(hasher.digest().hex())
+        return fingerprints
+
+    def sample_ranges(self, file_size: int) -> List[Tuple[int, int]]:
+        """Get the (offset, length) ranges sampled from a file of a given size."""
+        step = (file_size - self.sample_size) // (self.sample_count + 1)
+        offsets = [step * i for i in range(self.sample_count + 1)]
+        offsets.append(file_size - self.sample_size)
+        return [(offset, self.sample_size) for offset in offsets]
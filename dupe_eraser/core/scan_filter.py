@@ -0,0 +1,124 @@
+import os
+from fnmatch import fnmatchcase
+from typing import List, Optional
+
+
+class ScanFilter:
+    """Rules deciding which files and directories a scan considers.
+
+    Glob patterns without a path separator are matched against the name of a
+    file or directory, other patterns against its full path. Directories and
+    file names are checked from the directory listing alone, so excluded
+    subtrees are never entered and excluded files are never stat'ed; only the
+    size limits need the stat record.
+    """
+
+    # Directories holding version control objects or build caches, where
+    # hashing costs more than it saves
+    DEFAULT_EXCLUDED_DIRS = (
+        ".git",
+        ".hg",
+        ".svn",
+        "__pycache__",
+        "node_modules",
+        ".tox",
+        ".venv",
+    )
+
+    def __init__(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        exclude_dirs: Optional[List[str]] = None,
+        min_size: int = 0,
+        max_size: Optional[int] = None,
+    ):
+        """Initialize the filter.
+
+        Args:
+            include: Patterns of which a file must match one to be
+                considered, or None to consider every file
+            exclude: Patterns of files never considered
+            exclude_dirs: Patterns of directories pruned from the scan
+            min_size: Minimum size in bytes of a considered file
+            max_size: Maximum size in bytes of a considered file, or None
+        """
+        if min_size < 0:
+            raise ValueError("Minimum size cannot be negative")
+        if max_size is not None and max_size < min_size:
+            raise ValueError("Maximum size cannot be below the minimum size")
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.exclude_dirs = list(exclude_dirs or [])
+        self.min_size = min_size
+        self.max_size = max_size
+
+    @property
+    def is_active(self) -> bool:
+        """Whether any rule may reject a file or directory."""
+        return bool(
+            self.include
+            or self.exclude
+            or self.exclude_dirs
+            or self.min_size
+            or self.max_size is not None
+        )
+
+    def accepts_dir(self, path: str, name: str) -> bool:
+        """Check whether a directory should be scanned.
+
+        Args:
+            path: Path to the directory
+            name: Name of the directory
+
+        Returns:
+            bool: False if the directory and everything below it is pruned
+        """
+        return not self._matches(self.exclude_dirs, path, name)
+
+    def accepts_name(self, path: str, name: str) -> bool:
+        """Check the path rules of a file, before it is stat'ed.
+
+        Args:
+            path: Path to the file
+            name: Name of the file
+
+        Returns:
+            bool: True if the file passes the include and exclude patterns
+        """
+        if self.include and not self._matches(self.include, path, name):
+            return False
+        return not self._matches(self.exclude, path, name)
+
+    def accepts_size(self, size: int) -> bool:
+        """Check the size limits of a file.
+
+        Args:
+            size: Size of the file in bytes
+
+        Returns:
+            bool: True if the size is within the limits
+        """
+        if size < self.min_size:
+            return False
+        return self.max_size is None or size <= self.max_size
+
+    def settings(self) -> dict:
+        """Rules as a JSON-serializable dictionary, e.g. for a checkpoint."""
+        return {
+            "include": self.include,
+            "exclude": self.exclude,
+            "exclude_dirs": self.exclude_dirs,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+        }
+
+    @staticmethod
+    def _matches(patterns: List[str], path: str, name: str) -> bool:
+        for pattern in patterns:
+            if os.sep in pattern or "/" in pattern:
+                if fnmatchcase(path, pattern):
+                    return True
+            elif fnmatchcase(name, pattern):
+                return True
+        return False
@@ -0,0 +1,219 @@
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from core.file_entry import FileEntry
+from core.metrics import Metrics
+from core.rate_limiter import RateLimiter
+from core.scan_filter import ScanFilter
+
+
+class Scanner:
+    """Directory tree walker built on os.scandir.
+
+    Every regular file is stat'ed exactly once and reported as a FileEntry.
+    Symbolic links are neither followed nor reported, so a link is never
+    mistaken for a duplicate of its own target. Directories are visited
+    breadth-first in a deterministic order, whether or not several threads
+    are used to list them. Files and directories rejected by the scan filter
+    are left out before anything is stat'ed.
+    """
+
+    # Directories listed ahead of the consumer by each scan worker
+    LOOKAHEAD_PER_WORKER = 4
+
+    def __init__(
+        self,
+        workers: int = 1,
+        metrics: Optional[Metrics] = None,
+        scan_filter: Optional[ScanFilter] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        """Initialize the scanner.
+
+        Args:
+            workers: Number of threads listing directories concurrently, which
+                mostly helps on high-latency network filesystems
+            metrics: Metrics receiving the time spent listing and stat'ing
+                each directory, if any
+            scan_filter: Rules deciding which files and directories are
+                considered, or None to consider everything
+            limiter: Rate limiter every directory listing and stat waits
+                for, or None for no limit
+        """
+        if workers < 1:
+            raise ValueError("Number of scan workers must be at least 1")
+        self.workers = workers
+        self.metrics = metrics
+        self.filter = (
+            scan_filter if scan_filter is not None and scan_filter.is_active else None
+        )
+        self.limiter = limiter
+        self.dirs_scanned = 0
+        self.dirs_pending = 0
+        self.files_scanned = 0
+        self.files_filtered = 0
+        self.dirs_pruned = 0
+
+    @property
+    def estimated_total_files(self) -> int:
+        """Estimate of the number of files in the tree being scanned.
+
+        Assumes directories still waiting to be listed hold as many files on
+        average as those already listed, so it gets more accurate as the scan
+        progresses.
+        """
+        if not self.dirs_scanned:
+            return 0
+        per_dir = self.files_scanned / self.dirs_scanned
+        return self.files_scanned + round(per_dir * self.dirs_pending)
+
+    def scan(self, root_dir: str) -> Iterator[FileEntry]:
+        """Iterate over every regular file under a directory tree.
+
+        Args:
+            root_dir: Root directory to scan
+
+        Returns:
+            Iterator of FileEntry records
+        """
+        for _, entries in self.scan_dirs(root_dir):
+            yield from entries
+
+    def scan_dirs(self, root_dir: str) -> Iterator[Tuple[str, List[FileEntry]]]:
+        """Iterate over the directories of a tree with the files they contain.
+
+        Args:
+            root_dir: Root directory to scan
+
+        Returns:
+            Iterator of (directory path, FileEntry records) tuples
+        """
+        for dirpath, entries, _ in self.walk([root_dir]):
+            yield dirpath, entries
+
+    def walk(
+        self, start_dirs: List[str]
+    ) -> Iterator[Tuple[str, List[FileEntry], List[str]]]:
+        """Iterate over the directories below a set of starting directories.
+
+        Resuming an interrupted scan only needs the directories that were
+        discovered but not listed yet.
+
+        Args:
+            start_dirs: Directories to list first, breadth-first from there
+
+        Returns:
+            Iterator of (directory path, FileEntry records, subdirectory
+            paths) tuples
+        """
+        self.dirs_scanned = self.files_scanned = 0
+        self.files_filtered = self.dirs_pruned = 0
+        if self.workers == 1:
+            pending = deque(start_dirs)
+            while pending:
+                dirpath = pending.popleft()
+                entries, subdirs, elapsed, skipped = self._scan_dir(dirpath)
+                pending.extend(subdirs)
+                self._record(len(entries), len(pending), elapsed, skipped)
+                yield dirpath, entries, subdirs
+            return
+
+        # Directories are listed ahead by the pool but consumed in submission
+        # order, which keeps the output independent of thread scheduling. Only
+        # a few listings per worker are kept in flight, the other directories
+        # waiting as bare paths, so a slow consumer does not let the listings
+        # of the whole tree pile up in memory.
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        lookahead = self.LOOKAHEAD_PER_WORKER * self.workers
+        try:
+            queued = deque(start_dirs)
+            in_flight = deque()
+            while True:
+                while queued and len(in_flight) < lookahead:
+                    dirpath = queued.popleft()
+                    future = executor.submit(self._scan_dir, dirpath)
+                    in_flight.append((dirpath, future))
+                if not in_flight:
+                    break
+                dirpath, future = in_flight.popleft()
+                entries, subdirs, elapsed, skipped = future.result()
+                queued.extend(subdirs)
+                self._record(
+                    len(entries), len(in_flight) + len(queued), elapsed, skipped
+                )
+                yield dirpath, entries, subdirs
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _record(
+        self,
+        files: int,
+        dirs_pending: int,
+        elapsed: float,
+        skipped: Tuple[int, int],
+    ) -> None:
+        self.dirs_scanned += 1
+        self.files_scanned += files
+        self.dirs_pending = dirs_pending
+        self.files_filtered += skipped[0]
+        self.dirs_pruned += skipped[1]
+        if self.metrics is not None:
+            self.metrics.observe("stat", elapsed, count=files)
+
+    def _scan_dir(
+        self, dirpath: str
+    ) -> Tuple[List[FileEntry], List[str], float, Tuple[int, int]]:
+        """List one directory.
+
+        Returns:
+            Tuple of its files, its subdirectories, the time taken and the
+            numbers of files filtered out and subdirectories pruned
+        """
+        start_time = time.perf_counter()
+        scan_filter = self.filter
+        limiter = self.limiter
+        entries = []
+        subdirs = []
+        files_filtered = dirs_pruned = 0
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            with os.scandir(dirpath) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if scan_filter is None or scan_filter.accepts_dir(
+                                entry.path, entry.name
+                            ):
+                                subdirs.append(entry.path)
+                            else:
+                                dirs_pruned += 1
+                        elif entry.is_file(follow_symlinks=False):
+                            if scan_filter is None:
+                                if limiter is not None:
+                                    limiter.acquire()
+                                st = entry.stat(follow_symlinks=False)
+                                entries.append(FileEntry.from_stat(entry.path, st))
+                                continue
+                            if scan_filter.accepts_name(entry.path, entry.name):
+                                if limiter is not None:
+                                    limiter.acquire()
+                                st = entry.stat(follow_symlinks=False)
+                                if scan_filter.accepts_size(st.st_size):
+                                    entries.append(FileEntry.from_stat(entry.path, st))
+                                    continue
+                            files_filtered += 1
+                    except OSError:
+                        continue
+        except OSError as e:
+            logging.error(f"Error scanning {dirpath}: {e}")
+        return (
+            entries,
+            subdirs,
+            time.perf_counter() - start_time,
+            (files_filtered, dirs_pruned),
+        )
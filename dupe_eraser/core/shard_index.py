@@ -0,0 +1,200 @@
+import json
+import platform
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from core.file_entry import FileEntry
+
+
+class ShardIndex:
+    """Partial index of the files held by one shard of a sharded run.
+
+    A shard is any part of the data scanned on its own, such as a few mount
+    points or the disks of one host. Its index is a JSON Lines file: a header
+    naming the shard, its host, roots and settings, then one stat record per
+    file. Sample fingerprints and full digests are only computed for the
+    files a merge asks about, and appended as records holding just the path
+    and the new field. Records of a path are combined in order when the
+    index is loaded, so answering requests never rewrites the index.
+    """
+
+    FORMAT = "dupe_eraser-shard"
+    REQUESTS_FORMAT = "dupe_eraser-shard-requests"
+    VERSION = 1
+
+    # Fields appended to the record of a file
+    SAMPLE = "sample"
+    DIGEST = "digest"
+    # Marks a file that changed or vanished since the shard was scanned
+    REMOVED = "removed"
+
+    def __init__(self, path: str, header: dict, append: bool = False):
+        """Open an index for writing.
+
+        Use create or append_to rather than calling this directly.
+
+        Args:
+            path: Path to the index file
+            header: Header of the index
+            append: Append to an existing index instead of creating one
+        """
+        self.path = path
+        self.header = header
+        self.files = 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        if not append:
+            self._write_line(header)
+
+    @classmethod
+    def create(
+        cls, path: str, shard: str, roots: List[str], settings: dict
+    ) -> "ShardIndex":
+        """Create an index, overwriting any existing file.
+
+        Args:
+            path: Path to the index file
+            shard: Name of the shard, unique among the shards merged together
+            roots: Directories the shard is made of
+            settings: Hash settings every shard of a run must share
+
+        Returns:
+            ShardIndex to add the scanned files to
+        """
+        return cls(
+            path,
+            {
+                "format": cls.FORMAT,
+                "version": cls.VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "shard": shard,
+                "host": platform.node(),
+                "roots": roots,
+                "settings": settings,
+            },
+        )
+
+    @classmethod
+    def append_to(cls, path: str) -> "ShardIndex":
+        """Open an existing index to append answers to it.
+
+        Args:
+            path: Path to the index file
+
+        Returns:
+            ShardIndex appending to the file
+        """
+        return cls(path, next(cls._read(path, cls.FORMAT)), append=True)
+
+    def add(self, entry: FileEntry) -> None:
+        """Record a scanned file.
+
+        Args:
+            entry: Stat record of the file
+        """
+        self._write_line(
+            {
+                "path": entry.path,
+                "size": entry.size,
+                "inode": entry.inode,
+                "device": entry.device,
+                "mtime_ns": entry.mtime_ns,
+                "nlink": entry.nlink,
+            }
+        )
+        self.files += 1
+
+    def answer(self, path: str, field: str, value: str) -> None:
+        """Record the sample fingerprint or digest of a file.
+
+        Args:
+            path: Path to the file
+            field: SAMPLE or DIGEST
+            value: Hex digest
+        """
+        self._write_line({"path": path, field: value})
+
+    def remove(self, path: str) -> None:
+        """Record that a file is no longer what the index says.
+
+        Args:
+            path: Path to the file
+        """
+        self._write_line({"path": path, self.REMOVED: True})
+
+    def close(self) -> None:
+        """Flush and close the index."""
+        self._file.close()
+
+    @classmethod
+    def load(cls, path: str) -> Tuple[dict, Dict[str, dict]]:
+        """Read an index back.
+
+        Args:
+            path: Path to the index file
+
+        Returns:
+            Tuple of the header and the combined record of every file still
+            in the shard, by path, in scan order
+        """
+        records = cls._read(path, cls.FORMAT)
+        header = next(records)
+        files: Dict[str, dict] = {}
+        for record in records:
+            if record.get(cls.REMOVED):
+                files.pop(record["path"], None)
+            elif "size" in record:
+                files[record["path"]] = record
+            elif record["path"] in files:
+                files[record["path"]].update(record)
+        return header, files
+
+    @classmethod
+    def write_requests(cls, path: str, shard: str, requests: List[dict]) -> None:
+        """Write the files a merge needs fingerprinted or hashed by a shard.
+
+        Args:
+            path: Path to the requests file, overwritten if it exists
+            shard: Name of the shard the requests are for
+            requests: Records of the files, each with the SAMPLE or DIGEST
+                field it needs as "need"
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            header = {
+                "format": cls.REQUESTS_FORMAT,
+                "version": cls.VERSION,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "shard": shard,
+            }
+            for record in [header] + requests:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @classmethod
+    def read_requests(cls, path: str) -> Iterator[dict]:
+        """Iterate over the records of a requests file, header first.
+
+        Args:
+            path: Path to the requests file
+
+        Returns:
+            Iterator of the decoded JSON records
+        """
+        return cls._read(path, cls.REQUESTS_FORMAT)
+
+    @classmethod
+    def _read(cls, path: str, file_format: str) -> Iterator[dict]:
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != file_format:
+                raise ValueError(f"{path} is not a {file_format} file")
+            if header.get("version") != cls.VERSION:
+                raise ValueError(
+                    f"Unsupported version {header.get('version')} in {path}"
+                )
+            yield header
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _write_line(self, record: dict) -> None:
+        # Paths that are not valid UTF-8 survive as escaped surrogates
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
@@ -0,0 +1,200 @@
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from core.duplicate_group import DuplicateGroup
+from core.file_entry import FileEntry
+from core.keeper_policy import KeeperPolicy
+from core.sample_fingerprint import SampleFingerprinter
+from core.shard_index import ShardIndex
+
+
+class ShardMerger:
+    """Find the duplicates across the partial indexes of several shards.
+
+    Files are bucketed by size across all shards. Sizes held by a single
+    file are settled without reading anything. For the others, the merge
+    asks the shards for sample fingerprints of the files large enough to be
+    sampled, then for full digests of the files whose fingerprints collide,
+    each shard answering into its own index. Once every candidate has a
+    digest, the merge yields the duplicate groups, so only colliding
+    candidates are ever read in full.
+    """
+
+    def __init__(
+        self, index_paths: List[str], keeper_policy: Optional[KeeperPolicy] = None
+    ):
+        """Load the partial indexes.
+
+        Args:
+            index_paths: Paths to the index of every shard, earlier shards
+                coming first in each group
+            keeper_policy: Rules choosing the file kept in each duplicate
+                group, or None to keep the first file found
+        """
+        self.keeper_policy = keeper_policy or KeeperPolicy()
+        self.shards: Dict[str, dict] = {}
+        self.settings: Optional[dict] = None
+        self.total_files = 0
+        self.total_size = 0
+        self.hard_links_skipped = 0
+        # Shard of every file, by id of its entry
+        self._shard_of: Dict[int, str] = {}
+        # Size -> (shard, entry, record) of the files of that size
+        self._buckets: Dict[int, List[Tuple[str, FileEntry, dict]]] = defaultdict(
+            list
+        )
+
+        for path in index_paths:
+            header, records = ShardIndex.load(path)
+            shard = header["shard"]
+            if shard in self.shards:
+                raise ValueError(f"Shard '{shard}' is indexed more than once")
+            if self.settings is None:
+                self.settings = header["settings"]
+            elif header["settings"] != self.settings:
+                raise ValueError(
+                    f"Shard '{shard}' was scanned with settings "
+                    f"{header['settings']}, other shards with {self.settings}"
+                )
+            self.shards[shard] = header
+            for record in records.values():
+                entry = FileEntry(
+                    record["path"],
+                    record["size"],
+                    record["inode"],
+                    record["device"],
+                    record["mtime_ns"],
+                    record["nlink"],
+                )
+                self._shard_of[id(entry)] = shard
+                self._buckets[entry.size].append((shard, entry, record))
+                self.total_files += 1
+                self.total_size += entry.size
+
+        prefilter_kb = self.settings["prefilter_kb"] if self.settings else 0
+        self.fingerprinter = (
+            SampleFingerprinter(prefilter_kb, self.settings["prefilter_samples"])
+            if prefilter_kb > 0
+            else None
+        )
+
+    @property
+    def roots(self) -> List[str]:
+        """Roots of every shard, qualified with the shard name."""
+        return [
+            f"{shard}:{root}"
+            for shard, header in self.shards.items()
+            for root in header["roots"]
+        ]
+
+    def shard_of(self, entry: FileEntry) -> str:
+        """Get the name of the shard holding a file of a merged group."""
+        return self._shard_of[id(entry)]
+
+    def merge(self) -> Tuple[Dict[str, List[dict]], List[DuplicateGroup]]:
+        """Match the files of all shards.
+
+        Returns:
+            Tuple of the requests still needed, by shard, and the duplicate
+            groups fully confirmed, keeper first in each. Groups are only
+            final once no request is left.
+        """
+        requests: Dict[str, List[dict]] = defaultdict(list)
+        groups = []
+        for size in sorted(self._buckets):
+            files = self._skip_hard_links(self._buckets[size])
+            if len(files) < 2:
+                continue
+
+            candidates = [files]
+            if self.fingerprinter is not None and self.fingerprinter.is_worthwhile(
+                size
+            ):
+                candidates = self._split(files, ShardIndex.SAMPLE, requests)
+
+            for files in candidates:
+                for split in self._split(files, ShardIndex.DIGEST, requests):
+                    group = DuplicateGroup(
+                        split[0][2][ShardIndex.DIGEST],
+                        [entry for _, entry, _ in split],
+                    )
+                    groups.append(self.keeper_policy.order(group))
+
+        return requests, groups
+
+    def write_requests(
+        self, requests: Dict[str, List[dict]], requests_dir: str
+    ) -> List[str]:
+        """Write the requests of every shard to its own file.
+
+        Args:
+            requests: Requests by shard, as returned by merge
+            requests_dir: Directory the files are written to
+
+        Returns:
+            List of the paths written
+        """
+        os.makedirs(requests_dir, exist_ok=True)
+        paths = []
+        for shard, records in requests.items():
+            path = os.path.join(requests_dir, f"{shard}.requests.jsonl")
+            ShardIndex.write_requests(path, shard, records)
+            logging.info(
+                f"{len(records)} files of shard '{shard}' "
+                f"({self.shards[shard]['host']}) to digest: {path}"
+            )
+            paths.append(path)
+        return paths
+
+    def _skip_hard_links(
+        self, files: List[Tuple[str, FileEntry, dict]]
+    ) -> List[Tuple[str, FileEntry, dict]]:
+        """Drop the files that are hard links to an inode already listed.
+
+        Inodes are only comparable on the same host, and shards of one host
+        may overlap.
+        """
+        inodes = set()
+        unique = []
+        for shard, entry, record in files:
+            inode = (self.shards[shard]["host"], entry.device, entry.inode)
+            if inode in inodes:
+                self.hard_links_skipped += 1
+                continue
+            inodes.add(inode)
+            unique.append((shard, entry, record))
+        return unique
+
+    @staticmethod
+    def _split(
+        files: List[Tuple[str, FileEntry, dict]],
+        field: str,
+        requests: Dict[str, List[dict]],
+    ) -> List[List[Tuple[str, FileEntry, dict]]]:
+        """Split files by a digest field, or request it where it is missing.
+
+        Returns:
+            List of the groups of at least two files sharing the field, empty
+            if any file still lacks it
+        """
+        missing = [
+            (shard, entry) for shard, entry, record in files if field not in record
+        ]
+        if missing:
+            for shard, entry in missing:
+                requests[shard].append(
+                    {
+                        "path": entry.path,
+                        "size": entry.size,
+                        "mtime_ns": entry.mtime_ns,
+                        "need": field,
+                    }
+                )
+            return []
+
+        groups = defaultdict(list)
+        for file in files:
+            groups[file[2][field]].append(file)
+        return [group for group in groups.values() if len(group) > 1]
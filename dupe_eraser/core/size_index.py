@@ -0,0 +1,93 @@
+import os
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from core.file_entry import FileEntry
+
+# Inode, device, mtime_ns and link count of a singleton, stored ahead of its
+# path
+_HEADER = struct.Struct("<QQqI")
+
+
+class SizeIndex:
+    """Global index mapping file sizes to the files sharing that size.
+
+    Most sizes in a large tree are only seen once. Those singletons are kept as
+    packed stat fields and NUL-terminated encoded path bytes in a shared pool,
+    and only turned back into a FileEntry when a second file of the same size
+    shows up, so unique sizes cost an integer offset rather than Python
+    objects.
+    """
+
+    def __init__(self):
+        """Initialize an empty size index."""
+        self._pool = bytearray()
+        self._singletons: Dict[int, int] = {}
+        self._groups: Dict[int, List[FileEntry]] = {}
+        self.total_files = 0
+        self.total_size = 0
+
+    def __len__(self) -> int:
+        return self.total_files
+
+    def add(self, entry: FileEntry) -> Optional[List[FileEntry]]:
+        """Register a file in the index.
+
+        Args:
+            entry: Stat record of the file
+
+        Returns:
+            The entries sharing the file's size, including it, or None if no
+            other file of that size has been seen yet
+        """
+        size = entry.size
+        self.total_files += 1
+        self.total_size += size
+
+        group = self._groups.get(size)
+        if group is not None:
+            group.append(entry)
+            return group
+
+        offset = self._singletons.pop(size, None)
+        if offset is None:
+            self._singletons[size] = self._store(entry)
+            return None
+
+        group = [self._load(offset, size), entry]
+        self._groups[size] = group
+        return group
+
+    def buckets(self) -> Iterator[Tuple[int, List[FileEntry]]]:
+        """Iterate over sizes shared by more than one file.
+
+        Returns:
+            Iterator of (size, entries) tuples, in order of discovery
+        """
+        return iter(self._groups.items())
+
+    @property
+    def candidate_files(self) -> int:
+        """Number of files that share their size with at least one other file."""
+        return sum(len(entries) for entries in self._groups.values())
+
+    @property
+    def candidate_size(self) -> int:
+        """Combined size in bytes of the files sharing their size."""
+        return sum(size * len(entries) for size, entries in self._groups.items())
+
+    def _store(self, entry: FileEntry) -> int:
+        offset = len(self._pool)
+        self._pool += _HEADER.pack(
+            entry.inode, entry.device, entry.mtime_ns, entry.nlink
+        )
+        self._pool += os.fsencode(entry.path)
+        self._pool.append(0)
+        return offset
+
+    def _load(self, offset: int, size: int) -> FileEntry:
+        inode, device, mtime_ns, nlink = _HEADER.unpack_from(self._pool, offset)
+        start = offset + _HEADER.size
+        end = self._pool.index(0, start)
+        path = os.fsdecode(bytes(self._pool[start:end]))
+        return FileEntry(path, size, inode, device, mtime_ns, nlink)
@@ -0,0 +1,38 @@
+class StageStats:
+    def __init__(self, name: str):
+        """Initialize statistics for one stage of the candidate pipeline.
+
+        Args:
+            name: Name of the pipeline stage
+        """
+        self.name = name
+        self.candidates = 0
+        self.eliminated = 0
+        self.bytes_read = 0
+        self.bytes_skipped = 0
+
+    def record(
+        self,
+        candidates: int,
+        survivors: int,
+        bytes_read: int = 0,
+        bytes_skipped: int = 0,
+    ) -> None:
+        """Record the outcome of running the stage on one group of candidates.
+
+        Args:
+            candidates: Number of files that entered the stage
+            survivors: Number of files still considered possible duplicates
+            bytes_read: Bytes read from disk by the stage
+            bytes_skipped: Bytes later stages no longer need to read, and
+                bytes the stage did not read thanks to cached digests
+        """
+        self.candidates += candidates
+        self.eliminated += candidates - survivors
+        self.bytes_read += bytes_read
+        self.bytes_skipped += bytes_skipped
+
+    @property
+    def survivors(self) -> int:
+        """Number of files passed on to the next stage."""
+        return self.candidates - self.eliminated
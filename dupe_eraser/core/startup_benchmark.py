@@ -0,0 +1,165 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tabulate import tabulate
+
+
+class StartupBenchmark:
+    """Wall-clock time of short command line runs, startup included.
+
+    Each scenario runs the tool in a fresh interpreter, the way cron wrappers
+    call it, so import time is measured along with the work itself. One more
+    run with ``-X importtime`` tells which top-level imports cost the most.
+    """
+
+    # Scenario name -> command line arguments, {tree} standing for the tree
+    SCENARIOS: Dict[str, List[str]] = {
+        "help": ["--help"],
+        "scan": ["{tree}", "--print-only", "--quiet", "--disable-progress-bar"],
+        "cross_tree": [
+            "{tree}",
+            "--print-only",
+            "--quiet",
+            "--disable-progress-bar",
+            "--cross-tree",
+        ],
+        "perceptual": [
+            "{tree}",
+            "--print-only",
+            "--quiet",
+            "--disable-progress-bar",
+            "--hash-algorithm",
+            "phash",
+        ],
+    }
+
+    # Number of heaviest top-level imports reported per scenario
+    TOP_IMPORTS = 3
+
+    def __init__(
+        self, root_dir: str, iterations: int = 3, python: Optional[str] = None
+    ):
+        """Initialize the benchmark.
+
+        Args:
+            root_dir: Small tree the scanning scenarios run on
+            iterations: Number of timed runs of each scenario
+            python: Interpreter to run the tool with, the current one by
+                default
+        """
+        if iterations < 1:
+            raise ValueError("Number of iterations must be at least 1")
+        self.root_dir = root_dir
+        self.iterations = iterations
+        self.python = python or sys.executable
+        # The package directory, run as `python dupe_eraser`
+        self.entry_point = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run(self, scenarios: Optional[Iterable[str]] = None) -> List[dict]:
+        """Time every scenario.
+
+        Args:
+            scenarios: Names of the scenarios to run, all of SCENARIOS if None
+
+        Returns:
+            List of result records, one per scenario
+        """
+        results = []
+        for name in scenarios or self.SCENARIOS:
+            if name not in self.SCENARIOS:
+                raise ValueError(
+                    f"Unknown startup scenario '{name}'. "
+                    f"Available options: {', '.join(self.SCENARIOS)}"
+                )
+            args = [arg.format(tree=self.root_dir) for arg in self.SCENARIOS[name]]
+            times = [self._time(args) for _ in range(self.iterations)]
+            modules, imports = self._import_times(args)
+            results.append(
+                {
+                    "scenario": name,
+                    "best_s": min(times),
+                    "median_s": statistics.median(times),
+                    "modules": modules,
+                    "top_imports": imports[: self.TOP_IMPORTS],
+                }
+            )
+        return results
+
+    @staticmethod
+    def format_results(results: List[dict]) -> str:
+        """Format results as a table.
+
+        Args:
+            results: Result records of a run
+
+        Returns:
+            str: The formatted table
+        """
+        table_data = [
+            [
+                record["scenario"],
+                f"{record['best_s'] * 1000:.0f} ms",
+                f"{record['median_s'] * 1000:.0f} ms",
+                record["modules"],
+                ", ".join(
+                    f"{module} ({seconds * 1000:.0f} ms)"
+                    for module, seconds in record["top_imports"]
+                ),
+            ]
+            for record in results
+        ]
+        return tabulate(
+            table_data,
+            headers=["Scenario", "Best", "Median", "Modules", "Heaviest imports"],
+            tablefmt="grid",
+        )
+
+    def _command(self, args: List[str], *options: str) -> List[str]:
+        return [self.python, *options, self.entry_point, *args]
+
+    def _time(self, args: List[str]) -> float:
+        start_time = time.perf_counter()
+        subprocess.run(
+            self._command(args),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        return time.perf_counter() - start_time
+
+    def _import_times(self, args: List[str]) -> Tuple[int, List[Tuple[str, float]]]:
+        """Run once with -X importtime.
+
+        Returns:
+            Tuple of the number of modules imported and the top-level imports
+            with their cumulative time in seconds, slowest first
+        """
+        process = subprocess.run(
+            self._command(args, "-X", "importtime"),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        modules = 0
+        top_level = []
+        # Lines look like "import time: self [us] | cumulative | <indent>name"
+        for line in process.stderr.splitlines():
+            fields = line.split("|")
+            if not line.startswith("import time:") or len(fields) != 3:
+                continue
+            try:
+                cumulative = int(fields[1])
+            except ValueError:
+                continue  # Header line
+            modules += 1
+            name = fields[2]
+            # Nested imports are indented by two more spaces per level
+            if len(name) - len(name.lstrip()) == 1:
+                top_level.append((name.strip(), cumulative / 1e6))
+        top_level.sort(key=lambda item: item[1], reverse=True)
+        return modules, top_level
@@ -0,0 +1,116 @@
+import math
+import os
+import random
+import shutil
+from typing import Dict, List
+
+
+class SyntheticTree:
+    """Generator of directory trees with a known amount of duplication.
+
+    Files are spread over nested directories. Their sizes follow a uniform or
+    log-uniform distribution; the latter gives the many-small, few-large mix
+    of real trees. A share of the files are exact copies of earlier ones, and
+    another share are same-sized near copies differing in a single byte, so
+    that the size, prefilter and full comparison stages all have work to do.
+    """
+
+    DISTRIBUTIONS = ("uniform", "log")
+
+    def __init__(
+        self,
+        file_count: int = 2000,
+        min_size: int = 1024,
+        max_size: int = 4 * 1024 * 1024,
+        distribution: str = "log",
+        duplicate_ratio: float = 0.3,
+        near_ratio: float = 0.1,
+        files_per_dir: int = 50,
+        seed: int = 0,
+    ):
+        """Initialize the generator.
+
+        Args:
+            file_count: Number of files to create
+            min_size: Minimum file size in bytes
+            max_size: Maximum file size in bytes
+            distribution: File size distribution, "uniform" or "log"
+            duplicate_ratio: Share of files that are copies of another file
+            near_ratio: Share of files that have the size of another file but
+                differ from it in one byte
+            files_per_dir: Number of files per directory
+            seed: Seed of the layout, so a tree can be regenerated identically
+                apart from file contents
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unsupported size distribution: {distribution}")
+        if not 0 <= duplicate_ratio + near_ratio < 1:
+            raise ValueError("Duplicate and near ratios must add up to less than 1")
+        if not 0 < min_size <= max_size:
+            raise ValueError("File sizes must satisfy 0 < min_size <= max_size")
+        self.file_count = file_count
+        self.min_size = min_size
+        self.max_size = max_size
+        self.distribution = distribution
+        self.duplicate_ratio = duplicate_ratio
+        self.near_ratio = near_ratio
+        self.files_per_dir = max(1, files_per_dir)
+        self.seed = seed
+
+    def build(self, root_dir: str) -> Dict[str, int]:
+        """Create the tree, replacing anything already at root_dir.
+
+        Args:
+            root_dir: Directory to create the tree in
+
+        Returns:
+            Dictionary with the number of files, duplicates, near copies and
+            the total size in bytes
+        """
+        rng = random.Random(self.seed)
+        if os.path.exists(root_dir):
+            shutil.rmtree(root_dir)
+
+        originals: List[str] = []
+        stats = {"files": 0, "duplicates": 0, "near_copies": 0, "bytes": 0}
+        for i in range(self.file_count):
+            path = self._path(root_dir, i)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            kind = rng.random()
+            if originals and kind < self.duplicate_ratio:
+                source = rng.choice(originals)
+                shutil.copyfile(source, path)
+                stats["duplicates"] += 1
+            elif originals and kind < self.duplicate_ratio + self.near_ratio:
+                source = rng.choice(originals)
+                with open(source, "rb") as f:
+                    data = bytearray(f.read())
+                offset = rng.randrange(len(data))
+                data[offset] ^= 0xFF
+                with open(path, "wb") as f:
+                    f.write(data)
+                stats["near_copies"] += 1
+            else:
+                with open(path, "wb") as f:
+                    f.write(os.urandom(self._size(rng)))
+                originals.append(path)
+
+            stats["files"] += 1
+            stats["bytes"] += os.path.getsize(path)
+
+        return stats
+
+    def _size(self, rng: random.Random) -> int:
+        if self.distribution == "uniform":
+            return rng.randint(self.min_size, self.max_size)
+        return round(
+            math.exp(rng.uniform(math.log(self.min_size), math.log(self.max_size)))
+        )
+
+    def _path(self, root_dir: str, index: int) -> str:
+        # Directories are nested two levels deep to exercise the scanner
+        directory = index // self.files_per_dir
+        return os.path.join(
+            root_dir, f"d{directory // 10:03d}", f"d{directory:04d}", f"f{index:06d}"
+        )
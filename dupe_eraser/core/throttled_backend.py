@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from core.adaptive_concurrency import AdaptiveConcurrency
+from core.io_backend import IOBackend
+from core.rate_limiter import RateLimiter
+
+
+class ThrottledBackend(IOBackend):
+    """Backend keeping the requests of another backend within a budget.
+
+    Every open and read waits for the rate limiter, and with an adaptive
+    concurrency limit, for a request slot sized to the latency of recent
+    reads. Placed under a concurrent backend, it bounds the number of
+    requests actually reaching the storage rather than the number queued.
+    Over plain blocking access, readers keep their own buffered and
+    memory-mapped read paths and charge every request through request.
+    """
+
+    throttled = True
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        base: Optional[IOBackend] = None,
+    ):
+        """Initialize the backend.
+
+        Args:
+            limiter: Byte and operation rate limits, or None for no limit
+            concurrency: Limit on concurrent reads adjusted to their latency,
+                or None for no limit
+            base: Backend performing the actual requests, a plain IOBackend
+                by default
+        """
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.base = base or IOBackend()
+
+    def open(self, filepath: str) -> int:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        return self.base.open(filepath)
+
+    def close(self, fd: int) -> None:
+        self.base.close(fd)
+
+    def pread(self, fd: int, length: int, offset: int) -> bytes:
+        if self.limiter is not None:
+            self.limiter.acquire(length)
+        if self.concurrency is None:
+            return self.base.pread(fd, length, offset)
+
+        self.concurrency.acquire()
+        start_time = time.perf_counter()
+        try:
+            return self.base.pread(fd, length, offset)
+        finally:
+            self.concurrency.release(time.perf_counter() - start_time)
+
+    @property
+    def native(self) -> bool:
+        return self.base.native
+
+    @contextmanager
+    def request(self, length: int = 0) -> Iterator[None]:
+        if self.limiter is not None:
+            self.limiter.acquire(length)
+        if self.concurrency is None or not length:
+            yield
+            return
+
+        self.concurrency.acquire()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.concurrency.release(time.perf_counter() - start_time)
+
+    def shutdown(self) -> None:
+        self.base.shutdown()
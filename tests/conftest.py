@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other as top-level "core.*" packages, as when the tool
+# is run with "python dupe_eraser"
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "dupe_eraser")
+sys.path.insert(0, PACKAGE_DIR)
@@ -0,0 +1,96 @@
+import json
+import os
+
+import pytest
+
+from core.duplicate_remover import DuplicateRemover
+
+DIRS = ["d0", "d0/sub", "d1", "d2", "d2/sub/deeper", "d3"]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def build(root: str) -> None:
+    """Write one duplicate per directory, next to a same-sized distinct file."""
+    for subdir in DIRS:
+        dirpath = os.path.join(root, subdir)
+        os.makedirs(dirpath, exist_ok=True)
+        data = os.urandom(4096)
+        for name, content in (("a", data), ("b", data), ("c", os.urandom(4096))):
+            with open(os.path.join(dirpath, name), "wb") as f:
+                f.write(content)
+
+
+def contents(dirpath: str) -> list:
+    """Contents of the files directly in a directory."""
+    result = []
+    for entry in os.scandir(dirpath):
+        if entry.is_file():
+            with open(entry.path, "rb") as f:
+                result.append(f.read())
+    return result
+
+
+def run(root, checkpoint, removed, resume=False, interrupt_after=None):
+    """Run with checkpointing, recording removals and stopping after a few."""
+    remover = DuplicateRemover(
+        show_progress=False,
+        checkpoint_path=checkpoint,
+        resume=resume,
+        removal_batch=2,
+    )
+    replace = remover.replacer.replace
+
+    def counting_replace(duplicate, original):
+        if interrupt_after is not None and len(removed) >= interrupt_after:
+            raise Interrupted
+        replace(duplicate, original)
+        removed.append(duplicate)
+
+    remover.replacer.replace = counting_replace
+    try:
+        remover.find_and_remove_duplicates(root, disable_progress=True)
+    finally:
+        remover.close()
+
+
+def records(checkpoint: str) -> list:
+    with open(checkpoint, "rb") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resume_removes_each_duplicate_once_in_every_directory(tmp_path):
+    root = str(tmp_path / "tree")
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    build(root)
+    before = {subdir: contents(os.path.join(root, subdir)) for subdir in DIRS}
+
+    removed = []
+    with pytest.raises(Interrupted):
+        run(root, checkpoint, removed, interrupt_after=2)
+    assert len(removed) == 2
+
+    # Directories are only recorded once their removals are done
+    done = [record for record in records(checkpoint) if record["type"] == "dir"]
+    assert 0 < len(done) < len(DIRS)
+    for record in done:
+        remaining = contents(record["path"])
+        assert len(set(remaining)) == len(remaining)
+
+    # Simulate a record cut short by the interruption, longer than what the
+    # resumed run appends so it cannot just be overwritten
+    with open(checkpoint, "ab") as f:
+        f.write(b'{"type":"dir","path":"' + b"x" * 65536)
+
+    run(root, checkpoint, removed, resume=True)
+
+    assert len(removed) == len(set(removed)) == len(DIRS)
+    for subdir in DIRS:
+        remaining = contents(os.path.join(root, subdir))
+        assert len(remaining) == 2
+        assert set(remaining) == set(before[subdir])
+    # The partial record was dropped, so every line decodes, and the run
+    # marked complete
+    assert records(checkpoint)[-1] == {"type": "finished"}
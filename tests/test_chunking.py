@@ -0,0 +1,66 @@
+import hashlib
+
+import numpy as np
+
+from core.chunk_index import ChunkIndex
+from core.content_chunker import ContentChunker
+
+OFFSET = 300_000
+
+
+def test_cut_points_stay_put_after_an_earlier_insertion():
+    chunker = ContentChunker(4096)
+    data = np.random.default_rng(1).bytes(1024 * 1024)
+    inserted = b"inserted" * 16
+    edited = data[:OFFSET] + inserted + data[OFFSET:]
+
+    cuts = chunker.cut_points(data, final=True)
+    edited_cuts = chunker.cut_points(edited, final=True)
+
+    sizes = np.diff([0] + cuts[:-1])
+    assert sizes.min() >= chunker.min_size and sizes.max() <= chunker.max_size
+    # Boundaries before the insertion do not depend on what follows them
+    before = [cut for cut in cuts if cut <= OFFSET]
+    assert edited_cuts[: len(before)] == before
+    # Boundaries after it are only shifted once past a few chunks
+    after = [cut for cut in cuts if cut > OFFSET + 2 * chunker.max_size]
+    shifted = {cut - len(inserted) for cut in edited_cuts}
+    assert after and all(cut in shifted for cut in after)
+
+
+def test_cut_points_of_a_stream_match_the_whole_buffer():
+    chunker = ContentChunker(1024)
+    data = np.random.default_rng(2).bytes(256 * 1024)
+    # Only boundaries no later data can move are returned mid-stream
+    partial = chunker.cut_points(data[:100_000])
+    assert partial
+    start = partial[-1]
+    rest = [start + cut for cut in chunker.cut_points(data[start:], final=True)]
+    assert partial + rest == chunker.cut_points(data, final=True)
+
+
+def fill(index: ChunkIndex) -> tuple:
+    """Add chunks of 20 files sharing many, return the groups and run count."""
+    rng = np.random.default_rng(3)
+    chunks = [rng.bytes(16) for _ in range(500)]
+    for file_id in range(20):
+        for i in rng.integers(0, len(chunks), size=100):
+            index.add(hashlib.sha256(chunks[i]).digest(), file_id, int(i) + 1)
+    try:
+        return list(index.groups()), index.spilled_runs
+    finally:
+        index.close()
+
+
+def test_spilled_runs_merge_like_in_memory_records(tmp_path):
+    in_memory = ChunkIndex(8)
+    spilling = ChunkIndex(8, memory_limit=16 * 100, spill_dir=str(tmp_path))
+
+    groups, runs = fill(in_memory)
+    assert runs == 0
+    spilled_groups, runs = fill(spilling)
+    assert runs > 1
+    assert spilled_groups == groups
+    assert len(groups) <= 500 and sum(len(files) for _, files in groups) == 2000
+    # Occurrences of a chunk stay in the order they were added
+    assert all(files == sorted(files, key=lambda f: f[0]) for _, files in groups)
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+
+from core.file_entry import FileEntry
+from core.hash_cache import HashCache
+
+ALGORITHM = "xxh3_128"
+
+
+def write(path, data: bytes) -> FileEntry:
+    path = str(path)
+    with open(path, "wb") as f:
+        f.write(data)
+    return FileEntry.from_stat(path, os.stat(path))
+
+
+def test_entry_is_invalidated_when_mtime_or_size_change(tmp_path):
+    entry = write(tmp_path / "file", b"content")
+    cache = HashCache(str(tmp_path / "cache.sqlite3"))
+    try:
+        cache.put(entry, ALGORITHM, "digest")
+        assert cache.get(entry, ALGORITHM) == "digest"
+        assert cache.get(entry, "blake3") is None
+
+        touched = entry._replace(mtime_ns=entry.mtime_ns + 1)
+        assert cache.get(touched, ALGORITHM) is None
+        assert cache.get(entry._replace(size=entry.size + 1), ALGORITHM) is None
+        assert (cache.hits, cache.misses) == (1, 3)
+
+        # Storing the new state replaces the stale entry
+        changed = write(tmp_path / "file", b"changed content")
+        cache.put(changed, ALGORITHM, "new digest")
+        assert cache.get(changed, ALGORITHM) == "new digest"
+        assert cache.get(entry, ALGORITHM) is None
+    finally:
+        cache.close()
+
+
+def test_evict_missing_drops_entries_of_gone_or_changed_files(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    kept = write(root / "kept", b"kept")
+    used = write(root / "used", b"used")
+    deleted = write(root / "deleted", b"deleted")
+    modified = write(root / "modified", b"modified")
+    outside = write(tmp_path / "outside", b"outside")
+    path = str(tmp_path / "cache.sqlite3")
+
+    cache = HashCache(path)
+    for entry in (kept, used, deleted, modified, outside):
+        cache.put(entry, ALGORITHM, entry.path)
+    cache.close()
+
+    os.remove(deleted.path)
+    os.remove(outside.path)
+    write(root / "modified", b"modified again")
+
+    cache = HashCache(path)
+    try:
+        # Entries used during this run are not checked again
+        assert cache.get(used, ALGORITHM) == used.path
+        os.remove(used.path)
+        assert cache.evict_missing(str(root)) == 2
+        assert cache.get(kept, ALGORITHM) == kept.path
+        assert cache.get(used, ALGORITHM) == used.path
+        assert cache.get(deleted, ALGORITHM) is None
+        assert cache.get(modified, ALGORITHM) is None
+        # Entries outside the directory are left alone
+        assert cache.get(outside, ALGORITHM) == outside.path
+    finally:
+        cache.close()
+
+
+def test_schema_upgrade_purges_broken_digests_once(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    broken = write(tmp_path / "broken", b"broken")
+    valid = write(tmp_path / "valid", b"valid")
+
+    # A cache written before the schema was versioned
+    cache = HashCache(path)
+    cache.put(broken, "murmur3_32", "<module 'mmh3'>")
+    cache.put(valid, "murmur3_32", "1a2b3c4d")
+    cache.close()
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA user_version = 0")
+    db.commit()
+    db.close()
+
+    cache = HashCache(path)
+    assert cache.get(broken, "murmur3_32") is None
+    assert cache.get(valid, "murmur3_32") == "1a2b3c4d"
+    cache.put(broken, "murmur3_32", "<kept>")
+    cache.close()
+
+    cache = HashCache(path)
+    try:
+        assert cache._db.execute("PRAGMA user_version").fetchone()[0] == 1
+        # Already upgraded, nothing is purged again
+        assert cache.get(broken, "murmur3_32") == "<kept>"
+    finally:
+        cache.close()
@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+from core.comparison_method import ComparisonMethod
+from core.duplicate_remover import DuplicateRemover
+from core.io_backend import IOBackend
+from core.io_backend_kind import IOBackendKind
+from core.synthetic_tree import SyntheticTree
+
+QUEUE_DEPTH = 4
+MAX_OPEN_FILES = 3
+LATENCY = 0.001
+
+
+class CountingBackend(IOBackend):
+    """Backend recording the peak number of open files and reads in flight."""
+
+    native = False
+
+    def __init__(self, base: IOBackend):
+        self.base = base
+        self.open_files = self.max_open_files = 0
+        self.reads = self.max_reads = 0
+        self._lock = threading.Lock()
+
+    def open(self, filepath: str) -> int:
+        fd = self.base.open(filepath)
+        with self._lock:
+            self.open_files += 1
+            self.max_open_files = max(self.max_open_files, self.open_files)
+        return fd
+
+    def close(self, fd: int) -> None:
+        with self._lock:
+            self.open_files -= 1
+        self.base.close(fd)
+
+    def pread(self, fd: int, length: int, offset: int) -> bytes:
+        with self._lock:
+            self.reads += 1
+            self.max_reads = max(self.max_reads, self.reads)
+        try:
+            return self.base.pread(fd, length, offset)
+        finally:
+            with self._lock:
+                self.reads -= 1
+
+    def shutdown(self) -> None:
+        self.base.shutdown()
+
+
+@pytest.fixture(scope="module")
+def tree(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("tree"))
+    SyntheticTree(
+        file_count=120, min_size=1024, max_size=512 * 1024, files_per_dir=20
+    ).build(root)
+    # A bucket much larger than the open file cap, half of it duplicates
+    copy = os.urandom(300 * 1024)
+    for i in range(20):
+        data = copy if i % 2 else os.urandom(len(copy))
+        with open(os.path.join(root, f"bucket{i:02d}"), "wb") as f:
+            f.write(data)
+    return root
+
+
+def find_groups(remover: DuplicateRemover, root: str) -> list:
+    index = remover.build_file_index(root)
+    groups = remover.find_duplicates_in_size_groups(index.buckets())
+    return sorted(sorted(entry.path for entry in group.files) for group in groups)
+
+
+@pytest.mark.parametrize("method", [ComparisonMethod.HASH, ComparisonMethod.BYTES])
+def test_async_backend_finds_the_same_groups(tree, method):
+    sync = DuplicateRemover(comparison_method=method, show_progress=False)
+    expected = find_groups(sync, tree)
+    sync.close()
+    assert expected
+
+    remover = DuplicateRemover(
+        comparison_method=method,
+        show_progress=False,
+        io_backend=IOBackendKind.ASYNC,
+        queue_depth=QUEUE_DEPTH,
+        inject_latency=LATENCY,
+        block_size=64 * 1024,
+    )
+    try:
+        assert find_groups(remover, tree) == expected
+    finally:
+        remover.close()
+
+
+@pytest.mark.parametrize("method", [ComparisonMethod.HASH, ComparisonMethod.BYTES])
+def test_async_backend_bounds_reads_and_open_files(tree, method):
+    remover = DuplicateRemover(
+        comparison_method=method,
+        show_progress=False,
+        max_open_files=MAX_OPEN_FILES,
+        io_backend=IOBackendKind.ASYNC,
+        queue_depth=QUEUE_DEPTH,
+        inject_latency=LATENCY,
+        block_size=64 * 1024,
+    )
+    # Count the requests reaching the latency-injecting stand-in
+    backend = remover.reader.backend
+    counter = backend.base = CountingBackend(backend.base)
+    try:
+        find_groups(remover, tree)
+    finally:
+        remover.close()
+
+    # Reads did overlap, but never beyond the queue depth
+    assert 1 < counter.max_reads <= QUEUE_DEPTH
+    if method == ComparisonMethod.HASH:
+        assert counter.max_open_files <= QUEUE_DEPTH
+    else:
+        # Files beyond the cap are opened one at a time, read and closed
+        assert counter.max_open_files <= MAX_OPEN_FILES + 1
+    assert counter.open_files == 0
@@ -0,0 +1,77 @@
+import pytest
+
+from core.duplicate_group import DuplicateGroup
+from core.file_entry import FileEntry
+from core.keeper_policy import KeeperPolicy
+
+
+def entry(path: str, mtime_ns: int = 0, nlink: int = 1) -> FileEntry:
+    return FileEntry(path, 10, hash(path), 1, mtime_ns, nlink)
+
+
+def keep(policy: KeeperPolicy, *files: FileEntry) -> list:
+    """Paths of a group once ordered, the keeper first."""
+    group = policy.order(DuplicateGroup("digest", list(files)))
+    return [file.path for file in group.files]
+
+
+@pytest.mark.parametrize(
+    "policies, expected",
+    [
+        (None, ["/a/long", "/b/x", "/c/ab", "/c/d/y"]),
+        (["first"], ["/a/long", "/b/x", "/c/ab", "/c/d/y"]),
+        (["oldest"], ["/b/x", "/a/long", "/c/ab", "/c/d/y"]),
+        (["newest"], ["/c/ab", "/a/long", "/b/x", "/c/d/y"]),
+        (["shortest-path"], ["/b/x", "/a/long", "/c/ab", "/c/d/y"]),
+        (["most-links"], ["/c/d/y", "/a/long", "/b/x", "/c/ab"]),
+    ],
+)
+def test_each_rule_picks_its_keeper(policies, expected):
+    files = [
+        entry("/a/long", mtime_ns=2),
+        entry("/b/x", mtime_ns=1),
+        entry("/c/ab", mtime_ns=3),
+        entry("/c/d/y", mtime_ns=2, nlink=3),
+    ]
+    assert keep(KeeperPolicy(policies), *files) == expected
+
+
+def test_preferred_dirs_rank_in_order_and_take_precedence():
+    files = [entry("/other/x"), entry("/backup/x"), entry("/main/nested/x")]
+    policy = KeeperPolicy(["shortest-path"], preferred_dirs=["/main", "/backup"])
+    assert policy.policies == ["preferred-dir", "shortest-path"]
+    assert keep(policy, *files)[0] == "/main/nested/x"
+    assert keep(policy, files[0], files[1])[0] == "/backup/x"
+    # A directory only matches whole path components
+    assert keep(policy, entry("/mainly/x"), files[1])[0] == "/backup/x"
+
+
+def test_preferred_dir_listed_explicitly_keeps_its_position():
+    files = [entry("/main/nested/x"), entry("/other/x")]
+    policy = KeeperPolicy(["shortest-path", "preferred-dir"], ["/main"])
+    assert keep(policy, *files)[0] == "/other/x"
+
+
+def test_later_rules_break_ties():
+    files = [entry("/a/x", mtime_ns=1), entry("/b/yy", 1), entry("/b/z", 1, nlink=2)]
+    assert keep(KeeperPolicy(["oldest", "most-links"]), *files)[0] == "/b/z"
+    assert keep(KeeperPolicy(["oldest", "shortest-path"]), *files)[0] == "/a/x"
+    # Files still tied keep the order they were found in
+    tied = [entry("/b/x", 1), entry("/a/x", 1)]
+    assert keep(KeeperPolicy(["oldest", "shortest-path"]), *tied) == ["/b/x", "/a/x"]
+
+
+def test_only_the_first_rule_is_default():
+    assert KeeperPolicy().is_default
+    assert KeeperPolicy(["first"]).is_default
+    assert not KeeperPolicy(["oldest", "first"]).is_default
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported keeper policy 'largest'"):
+        KeeperPolicy(["oldest", "largest"])
+
+
+def test_first_must_be_the_last_rule():
+    with pytest.raises(ValueError, match="must be the last rule, not followed by"):
+        KeeperPolicy(["first", "oldest"])
@@ -0,0 +1,116 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PACKAGE_DIR
+from core.duplicate_report import DuplicateReport
+
+SHARDS = ("A", "B")
+
+
+def run(*args: str) -> None:
+    subprocess.run(
+        [sys.executable, PACKAGE_DIR, *args], check=True, capture_output=True
+    )
+
+
+def write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Two shards sharing two duplicate groups, one larger than the samples."""
+    small = b"small duplicate"
+    large = os.urandom(200 * 1024)
+    for shard in SHARDS:
+        write(str(tmp_path / shard / "small"), small)
+        write(str(tmp_path / shard / "nested" / "large"), large)
+        write(str(tmp_path / shard / "unique"), shard.encode() * 100)
+    # Same size as the large duplicates, different content
+    write(str(tmp_path / "B" / "other"), large[:-1] + b"\0")
+    return tmp_path
+
+
+def merge_shards(tmp_path) -> str:
+    """Index every shard in its own process, then merge and answer until the
+    plan is written."""
+    indexes = []
+    for shard in SHARDS:
+        index = str(tmp_path / f"{shard}.index.jsonl")
+        run("shard", str(tmp_path / shard), "--index", index, "--name", shard)
+        indexes.append(index)
+
+    plan = str(tmp_path / "plan.jsonl")
+    requests_dir = str(tmp_path / "requests")
+    for _ in range(3):
+        run("merge", *indexes, "--requests-dir", requests_dir, "--report", plan)
+        if os.path.exists(plan):
+            return plan
+        for shard, index in zip(SHARDS, indexes):
+            requests = os.path.join(requests_dir, f"{shard}.requests.jsonl")
+            if os.path.exists(requests):
+                run("shard", "--answer", requests, "--index", index)
+                os.remove(requests)
+    raise AssertionError("merge never wrote the plan")
+
+
+def groups(plan: str) -> list:
+    records = DuplicateReport.read(plan)
+    next(records)
+    return list(records)
+
+
+def test_shards_find_duplicates_across_processes(tree):
+    plan = merge_shards(tree)
+
+    found = groups(plan)
+    assert len(found) == 2
+    for group in found:
+        assert group["keeper"]["shard"] == "A"
+        assert [duplicate["shard"] for duplicate in group["duplicates"]] == ["B"]
+
+    small = read(str(tree / "A" / "small"))
+    large = read(str(tree / "A" / "nested" / "large"))
+    confirmed = str(tree / "A.confirmed.jsonl")
+    run("apply", plan, "--shard", "A", "--confirm-keepers", confirmed)
+    run("apply", plan, "--shard", "B", "--confirmed", confirmed)
+
+    assert not os.path.exists(tree / "B" / "small")
+    assert not os.path.exists(tree / "B" / "nested" / "large")
+    assert read(str(tree / "A" / "small")) == small
+    assert read(str(tree / "A" / "nested" / "large")) == large
+    assert os.path.exists(tree / "B" / "other")
+    assert os.path.exists(tree / "B" / "unique")
+
+
+def test_unconfirmed_remote_keeper_is_not_deleted_against(tree):
+    plan = merge_shards(tree)
+    original = read(str(tree / "B" / "small"))
+
+    run("apply", plan, "--shard", "B")
+    assert read(str(tree / "B" / "small")) == original
+
+
+def test_changed_remote_keeper_is_not_deleted_against(tree):
+    plan = merge_shards(tree)
+    original = read(str(tree / "B" / "small"))
+    # Same size, so only the mtime and digest tell the keeper changed
+    write(str(tree / "A" / "small"), b"SMALL DUPLICATE")
+
+    confirmed = str(tree / "A.confirmed.jsonl")
+    run("apply", plan, "--shard", "A", "--confirm-keepers", confirmed)
+    run("apply", plan, "--shard", "B", "--confirmed", confirmed)
+
+    assert read(str(tree / "B" / "small")) == original
+    # The unchanged group is still applied
+    assert not os.path.exists(tree / "B" / "nested" / "large")
@@ -0,0 +1,103 @@
+import os
+
+from core.duplicate_remover import DuplicateRemover
+from core.duplicate_report import DuplicateReport
+from core.keeper_policy import KeeperPolicy
+from core.synthetic_tree import SyntheticTree
+
+SIZE = 200 * 1024
+
+
+def write(path, data: bytes, mtime_ns: int = None) -> str:
+    path = str(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def run(root: str, **kwargs) -> DuplicateRemover:
+    remover = DuplicateRemover(show_progress=False, cross_tree=True, **kwargs)
+    try:
+        remover.find_and_remove_duplicates(root, disable_progress=True)
+    finally:
+        remover.close()
+    return remover
+
+
+def planned_groups(plan: str) -> set:
+    """Merge the groups of a plan sharing a file into sets of paths."""
+    records = DuplicateReport.read(plan)
+    next(records)
+    groups = []
+    for record in records:
+        group = {record["keeper"]["path"]}
+        group.update(duplicate["path"] for duplicate in record["duplicates"])
+        for other in [other for other in groups if other & group]:
+            groups.remove(other)
+            group |= other
+        groups.append(group)
+    return {frozenset(group) for group in groups}
+
+
+def test_streaming_finds_the_same_groups_as_cross_tree(tmp_path):
+    root = str(tmp_path / "tree")
+    SyntheticTree(file_count=150, max_size=512 * 1024, files_per_dir=20).build(root)
+
+    plans = {}
+    for streaming in (False, True):
+        plans[streaming] = str(tmp_path / f"plan-{streaming}.jsonl")
+        run(root, streaming=streaming, report_path=plans[streaming])
+
+    groups = planned_groups(plans[False])
+    assert groups
+    assert planned_groups(plans[True]) == groups
+
+
+def test_streaming_replaces_the_keeper_when_a_better_file_arrives(tmp_path):
+    data = os.urandom(SIZE)
+    # Both files of the root are listed before the older one below it
+    first = write(tmp_path / "first", data, mtime_ns=2_000_000_000_000_000_000)
+    second = write(tmp_path / "second", data, mtime_ns=3_000_000_000_000_000_000)
+    oldest = write(
+        tmp_path / "sub" / "oldest", data, mtime_ns=1_000_000_000_000_000_000
+    )
+
+    remover = run(str(tmp_path), streaming=True, keeper_policy=KeeperPolicy(["oldest"]))
+
+    assert remover.duplicates_found == 2
+    assert not os.path.exists(first)
+    assert not os.path.exists(second)
+    with open(oldest, "rb") as f:
+        assert f.read() == data
+
+
+def test_streaming_reports_the_bytes_skipped(tmp_path):
+    copy = os.urandom(SIZE)
+    write(tmp_path / "a", copy)
+    write(tmp_path / "b", copy)
+    # Same size, different samples
+    write(tmp_path / "c", os.urandom(SIZE))
+    cache = str(tmp_path / "cache.sqlite3")
+
+    cold = run(str(tmp_path), streaming=True, print_only=True, cache_path=cache)
+    sample, full = cold.stage_stats["sample"], cold.stage_stats["full"]
+    per_file = cold.fingerprinter.bytes_per_file
+    assert (sample.candidates, sample.eliminated) == (3, 1)
+    assert sample.bytes_read == 3 * per_file
+    # Only the file with a unique fingerprint is never read in full
+    assert sample.bytes_skipped == SIZE
+    assert (full.candidates, full.eliminated) == (2, 0)
+    assert (full.bytes_read, full.bytes_skipped) == (2 * SIZE, 0)
+
+    # A warm cache avoids every read, and the batch mode agrees
+    for streaming in (True, False):
+        warm = run(
+            str(tmp_path), streaming=streaming, print_only=True, cache_path=cache
+        )
+        sample, full = warm.stage_stats["sample"], warm.stage_stats["full"]
+        assert sample.bytes_read == 0
+        assert sample.bytes_skipped == SIZE + 3 * per_file
+        assert (full.bytes_read, full.bytes_skipped) == (0, 2 * SIZE)